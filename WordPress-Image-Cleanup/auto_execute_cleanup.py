@@ -5,7 +5,9 @@ Australian English version with enhanced safety features
 """
 
 from wordpress_image_cleanup import WordPressImageCleanup
-import json
+from deletion_plan import PlanError, load_plan
+from streaming_output import read_backup_header
+import heapq
 import time
 from datetime import datetime
 
@@ -17,72 +19,80 @@ def main():
     print("🚀 Starting automatic deletion of unused images...")
     print()
     
-    # Load the backup file to show what will be deleted
-    backup_files = []
+    # IMPORTANT: Update these credentials for your WordPress site
+    BASE_URL = "https://your-wordpress-site.com.au"
+    USERNAME = "your_username"
+    PASSWORD = "your_application_password"  # WordPress Application Password
+    
+    cleanup = WordPressImageCleanup(BASE_URL, USERNAME, PASSWORD)
+    
+    # Load the signed plan written by the reviewed dry run
     import glob
-    backup_files = glob.glob('image_backup_*.json')
+    plan_files = glob.glob('deletion_plan_*.json')
     
-    if not backup_files:
-        print("❌ No backup file found. Please run the analysis first.")
+    if not plan_files:
+        print("❌ No deletion plan found. Please run the analysis (dry run) first.")
         return
     
-    # Use the most recent backup file
-    backup_file = max(backup_files)
+    # Use the most recent plan
+    plan_file = max(plan_files)
     
     try:
-        with open(backup_file, 'r') as f:
-            backup_data = json.load(f)
-        
-        print(f"📋 Deleting {len(backup_data)} unused images from backup: {backup_file}")
-        
-        # Calculate total size
-        total_size = sum(img['file_size'] for img in backup_data)
-        print(f"💾 Total size to free: {total_size / (1024*1024):.2f} MB")
-        print()
-        
-        # Show sample of what will be deleted
-        print("Sample of images to be deleted:")
-        for i, img in enumerate(backup_data[:5]):
-            print(f"  {i+1}. {img['title']} ({img['file_size']/1024:.1f} KB)")
-        if len(backup_data) > 5:
-            print(f"  ... and {len(backup_data) - 5} more images")
-        print()
-        
-    except FileNotFoundError:
-        print("❌ Backup file not found. Please run the analysis first.")
-        return
-    except json.JSONDecodeError:
-        print("❌ Invalid backup file format. Please run the analysis again.")
+        plan = load_plan(plan_file, cleanup.plan_key, site=cleanup.base_url)
+    except PlanError as e:
+        print(f"❌ {e}")
+        print("   Please run the analysis again to produce a fresh plan.")
         return
     
-    print("⏳ Starting deletion process with safety controls...")
-    print("   Processing in batches of 10 with delays to prevent timeouts...")
-    print()
+    planned = plan['media']
+    print(f"📋 Deleting {len(planned)} unused images from plan: {plan_file}")
+    print(f"   Plan created: {plan['created']}")
+    if plan.get('backup_file'):
+        # Totals come from the backup's header line; the entries are not read
+        try:
+            backup = read_backup_header(plan['backup_file'])
+            print(f"   Backup from analysis: {plan['backup_file']} ({backup['images']} images, "
+                  f"{backup['bytes'] / (1024*1024):.2f} MB)")
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Backup from analysis unreadable: {plan['backup_file']} ({e})")
     
-    # IMPORTANT: Update these credentials for your WordPress site
-    BASE_URL = "https://your-wordpress-site.com.au"
-    USERNAME = "your_username"
-    PASSWORD = "your_application_password"  # WordPress Application Password
+    # Calculate total size
+    total_size = sum(img['file_size'] for img in planned)
+    print(f"💾 Total size to free: {total_size / (1024*1024):.2f} MB")
+    print()
     
-    cleanup = WordPressImageCleanup(BASE_URL, USERNAME, PASSWORD)
+    # Show the largest of what will be deleted
+    print("Largest images to be deleted:")
+    for i, img in enumerate(heapq.nlargest(5, planned, key=lambda img: img['file_size'])):
+        print(f"  {i+1}. {img['title']} ({img['file_size']/1024:.1f} KB)")
+    if len(planned) > 5:
+        print(f"  ... and {len(planned) - 5} more images")
+    print()
     
-    # Test connection first
-    if not cleanup.test_connection():
-        print("❌ Connection test failed. Aborting deletion.")
-        return
+    print("⏳ Starting deletion process with safety controls...")
+    print(f"   Checking the connection and that the plan is still current, then processing in batches of "
+          f"{cleanup.max_deletions_per_batch} ({cleanup.max_deletions_in_flight} in flight)...")
+    print()
     
-    print("✅ WordPress API connection verified")
     print("🗑️ Beginning deletion process...")
     print()
     
     try:
-        # Run with actual deletion (dry_run=False)
-        results = cleanup.run_cleanup(dry_run=False)
+        # Delete exactly the reviewed plan (no rescan; image files are stored first)
+        results = cleanup.execute_plan(plan_file, dry_run=False)
         
         if "error" in results:
             print(f"❌ Error: {results['error']}")
             return
         
+        dropped = {reason: ids for reason, ids in results['stale'].items() if ids}
+        if dropped:
+            print(f"⚠️  {results['planned_images'] - results['approved_images']} planned images "
+                  f"changed since the analysis or could not be backed up, and were left alone:")
+            for reason, ids in dropped.items():
+                print(f"   {reason}: {len(ids)} (IDs {', '.join(map(str, ids[:10]))}"
+                      f"{', ...' if len(ids) > 10 else ''})")
+        
         print("\n" + "=" * 65)
         print("DELETION COMPLETED!")
         print("=" * 65)
@@ -91,24 +101,37 @@ def main():
         print(f"❌ Failed to Delete: {results['deletion_results']['failed']}")
         print(f"⏭️  Skipped: {results['deletion_results']['skipped']}")
         
+        if results['deletion_results'].get('circuit_open'):
+            deletion = results['deletion_results']
+            print(f"\n⛔ Deletion stopped early (circuit breaker): {deletion['failure_rate']:.0%} of the last "
+                  f"{deletion['failure_window']} deletions failed, at a threshold of "
+                  f"{deletion['failure_threshold']:.0%}")
+            print("   Check the site and image_cleanup.log before re-running")
+        
         # Calculate actual savings
         if results['deletion_results']['deleted'] > 0:
-            deleted_percentage = (results['deletion_results']['deleted'] / len(backup_data)) * 100
-            deleted_size = (results['deletion_results']['deleted'] / len(backup_data)) * total_size
+            deleted_percentage = (results['deletion_results']['deleted'] / len(planned)) * 100
+            deleted_size = (results['deletion_results']['deleted'] / len(planned)) * total_size
             print(f"\n💾 Storage Freed: {deleted_size / (1024*1024):.2f} MB")
             print(f"📈 Deletion Rate: {deleted_percentage:.1f}%")
         
-        success_rate = (results['deletion_results']['deleted'] / results['deletion_results']['total']) * 100
-        print(f"📈 Success Rate: {success_rate:.1f}%")
+        if results['deletion_results']['total'] > 0:
+            success_rate = (results['deletion_results']['deleted'] / results['deletion_results']['total']) * 100
+            print(f"📈 Success Rate: {success_rate:.1f}%")
         
         if results['deletion_results']['failed'] > 0:
             print(f"\n⚠️  {results['deletion_results']['failed']} images failed to delete")
             print("   This is normal - some may be protected or in use")
             print("   Check image_cleanup.log for details")
         
-        print(f"\n💾 Original backup preserved: {backup_file}")
-        print(f"💾 New backup created: {results['backup_file']}")
+        print(f"\n💾 Backup from analysis: {results['backup_file']}")
+        if results['binary_backup_stats']:
+            stats = results['binary_backup_stats']
+            print(f"💾 Image files stored: {stats['store']} ({stats['downloaded']} downloaded, "
+                  f"{stats['skipped']} already stored, {stats['bytes_stored'] / (1024*1024):.1f} MB new)")
+        print(f"📝 Deletion plan executed: {plan_file}")
         print(f"📊 Detailed log: image_cleanup.log")
+        print(f"🗒️  Per-image deletion log: {results['deletion_results']['log_file']}")
         
         print("\n✅ WordPress image cleanup completed successfully!")
         print(f"🕐 Completed at: {datetime.now().strftime('%d/%m/%Y %H:%M:%S AEST')}")
@@ -118,7 +141,8 @@ def main():
         
     except KeyboardInterrupt:
         print("\n⚠️ Deletion interrupted by user. Some images may have been deleted.")
-        print("Check image_cleanup.log for details of what was processed.")
+        print("Check the deletion_log_*.txt file for each image that was processed.")
+        print("Re-run this script to resume: images already deleted are dropped by the plan check.")
     except Exception as e:
         print(f"\n❌ Unexpected error during deletion: {e}")
         print("Check image_cleanup.log for detailed error information.")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+HTML Extraction Benchmark
+Compares the original per-match img/gallery regexes with the single-pass
+ImageExtractor on a synthetic corpus of post HTML, reporting MB/s and
+what each finds
+
+Australian English version
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import Dict, List, Set, Tuple
+from urllib.parse import urljoin, urlparse
+
+from image_extractor import ImageExtractor
+
+BASE_URL = "https://benchmark-site.com.au"
+
+# Markup shapes seen in real post bodies; {u} is an upload URL, {p} its
+# root-relative path and {i} the attachment ID
+SNIPPETS = [
+    '<p>Plain paragraph of body copy with <a href="https://example.org/">an external link</a>.</p>',
+    '<figure class="wp-block-image size-large"><img src="{u}" alt="" class="wp-image-{i}"/></figure>',
+    '<img loading="lazy" width="768" height="512" src="{u}" srcset="{u} 768w, {u} 1024w" '
+    'sizes="(max-width: 768px) 100vw, 768px" class="attachment-medium size-medium">',
+    '<img class="lazyload" data-src="{u}" data-srcset="{u} 300w" src="data:image/gif;base64,R0lGOD">',
+    '<picture><source srcset="{u} 1x, {u} 2x" type="image/webp"><img src="{p}" alt=""></picture>',
+    '<div class="hero" style="background-image: url(\'{u}\'); min-height: 400px"></div>',
+    '<div class="wp-block-cover" style="background-image:url(&quot;{u}&quot;)"></div>',
+    '[gallery columns="3" link="file" ids="{i},{j},{k}"]',
+    '<p class="has-text-align-center">Safety compliance training for Australian workplaces.</p>',
+    '<script src="https://cdn.example.net/widget.js"></script>',
+]
+
+def build_corpus(post_count: int, snippets_per_post: int = 30, seed: int = 42) -> List[str]:
+    """Synthetic post bodies mixing image markup with ordinary copy"""
+    rng = random.Random(seed)
+    posts = []
+    for _ in range(post_count):
+        parts = []
+        for _ in range(snippets_per_post):
+            media_id = rng.randint(1, 50_000)
+            path = f"/wp-content/uploads/{2015 + media_id % 10}/{media_id % 12 + 1:02d}/upload-{media_id}-768x512.jpg"
+            parts.append(rng.choice(SNIPPETS).format(
+                u=BASE_URL + path, p=path, i=media_id, j=media_id + 1, k=media_id + 2))
+        posts.append('\n'.join(parts))
+    return posts
+
+def extract_legacy(html_content: str, base_url: str = BASE_URL) -> Tuple[Set[str], Set[int]]:
+    """The original uncompiled <img src> and [gallery] extraction"""
+    images = set()
+    media_ids = set()
+    img_pattern = r'<img[^>]*src=["\']([^"\'\']+)["\'][^>]*>'
+    for src in re.findall(img_pattern, html_content, re.IGNORECASE):
+        if src.startswith('/'):
+            src = urljoin(base_url, src)
+        if urlparse(src).netloc == urlparse(base_url).netloc:
+            images.add(src)
+    gallery_pattern = r'\[gallery[^\]]*ids="([^"]+)"'
+    for match in re.findall(gallery_pattern, html_content, re.IGNORECASE):
+        for gallery_id in [id.strip() for id in match.split(',')]:
+            if gallery_id.isdigit():
+                media_ids.add(int(gallery_id))
+    return images, media_ids
+
+def run_extractor(extract, corpus: List[str], repeat: int) -> Dict:
+    """Best-of-repeat throughput and totals for one extractor"""
+    total_bytes = sum(len(html.encode('utf-8')) for html in corpus)
+    best = float('inf')
+    for _ in range(repeat):
+        urls, media_ids = set(), set()
+        start = time.perf_counter()
+        for html in corpus:
+            found_urls, found_ids = extract(html)
+            urls |= found_urls
+            media_ids |= found_ids
+        best = min(best, time.perf_counter() - start)
+    return {
+        'seconds': best,
+        'mb_per_second': total_bytes / 1024 / 1024 / best,
+        'urls': len(urls),
+        'media_ids': len(media_ids)
+    }
+
+def main():
+    """Run the HTML extraction benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark HTML image reference extraction")
+    parser.add_argument('--posts', type=int, default=2000, help="Synthetic post bodies")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed passes (best is reported)")
+    args = parser.parse_args()
+    
+    corpus = build_corpus(args.posts)
+    total_mb = sum(len(html.encode('utf-8')) for html in corpus) / 1024 / 1024
+    
+    print("HTML Extraction Benchmark")
+    print("=" * 40)
+    print(f"📄 {args.posts} posts, {total_mb:.1f} MB of HTML")
+    
+    legacy = run_extractor(extract_legacy, corpus, args.repeat)
+    single_pass = run_extractor(ImageExtractor(BASE_URL).extract, corpus, args.repeat)
+    
+    for label, result in (("Legacy regexes", legacy), ("ImageExtractor", single_pass)):
+        print(f"  {label}: {result['mb_per_second']:.1f} MB/s ({result['seconds']:.3f}s) - "
+              f"{result['urls']} URLs, {result['media_ids']} media IDs")
+    print(f"  Speed-up: {legacy['seconds'] / max(single_pass['seconds'], 1e-9):.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Media Memory Benchmark
+Measures the memory held by all_media as plain 13-key dicts versus the
+compact MediaTable, using tracemalloc on synthetic libraries
+
+Australian English version
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Dict, List
+
+from media_table import MediaTable
+
+BASE_URL = "https://benchmark-site.com.au"
+SIZES = [(150, 150), (300, 200), (768, 512), (1024, 683)]
+
+def synthetic_item(media_id: int) -> Dict:
+    """One media record in the shape _media_record returns for a full fetch"""
+    folder = f"{2015 + media_id % 10}/{media_id % 12 + 1:02d}"
+    name = f"upload-{media_id}"
+    return {
+        'id': media_id,
+        'title': f"Upload {media_id}",
+        'source_url': f"{BASE_URL}/wp-content/uploads/{folder}/{name}.jpg",
+        'date': '2025-07-01T09:00:00',
+        'modified': '2025-07-01T09:00:00',
+        'post': 0,
+        'file_size': 50_000 + media_id,
+        'mime_type': 'image/jpeg',
+        'meta': {},
+        'alt_text': '',
+        'caption': '',
+        'description': '',
+        'sizes': [f"{name}-{w}x{h}.jpg" for w, h in SIZES]
+    }
+
+def compact_item(media_id: int) -> Dict:
+    """The same record as a compact (lean) fetch produces it"""
+    item = synthetic_item(media_id)
+    for key in ('caption', 'description', 'meta'):
+        del item[key]
+    return item
+
+def build_dicts(media_count: int) -> Dict[int, Dict]:
+    """all_media as the original dict-of-dicts"""
+    return {media_id: synthetic_item(media_id) for media_id in range(1, media_count + 1)}
+
+def build_table(media_count: int) -> MediaTable:
+    """all_media as a compact MediaTable"""
+    table = MediaTable()
+    for media_id in range(1, media_count + 1):
+        table.add_dict(compact_item(media_id))
+    return table
+
+def measure(builder, media_count: int) -> Dict:
+    """Peak and retained traced memory for one container build"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    container = builder(media_count)
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(container) == media_count
+    del container
+    return {
+        'retained_bytes': retained,
+        'peak_bytes': peak,
+        'bytes_per_item': round(retained / media_count, 1),
+        'build_seconds': round(elapsed, 3)
+    }
+
+def run_benchmark(sizes: List[int]) -> List[Dict]:
+    """Measure both layouts at each library size"""
+    results = []
+    for media_count in sizes:
+        dicts = measure(build_dicts, media_count)
+        table = measure(build_table, media_count)
+        results.append({
+            'media': media_count,
+            'dict': dicts,
+            'media_table': table,
+            'reduction': round(1 - table['retained_bytes'] / max(dicts['retained_bytes'], 1), 3)
+        })
+    return results
+
+def main():
+    """Run the media memory benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark all_media memory footprint")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 500_000],
+                        help="Library sizes to measure")
+    parser.add_argument('--output', default='benchmark_media_memory.json',
+                        help="Where to write the JSON results")
+    args = parser.parse_args()
+    
+    print("Media Memory Benchmark")
+    print("=" * 40)
+    
+    results = run_benchmark(args.sizes)
+    for result in results:
+        dicts, table = result['dict'], result['media_table']
+        print(f"📊 {result['media']:,} media")
+        print(f"  Plain dicts: {dicts['retained_bytes'] / 1024 / 1024:.1f} MB "
+              f"({dicts['bytes_per_item']:.0f} B/item, peak {dicts['peak_bytes'] / 1024 / 1024:.1f} MB)")
+        print(f"  MediaTable:  {table['retained_bytes'] / 1024 / 1024:.1f} MB "
+              f"({table['bytes_per_item']:.0f} B/item, peak {table['peak_bytes'] / 1024 / 1024:.1f} MB)")
+        print(f"  Reduction: {result['reduction']:.0%}")
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'generated': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
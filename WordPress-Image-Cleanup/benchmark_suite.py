@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+End-to-End Benchmark Suite
+Runs run_cleanup against fake WordPress sites of 1k-1M attachments and
+records wall time, requests/sec, peak RSS and per-stage timings as JSON
+that can be compared between versions
+
+Australian English version
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+from fake_wordpress_server import FakeWordPressSite
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_wordpress_server.py')
+BASE_URL_PATTERN = re.compile(r'at (http://\S+)')
+
+def scenario(media_count: int, html: str = 'realistic', latency: float = 0.0,
+             error_rate: float = 0.0) -> Dict:
+    """Site shape for a library size: posts for half the media, plus pages and products"""
+    return {
+        'name': f"{media_count}-{html}" + (f"-{latency * 1000:g}ms" if latency else '')
+                + (f"-{error_rate:.0%}err" if error_rate else ''),
+        'media': media_count,
+        'posts': media_count // 2,
+        'pages': max(media_count // 100, 1),
+        'products': media_count // 20,
+        'html': html,
+        'latency': latency,
+        'error_rate': error_rate
+    }
+
+def expected_unused(site_options: Dict) -> int:
+    """Unused images the generated site should report"""
+    site = FakeWordPressSite(media_count=site_options['media'], post_count=site_options['posts'],
+                             page_count=site_options['pages'], product_count=site_options['products'])
+    return site.expected_unused()
+
+def start_server(site_options: Dict, seed: int) -> subprocess.Popen:
+    """Serve the scenario's site from a separate process, so it does not share our GIL"""
+    command = [sys.executable, SERVER_SCRIPT, '--port', '0',
+               '--media', str(site_options['media']), '--posts', str(site_options['posts']),
+               '--pages', str(site_options['pages']), '--products', str(site_options['products']),
+               '--html', site_options['html'], '--latency', str(site_options['latency']),
+               '--error-rate', str(site_options['error_rate']), '--seed', str(seed)]
+    return subprocess.Popen(command, stdout=subprocess.PIPE, text=True, encoding='utf-8')
+
+def run_client(base_url: str, live: bool, max_workers: int, initial_rate: float,
+               max_rate: float, workdir: str) -> Dict:
+    """One run_cleanup in this (fresh) process, returning its measurements"""
+    os.chdir(workdir)
+    import logging
+    from rate_limiter import AdaptiveRateLimiter
+    from wordpress_image_cleanup import WordPressImageCleanup
+
+    logging.getLogger().setLevel(logging.WARNING)
+    cleanup = WordPressImageCleanup(base_url, 'benchmark', 'benchmark', max_workers=max_workers)
+    cleanup.rate_limiter = AdaptiveRateLimiter(initial_rate=initial_rate, max_rate=max_rate)
+    cleanup.retry_backoff = 0.1
+
+    start = time.perf_counter()
+    results = cleanup.run_cleanup(dry_run=not live)
+    wall_seconds = time.perf_counter() - start
+
+    rate = results.get('rate_limit', {})
+    instrumentation = results.get('instrumentation', {})
+    deletion = results.get('deletion_results') or {}
+    return {
+        'error': results.get('error'),
+        'wall_seconds': round(wall_seconds, 2),
+        'requests': rate.get('requests', 0),
+        'requests_per_second': round(rate.get('requests', 0) / wall_seconds, 1) if wall_seconds else 0.0,
+        'effective_rate': rate.get('effective_rate', 0.0),
+        'throttled_responses': rate.get('throttled_responses', 0),
+        # ru_maxrss is KB on Linux and bytes on macOS
+        'peak_rss_mb': (round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                              / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+                        if resource else None),
+        'stages': {name: stats['seconds'] for name, stats in instrumentation.get('phases', {}).items()},
+        'endpoints': instrumentation.get('endpoints', {}),
+        'fetch_seconds': {stage: stats['seconds'] for stage, stats in results.get('fetch_stats', {}).items()},
+        'content_type_seconds': {name: stats['seconds']
+                                 for name, stats in results.get('content_type_stats', {}).items()},
+        'total_images': results.get('total_images', 0),
+        'unused_images': results.get('unused_images', 0),
+        'deleted': deletion.get('deleted', 0),
+        'failed': deletion.get('failed', 0)
+    }
+
+def run_scenario(site_options: Dict, args) -> Dict:
+    """Serve one site, run the cleanup against it in a fresh process and collect results"""
+    server = start_server(site_options, args.seed)
+    try:
+        match = BASE_URL_PATTERN.search(server.stdout.readline())
+        if not match:
+            return dict(site_options, error="Fake server did not start")
+        with tempfile.TemporaryDirectory() as workdir:
+            # A spawned process per scenario keeps peak RSS from leaking between sizes
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                measured = executor.submit(run_client, match.group(1), args.live, args.workers,
+                                           args.initial_rate, args.max_rate, workdir).result()
+    finally:
+        server.terminate()
+        server.wait()
+
+    expected = expected_unused(site_options)
+    return dict(site_options, **measured, expected_unused=expected,
+                correct=measured['error'] is None and measured['unused_images'] == expected)
+
+def git_commit() -> Optional[str]:
+    """Commit the benchmark ran against, for comparing versions"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(SERVER_SCRIPT), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: List[Dict], baseline_file: str):
+    """Print wall time, throughput and RSS changes against an earlier results file"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = {result['name']: result for result in json.load(f)['results']}
+    print(f"\n📈 Compared with {baseline_file}")
+    for result in results:
+        old = baseline.get(result['name'])
+        if old is None:
+            print(f"  {result['name']}: no baseline")
+            continue
+        changes = []
+        for key, label in (('wall_seconds', 'wall'), ('requests_per_second', 'req/s'), ('peak_rss_mb', 'RSS')):
+            if old.get(key) and result.get(key) is not None:
+                changes.append(f"{label} {old[key]} -> {result[key]} ({result[key] / old[key] - 1:+.0%})")
+        print(f"  {result['name']}: " + ', '.join(changes))
+
+def main():
+    """Run the end-to-end benchmark suite"""
+    parser = argparse.ArgumentParser(description="Benchmark run_cleanup end to end against fake sites")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help="Library sizes (attachments) to run; 1000000 works but takes a while")
+    parser.add_argument('--html', choices=('minimal', 'realistic'), default='realistic')
+    parser.add_argument('--latency', type=float, default=0.0, help="Mean seconds added to REST requests")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of REST requests answered 503")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=4, help="max_workers for the cleanup")
+    parser.add_argument('--initial-rate', type=float, default=50.0, help="Starting request rate (req/s)")
+    parser.add_argument('--max-rate', type=float, default=500.0, help="Request rate ceiling (req/s)")
+    parser.add_argument('--live', action='store_true', help="Delete the unused images instead of a dry run")
+    parser.add_argument('--output', default='benchmark_suite.json', help="Where to write the JSON results")
+    parser.add_argument('--compare', metavar='OLD_JSON', help="Earlier results to compare against")
+    args = parser.parse_args()
+    
+    print("End-to-End Benchmark Suite")
+    print("=" * 40)
+    
+    results = []
+    for media_count in args.sizes:
+        site_options = scenario(media_count, args.html, args.latency, args.error_rate)
+        result = run_scenario(site_options, args)
+        results.append(result)
+        if result.get('error'):
+            print(f"❌ {result['name']}: {result['error']}")
+            continue
+        print(f"📊 {result['name']}: {result['wall_seconds']}s, {result['requests']} requests "
+              f"({result['requests_per_second']} req/s), peak RSS {result['peak_rss_mb']} MB")
+        print(f"  Unused: {result['unused_images']} (expected {result['expected_unused']}) "
+              f"{'✅' if result['correct'] else '❌'}")
+        print("  Stages: " + ', '.join(f"{name} {seconds}s" for name, seconds in result['stages'].items()))
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'generated': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': git_commit(),
+                   'python': sys.version.split()[0], 'live': args.live, 'results': results}, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+    
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
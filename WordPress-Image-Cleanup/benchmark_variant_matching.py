@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Variant Matching Benchmark
+Compares the original pairwise _are_same_image loop with the canonical-key
+index used by identify_unused_images on a synthetic media library
+
+Australian English version
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, Set
+
+from wordpress_image_cleanup import WordPressImageCleanup
+
+BASE_URL = "https://benchmark-site.com.au"
+SIZES = [(150, 150), (300, 200), (768, 512), (1024, 683)]
+
+def build_library(cleanup: WordPressImageCleanup, media_count: int, reference_count: int,
+                  seed: int = 42):
+    """Populate a cleanup instance with a synthetic library and content references"""
+    rng = random.Random(seed)
+    all_media = {}
+    
+    for media_id in range(1, media_count + 1):
+        folder = f"{2015 + media_id % 10}/{media_id % 12 + 1:02d}"
+        name = f"upload-{media_id}"
+        scaled = media_id % 7 == 0  # Large originals get a -scaled source file
+        source_file = f"{name}-scaled.jpg" if scaled else f"{name}.jpg"
+        all_media[media_id] = {
+            'id': media_id,
+            'title': name,
+            'source_url': f"{BASE_URL}/wp-content/uploads/{folder}/{source_file}",
+            'date': '2025-07-01T09:00:00',
+            'modified': '2025-07-01T09:00:00',
+            'post': 0,
+            'file_size': rng.randint(20_000, 2_000_000),
+            'mime_type': 'image/jpeg',
+            'meta': {},
+            'alt_text': '',
+            'caption': '',
+            'description': '',
+            'sizes': [f"{name}-{w}x{h}.jpg" for w, h in SIZES]
+        }
+    
+    # References point at a random mix of originals and size variants
+    used_images = set()
+    media_ids = list(all_media)
+    while len(used_images) < reference_count:
+        media_info = all_media[rng.choice(media_ids)]
+        if rng.random() < 0.5:
+            used_images.add(media_info['source_url'])
+        else:
+            directory = media_info['source_url'].rsplit('/', 1)[0]
+            used_images.add(f"{directory}/{rng.choice(media_info['sizes'])}")
+        if len(used_images) >= len(media_ids) * (len(SIZES) + 1):
+            break
+    
+    cleanup.all_media = all_media
+    cleanup.used_images = used_images
+
+def identify_unused_pairwise(cleanup: WordPressImageCleanup) -> Set[int]:
+    """The original O(media x used URLs) identification loop"""
+    unused_media_ids = set()
+    for media_id, media_info in cleanup.all_media.items():
+        source_url = media_info['source_url']
+        if media_info['post'] and media_info['post'] != 0:
+            continue
+        if source_url in cleanup.used_images:
+            continue
+        is_used = False
+        for used_url in cleanup.used_images:
+            if cleanup._are_same_image(source_url, used_url):
+                is_used = True
+                break
+        if not is_used:
+            unused_media_ids.add(media_id)
+    return unused_media_ids
+
+def run_benchmark(media_count: int, reference_count: int, compare: bool) -> Dict:
+    """Time both identification paths and check they agree"""
+    cleanup = WordPressImageCleanup(BASE_URL, "benchmark", "benchmark")
+    build_library(cleanup, media_count, reference_count)
+    
+    start = time.perf_counter()
+    indexed = cleanup.identify_unused_images()
+    indexed_time = time.perf_counter() - start
+    
+    result = {
+        'media': media_count,
+        'references': len(cleanup.used_images),
+        'unused': len(indexed),
+        'indexed_seconds': indexed_time,
+        'pairwise_seconds': None,
+        'identical': None
+    }
+    
+    if compare:
+        start = time.perf_counter()
+        pairwise = identify_unused_pairwise(cleanup)
+        result['pairwise_seconds'] = time.perf_counter() - start
+        result['identical'] = pairwise == indexed
+    
+    return result
+
+def main():
+    """Run the variant matching benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark unused-image variant matching")
+    parser.add_argument('--media', type=int, default=2000, help="Synthetic media items")
+    parser.add_argument('--references', type=int, default=2000, help="Used image URLs")
+    parser.add_argument('--scale-media', type=int, default=40000,
+                        help="Media items for the index-only scale run")
+    parser.add_argument('--scale-references', type=int, default=120000,
+                        help="Used image URLs for the index-only scale run")
+    args = parser.parse_args()
+    
+    print("Variant Matching Benchmark")
+    print("=" * 40)
+    
+    result = run_benchmark(args.media, args.references, compare=True)
+    print(f"📊 {result['media']} media / {result['references']} references")
+    print(f"  Pairwise loop:  {result['pairwise_seconds']:.3f}s")
+    print(f"  Canonical index: {result['indexed_seconds']:.3f}s")
+    print(f"  Speed-up: {result['pairwise_seconds'] / max(result['indexed_seconds'], 1e-9):.0f}x")
+    print(f"  Unused images: {result['unused']}")
+    print(f"  {'✅ Results identical' if result['identical'] else '❌ Results differ'}")
+    
+    scale = run_benchmark(args.scale_media, args.scale_references, compare=False)
+    print(f"\n📊 {scale['media']} media / {scale['references']} references (index only)")
+    print(f"  Canonical index: {scale['indexed_seconds']:.3f}s")
+    print(f"  Unused images: {scale['unused']}")
+    
+    if not result['identical']:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
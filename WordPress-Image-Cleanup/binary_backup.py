@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Binary Image Backup
+Downloads the original and every generated size of each deletion candidate
+into a content-addressed store before deletion. Files are streamed to disk
+in chunks, stored once per sha256 however many attachments share them, and
+listed in an append-only manifest so resumed runs skip what is already
+stored.
+
+Australian English version
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = 'manifest.jsonl'
+
+# Server-side failures worth another attempt; anything else 4xx is final
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+def media_files(media_info: Dict) -> List[Tuple[str, str]]:
+    """(variant, URL) for an attachment's original and each generated size file"""
+    source_url = media_info.get('source_url', '')
+    if not source_url:
+        return []
+    directory = source_url.rsplit('/', 1)[0]
+    files = [('original', source_url)]
+    seen = {source_url}
+    for size_file in media_info.get('sizes', []):
+        url = f"{directory}/{size_file}"
+        if size_file and url not in seen:
+            seen.add(url)
+            files.append((size_file, url))
+    return files
+
+class BackupStore:
+    """sha256-addressed object store (objects/ab/abcdef...) with a JSONL manifest
+
+    Each manifest line records one downloaded file: media ID, variant, URL,
+    file name, sha256, size and content type. An object is written to a
+    temporary file while it is hashed, then renamed into place, so a
+    half-written download never appears as a stored object.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.object_path(digest))
+
+    def put(self, chunks: Iterable[bytes]) -> Tuple[str, int, bool]:
+        """Stream chunks into the store, returning (sha256, size, newly stored)"""
+        digest = hashlib.sha256()
+        size = 0
+        handle, temporary = tempfile.mkstemp(dir=self.objects_dir, prefix='.incoming-')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            path = self.object_path(digest.hexdigest())
+            with self._lock:
+                if os.path.exists(path):
+                    os.remove(temporary)
+                    return digest.hexdigest(), size, False
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temporary, path)
+            return digest.hexdigest(), size, True
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def record(self, entry: Dict):
+        """Append one file's manifest entry"""
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def entries(self, urls: Optional[Set[str]] = None) -> Iterator[Dict]:
+        """Manifest entries (only those for the given URLs, if any)"""
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut short by an interrupted run
+                if urls is None or entry.get('url') in urls:
+                    yield entry
+
+    def open_object(self, digest: str):
+        return open(self.object_path(digest), 'rb')
+
+class BinaryBackup:
+    """Download deletion candidates' files into a BackupStore concurrently
+
+    Downloads go through a dedicated pooled session, max_workers at a time,
+    with at most max_workers * 2 files queued. A file already stored under
+    the same URL is skipped. A 404 counts as missing: there is nothing left
+    to lose. An attachment is backed up once none of its files failed.
+    """
+
+    def __init__(self, store_dir: str, max_workers: int = 8, retries: int = 3,
+                 retry_backoff: float = 1.0, timeout: int = 60, user_agent: Optional[str] = None):
+        self.store = BackupStore(store_dir)
+        self.max_workers = max(1, max_workers)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._stats_lock = threading.Lock()
+        self.stats = {}
+
+    def run(self, media: Dict[int, Dict]) -> Set[int]:
+        """Back up every attachment in media (ID -> record), returning the IDs fully backed up"""
+        files = [(media_id, variant, url) for media_id, media_info in media.items()
+                 for variant, url in media_files(media_info)]
+        stored = {entry['url']: entry['sha256'] for entry in self.store.entries({url for _, _, url in files})}
+        self.stats = {'media': len(media), 'files': len(files), 'downloaded': 0, 'deduplicated': 0,
+                      'skipped': 0, 'missing': 0, 'failed': 0, 'bytes_downloaded': 0, 'bytes_stored': 0}
+        failed_media = set()
+        start_time = time.time()
+        logger.info(f"💾 Backing up {len(files)} files of {len(media)} images to {self.store.root}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            queue = iter(files)
+            window = self.max_workers * 2
+            for media_id, variant, url in queue:
+                if url in stored and self.store.has(stored[url]):
+                    self._count('skipped')
+                    continue
+                pending.append((media_id, executor.submit(self._download, media_id, variant, url)))
+                if len(pending) >= window:
+                    self._collect(pending.popleft(), failed_media)
+            while pending:
+                self._collect(pending.popleft(), failed_media)
+
+        elapsed = time.time() - start_time
+        self.stats['failed_media'] = sorted(failed_media)
+        self.stats['seconds'] = round(elapsed, 2)
+        self.stats['mb_per_second'] = round(self.stats['bytes_downloaded'] / 1024 / 1024 / elapsed, 1) \
+            if elapsed > 0 else 0.0
+        logger.info(f"💾 Binary backup: {self.stats['downloaded']} files downloaded "
+                    f"({self.stats['bytes_downloaded'] / 1024 / 1024:.1f} MB at {self.stats['mb_per_second']} MB/s), "
+                    f"{self.stats['skipped']} already stored, {self.stats['deduplicated']} duplicates, "
+                    f"{self.stats['missing']} missing, {self.stats['failed']} failed")
+        return set(media) - failed_media
+
+    def _collect(self, pending_item, failed_media: Set[int]):
+        media_id, future = pending_item
+        try:
+            future.result()
+        except (requests.RequestException, OSError) as e:
+            logger.error(f"❌ Backup of image {media_id} failed: {e}")
+            self._count('failed')
+            failed_media.add(media_id)
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _download(self, media_id: int, variant: str, url: str):
+        """Stream one file into the store, retrying connection errors and 5xx"""
+        for attempt in range(self.retries + 1):
+            try:
+                with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                    if response.status_code == 404:
+                        self._count('missing')
+                        return
+                    if response.status_code in RETRY_STATUS_CODES and attempt < self.retries:
+                        raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+                    response.raise_for_status()
+                    digest, size, is_new = self.store.put(response.iter_content(CHUNK_SIZE))
+                    content_type = response.headers.get('Content-Type', '')
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                status = getattr(e.response, 'status_code', None)
+                if attempt == self.retries or (status is not None and status not in RETRY_STATUS_CODES):
+                    raise
+                time.sleep(self.retry_backoff * (2 ** attempt))
+
+        self.store.record({'media_id': media_id, 'variant': variant, 'url': url,
+                           'filename': url.rsplit('/', 1)[-1], 'sha256': digest, 'bytes': size,
+                           'content_type': content_type, 'stored': datetime.now().isoformat()})
+        with self._stats_lock:
+            self.stats['downloaded'] += 1
+            self.stats['bytes_downloaded'] += size
+            if is_new:
+                self.stats['bytes_stored'] += size
+            else:
+                self.stats['deduplicated'] += 1
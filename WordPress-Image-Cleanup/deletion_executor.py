@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Concurrent Deletion Executor
+Keeps a bounded number of DELETE requests in flight, batch by batch, with a
+circuit breaker and a per-ID deletion log streamed as outcomes arrive.
+Requests may each carry a group of IDs (e.g. a REST batch call).
+
+Australian English version
+"""
+
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """Trips once the failure rate over recent deletions crosses a threshold"""
+
+    def __init__(self, failure_threshold: float = 0.5, window: int = 20,
+                 min_requests: int = 10):
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.outcomes = deque(maxlen=window)
+        self.tripped = False
+
+    def record(self, success: bool):
+        """Record one outcome and trip the breaker if failures dominate"""
+        self.outcomes.append(success)
+        if len(self.outcomes) >= self.min_requests and self.failure_rate >= self.failure_threshold:
+            self.tripped = True
+
+    @property
+    def failure_rate(self) -> float:
+        """Failure rate over the sliding window"""
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+class DeletionExecutor:
+    """Run deletions concurrently within per-batch safety caps
+
+    With a group delete function, each safety batch is split into groups
+    of at most group_size IDs, and no larger than needed to give every
+    in-flight worker a share: a batch of 10 with 4 in flight becomes
+    groups of 3, 3, 3 and 1 sent concurrently, not one call of 10.
+    """
+
+    def __init__(self, delete_fn: Callable[[int], bool], max_in_flight: int = 4,
+                 batch_size: int = 10, breaker: Optional[CircuitBreaker] = None,
+                 log_path: Optional[str] = None, success_status: str = 'deleted',
+                 describe: Callable[[int], str] = str,
+                 delete_group_fn: Optional[Callable[[List[int]], Dict[int, bool]]] = None,
+                 group_size: int = 1, on_outcome: Optional[Callable[[int, str], None]] = None):
+        self.delete_fn = delete_fn
+        self.delete_group_fn = delete_group_fn
+        self.max_in_flight = max(1, max_in_flight)
+        self.batch_size = max(1, batch_size)
+        per_worker = -(-self.batch_size // self.max_in_flight)
+        self.group_size = min(max(1, group_size), per_worker) if delete_group_fn else 1
+        self.breaker = breaker or CircuitBreaker()
+        self.log_path = log_path
+        self.success_status = success_status
+        self.describe = describe
+        self.on_outcome = on_outcome  # e.g. a run journal checkpoint
+        self.deleted_ids = []
+        self.failed_ids = []
+
+    def run(self, media_ids: Iterable[int]) -> Dict:
+        """Delete every ID, returning the batch_delete results dict"""
+        media_list = list(media_ids)
+        results = {
+            'total': len(media_list),
+            'deleted': 0,
+            'failed': 0,
+            'skipped': 0,
+            'circuit_open': False,
+            'log_file': self.log_path
+        }
+
+        log_file = open(self.log_path, 'a', encoding='utf-8') if self.log_path else None
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_in_flight, self.batch_size)) as pool:
+                for i in range(0, len(media_list), self.batch_size):
+                    batch = media_list[i:i + self.batch_size]
+                    logger.info(f"🗑️ Processing batch {i // self.batch_size + 1}: {len(batch)} images "
+                                f"({self.max_in_flight} in flight)")
+
+                    self._run_batch(pool, batch, results, log_file)
+
+                    if self.breaker.tripped:
+                        results['circuit_open'] = True
+                        results['failure_rate'] = round(self.breaker.failure_rate, 2)
+                        results['failure_threshold'] = self.breaker.failure_threshold
+                        results['failure_window'] = len(self.breaker.outcomes)
+                        results['skipped'] += len(media_list) - i - len(batch)
+                        logger.error(f"⛔ Circuit breaker open: {self.breaker.failure_rate:.0%} of recent "
+                                     f"deletions failed - stopping with {results['skipped']} images skipped")
+                        break
+        finally:
+            if log_file:
+                log_file.close()
+
+        return results
+
+    def _run_batch(self, pool: ThreadPoolExecutor, batch: List[int], results: Dict, log_file):
+        """Submit one batch and stream outcomes to the log as they complete"""
+        groups = [batch[i:i + self.group_size] for i in range(0, len(batch), self.group_size)]
+        futures = {pool.submit(self._delete_group, group): group for group in groups}
+
+        for future in as_completed(futures):
+            group = futures[future]
+            if future.cancelled():
+                results['skipped'] += len(group)
+                for media_id in group:
+                    self._log(log_file, media_id, 'skipped')
+                continue
+
+            try:
+                outcomes = future.result()
+            except Exception as e:
+                logger.error(f"❌ Error deleting images {group}: {e}")
+                outcomes = {media_id: False for media_id in group}
+
+            for media_id in group:
+                self._record(media_id, outcomes.get(media_id, False), results, log_file)
+
+            if self.breaker.tripped:
+                # Anything not yet started in this batch is abandoned
+                for pending in futures:
+                    pending.cancel()
+
+    def _delete_group(self, group: List[int]) -> Dict[int, bool]:
+        """Delete one group of IDs in a worker thread"""
+        if self.delete_group_fn is not None:
+            return self.delete_group_fn(group)
+        return {media_id: self.delete_fn(media_id) for media_id in group}
+
+    def _record(self, media_id: int, success: bool, results: Dict, log_file):
+        """Count and log one per-ID outcome"""
+        if success:
+            results['deleted'] += 1
+            self.deleted_ids.append(media_id)
+            self._log(log_file, media_id, self.success_status)
+        else:
+            results['failed'] += 1
+            self.failed_ids.append(media_id)
+            self._log(log_file, media_id, 'failed')
+
+        self.breaker.record(success)
+
+    def _log(self, log_file, media_id: int, status: str):
+        """Append one tab-separated outcome line and flush it to disk"""
+        if self.on_outcome is not None:
+            self.on_outcome(media_id, status)
+        if log_file is None:
+            return
+        log_file.write(f"{datetime.now().isoformat()}\t{media_id}\t{status}\t{self.describe(media_id)}\n")
+        log_file.flush()
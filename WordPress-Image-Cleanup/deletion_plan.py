@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Signed Deletion Plans
+The dry run records exactly which images it flagged (with their 'modified'
+timestamps) and how far content had been scanned. The live run deletes
+that reviewed plan instead of rescanning, after checking it is untouched
+and still current.
+
+Australian English version
+"""
+
+import hashlib
+import hmac
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+PLAN_VERSION = 1
+
+class PlanError(ValueError):
+    """A deletion plan is unreadable, tampered with or for another site"""
+
+def _canonical_bytes(plan: Dict) -> bytes:
+    """Stable serialisation of everything except the signature"""
+    unsigned = {key: value for key, value in plan.items() if key != 'signature'}
+    return json.dumps(unsigned, sort_keys=True, separators=(',', ':'),
+                      ensure_ascii=False).encode('utf-8')
+
+def sign_plan(plan: Dict, key: str) -> str:
+    """HMAC-SHA256 signature of a plan"""
+    return hmac.new(key.encode('utf-8'), _canonical_bytes(plan), hashlib.sha256).hexdigest()
+
+def build_plan(site: str, media: List[Dict], content_watermarks: Dict[str, Optional[str]],
+               backup_file: Optional[str] = None,
+               environment_watermarks: Optional[Dict[str, Dict[str, Optional[str]]]] = None) -> Dict:
+    """Unsigned plan for the given media entries (id, modified, title, ...)
+
+    environment_watermarks holds the content watermarks of each other
+    environment scanned (staging, development), keyed by its name.
+    """
+    return {
+        'version': PLAN_VERSION,
+        'site': site,
+        'created': datetime.now().isoformat(),
+        'backup_file': backup_file,
+        'content_watermarks': content_watermarks,
+        'environment_watermarks': environment_watermarks or {},
+        'media': sorted(media, key=lambda entry: entry['id'])
+    }
+
+def save_plan(plan: Dict, key: str, filename: str) -> str:
+    """Sign and write a plan, returning the file name"""
+    signed = dict(plan, signature=sign_plan(plan, key))
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(signed, f, indent=2, ensure_ascii=False)
+    return filename
+
+def load_plan(filename: str, key: str, site: Optional[str] = None) -> Dict:
+    """Read a plan, verifying its signature (and site, if given)"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise PlanError(f"Cannot read deletion plan {filename}: {e}")
+
+    if not isinstance(plan, dict) or plan.get('version') != PLAN_VERSION:
+        raise PlanError(f"Unsupported deletion plan format: {filename}")
+    if not hmac.compare_digest(str(plan.get('signature', '')), sign_plan(plan, key)):
+        raise PlanError(f"Deletion plan signature mismatch - {filename} was modified or "
+                        "signed with a different key")
+    if site is not None and plan.get('site') != site:
+        raise PlanError(f"Deletion plan is for {plan.get('site')}, not {site}")
+    return plan
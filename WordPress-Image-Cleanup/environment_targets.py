@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Environment Targets
+Staging, development and other copies of a site whose content must also be
+checked before a production image is considered unused. Each environment
+has its own credentials and rate limit; image keys found there are mapped
+onto the production media library.
+
+Australian English version
+"""
+
+import re
+
+# Path part of a base URL, e.g. '/staging' for https://example.com.au/staging
+BASE_PATH_PATTERN = re.compile(r'^(?:[A-Za-z][A-Za-z0-9+.\-]*:)?(?://[^/?#]*)?([^?#]*)')
+
+class EnvironmentTarget:
+    """One non-production environment to scan for image usage
+
+    shares_media_ids should be left True for environments cloned from the
+    production database, where attachment IDs match. Set it to False for
+    environments with their own database so only image URLs count.
+    """
+
+    def __init__(self, name: str, base_url: str, username: str, password: str,
+                 initial_rate: float = 2.0, max_rate: float = 50.0,
+                 shares_media_ids: bool = True):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.initial_rate = initial_rate
+        self.max_rate = max_rate
+        self.shares_media_ids = shares_media_ids
+
+    def __repr__(self) -> str:
+        return f"EnvironmentTarget({self.name!r}, {self.base_url!r})"
+
+def base_path(base_url: str) -> str:
+    """Install path of a site ('' for a site at the domain root)"""
+    return BASE_PATH_PATTERN.match(base_url).group(1).rstrip('/')
+
+def rebase_image_key(key: str, from_path: str, to_path: str) -> str:
+    """Move a canonical image key from one install path to another
+
+    Keys already drop the host, so only sites installed in different
+    sub-directories (e.g. /staging vs the root) need rebasing.
+    """
+    if from_path == to_path:
+        return key
+    if from_path and not key.startswith(from_path + '/'):
+        return key
+    return to_path + key[len(from_path):]
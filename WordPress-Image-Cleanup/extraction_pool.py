@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Process-Pool Content Extraction
+Moves CPU-bound HTML reference extraction off the main thread for sites
+whose page-builder content makes single posts hundreds of KB or more.
+Small items stay in-process so they never pay the pickling overhead.
+
+Australian English version
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from image_extractor import ImageExtractor, canonical_image_key
+from reference_extractors import extract_item
+
+logger = logging.getLogger(__name__)
+
+# (content ID, modified, canonical image keys, media IDs) for one item
+ItemReferences = Tuple[int, str, Set[str], Set[int]]
+
+# A REST content item, already reduced to the requested _fields
+ContentPayload = Dict
+
+# One extractor per site in each worker process, built on first use
+_worker_extractors = {}
+
+def payload_size(payload: ContentPayload) -> int:
+    """Markup size of an item: HTML, block markup and top-level meta strings
+    (characters, ~bytes for typical markup)"""
+    content = payload.get('content') or {}
+    size = (len(content.get('rendered', '')) + len(content.get('raw', '')) +
+            len((payload.get('excerpt') or {}).get('rendered', '')))
+    for field in ('meta', 'acf'):
+        if isinstance(payload.get(field), dict):
+            size += sum(len(value) for value in payload[field].values() if isinstance(value, str))
+    return size
+
+def extract_references(extractor: ImageExtractor, payload: ContentPayload) -> ItemReferences:
+    """Canonical image keys and media IDs referenced by one content item"""
+    urls, media_ids = extract_item(payload, extractor)
+    return (payload['id'], payload.get('modified', ''),
+            {canonical_image_key(url) for url in urls}, media_ids)
+
+def extract_batch(base_url: str, payloads: List[ContentPayload],
+                  aliases: Tuple[str, ...] = ()) -> Tuple[List[ItemReferences], Dict]:
+    """Worker entry point: extract a batch and time it for throughput stats"""
+    start = time.perf_counter()
+    extractor = _worker_extractors.get((base_url, aliases))
+    if extractor is None:
+        extractor = _worker_extractors[base_url, aliases] = ImageExtractor(base_url, aliases)
+    results = [extract_references(extractor, payload) for payload in payloads]
+    return results, {
+        'worker': f"pid-{os.getpid()}",
+        'items': len(payloads),
+        'bytes': sum(payload_size(payload) for payload in payloads),
+        'seconds': time.perf_counter() - start
+    }
+
+class ExtractionPool:
+    """Extract content references, sending large items to worker processes
+
+    Items of at least min_item_bytes of HTML are spread across the workers
+    (largest first, onto the least-loaded batch) while the rest are handled
+    on the calling thread in the meantime. extract may be called from
+    several threads at once; they share the worker processes.
+    """
+
+    def __init__(self, base_url: str, workers: Optional[int] = None,
+                 min_item_bytes: int = 256 * 1024, aliases: Tuple[str, ...] = ()):
+        self.base_url = base_url.rstrip('/')
+        self.aliases = tuple(aliases)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.min_item_bytes = min_item_bytes
+        self.extractor = ImageExtractor(self.base_url, self.aliases)
+        self.worker_stats = {}
+        self._executor = None
+        self._lock = threading.Lock()  # Guards executor creation and worker_stats
+
+    def extract(self, items: List[Dict]) -> List[ItemReferences]:
+        """References for a page of content items (order is not preserved)"""
+        heavy = [item for item in items if payload_size(item) >= self.min_item_bytes]
+        light = [item for item in items if payload_size(item) < self.min_item_bytes]
+
+        futures = []
+        if heavy:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                executor = self._executor
+            futures = [(batch, executor.submit(extract_batch, self.base_url, batch, self.aliases))
+                       for batch in self._balance(heavy)]
+
+        results = self._extract_inline(light)
+        for batch, future in futures:
+            try:
+                batch_results, stats = future.result()
+            except Exception as e:
+                logger.warning(f"Extraction worker failed ({e}) - extracting {len(batch)} items in-process")
+                results.extend(self._extract_inline(batch))
+                continue
+            results.extend(batch_results)
+            self._record(stats)
+        return results
+
+    def _extract_inline(self, payloads: List[ContentPayload]) -> List[ItemReferences]:
+        """Extract on the calling thread, recorded as the 'main' worker"""
+        if not payloads:
+            return []
+        start = time.perf_counter()
+        results = [extract_references(self.extractor, payload) for payload in payloads]
+        self._record({'worker': 'main', 'items': len(payloads),
+                      'bytes': sum(payload_size(payload) for payload in payloads),
+                      'seconds': time.perf_counter() - start})
+        return results
+
+    def _balance(self, payloads: List[ContentPayload]) -> List[List[ContentPayload]]:
+        """Split payloads into at most one batch per worker with similar HTML volume"""
+        batches = [[] for _ in range(min(self.workers, len(payloads)))]
+        loads = [0] * len(batches)
+        for payload in sorted(payloads, key=payload_size, reverse=True):
+            target = loads.index(min(loads))
+            batches[target].append(payload)
+            loads[target] += payload_size(payload)
+        return batches
+
+    def _record(self, stats: Dict):
+        """Accumulate one batch's counters under its worker"""
+        with self._lock:
+            totals = self.worker_stats.setdefault(stats['worker'], {'batches': 0, 'items': 0,
+                                                                    'bytes': 0, 'seconds': 0.0})
+            totals['batches'] += 1
+            totals['items'] += stats['items']
+            totals['bytes'] += stats['bytes']
+            totals['seconds'] += stats['seconds']
+
+    def stats(self) -> Dict:
+        """Per-worker items, HTML volume and MB/s for run results"""
+        workers = {}
+        with self._lock:
+            worker_stats = {worker: dict(totals) for worker, totals in self.worker_stats.items()}
+        for worker, totals in sorted(worker_stats.items()):
+            seconds = totals['seconds']
+            workers[worker] = dict(totals, seconds=round(seconds, 3),
+                                   mb_per_second=round(totals['bytes'] / 1024 / 1024 / seconds, 2)
+                                   if seconds > 0 else 0.0)
+        return {
+            'workers': self.workers,
+            'min_item_bytes': self.min_item_bytes,
+            'pooled_items': sum(totals['items'] for worker, totals in workers.items() if worker != 'main'),
+            'inline_items': workers.get('main', {}).get('items', 0),
+            'per_worker': workers
+        }
+
+    def close(self):
+        """Shut the worker processes down"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> 'ExtractionPool':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,784 @@
+#!/usr/bin/env python3
+"""
+Fake WordPress REST Server
+In-process stand-in for the WordPress REST routes used by the cleanup
+scripts, so changes can be exercised without touching a live site.
+Generated libraries are built on access, so 1M-attachment sites fit in
+memory; latency and error rates can be injected for benchmarks
+
+Australian English version
+"""
+
+import gzip
+import json
+import math
+import random
+import re
+import threading
+import time
+import xmlrpc.client
+from collections.abc import MutableMapping
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+MEDIA_ROUTE = re.compile(r'^/wp-json/wp/v2/media/(\d+)/?$')
+ITEM_ROUTE = re.compile(r'^/wp-json/wp/v2/([a-z0-9_-]+)/(\d+)/?$')
+COLLECTION_ROUTE = re.compile(r'^/wp-json/wp/v2/([a-z0-9_-]+)/?$')
+TYPES_ROUTE = '/wp-json/wp/v2/types'
+UPLOAD_ROUTE = re.compile(r'^/wp-content/uploads/\d{4}/\d{2}/image-(\d+)(-\d+x\d+)?\.jpg$')
+# Where files uploaded through POST /wp/v2/media land
+UPLOAD_FOLDER = '2026/10'
+
+# Post type slug -> REST base for the content collections the fake serves
+CONTENT_TYPES = {'post': 'posts', 'page': 'pages', 'product': 'products', 'wp_block': 'blocks'}
+BATCH_ROUTE = '/wp-json/batch/v1'
+XMLRPC_ROUTE = '/xmlrpc.php'
+BATCH_MAX_ITEMS = 25
+
+# Fields every generated item shares, so filters need not build the item
+GENERATED_DATE = '2025-07-01T09:00:00'
+MEDIA_DEFAULTS = {'date': GENERATED_DATE, 'modified': GENERATED_DATE, 'media_type': 'image'}
+CONTENT_DEFAULTS = {'date': GENERATED_DATE, 'modified': GENERATED_DATE, 'status': 'publish'}
+
+# Body copy for realistic posts (~2.5 KB of HTML each with the figures)
+LOREM = ("Sydney-based teams rely on the library for campaign imagery, product shots and "
+         "partner logos. Each article mixes block-editor figures, lazy-loaded images, "
+         "external stock photos and embedded video, as a typical content site does. ")
+
+class GeneratedCollection(MutableMapping):
+    """ID -> item mapping whose generated items are built on access
+
+    IDs in ids come from factory(id) until deleted or replaced; assigned
+    items are stored as given. Generated items are fresh dicts, so edit
+    one by assigning a changed copy. generation changes on every add or
+    delete, so cached query results know when to refresh.
+    """
+
+    def __init__(self, factory: Optional[Callable[[int], Dict]] = None, ids: range = range(0),
+                 defaults: Optional[Dict] = None):
+        self.factory = factory
+        self.ids = ids
+        self.defaults = defaults or {}
+        self.stored = {}
+        self.deleted = set()
+        self.generation = 0
+
+    def __getitem__(self, item_id: int) -> Dict:
+        if item_id in self.stored:
+            return self.stored[item_id]
+        if item_id in self.ids and item_id not in self.deleted:
+            return self.factory(item_id)
+        raise KeyError(item_id)
+
+    def __setitem__(self, item_id: int, item: Dict):
+        self.stored[item_id] = item
+        self.deleted.discard(item_id)
+        self.generation += 1
+
+    def __delitem__(self, item_id: int):
+        if item_id not in self:
+            raise KeyError(item_id)
+        self.stored.pop(item_id, None)
+        if item_id in self.ids:
+            self.deleted.add(item_id)
+        self.generation += 1
+
+    def __contains__(self, item_id) -> bool:
+        return item_id in self.stored or (item_id in self.ids and item_id not in self.deleted)
+
+    def __iter__(self):
+        for item_id in self.ids:
+            if item_id not in self.deleted:
+                yield item_id
+        for item_id in list(self.stored):
+            if item_id not in self.ids:
+                yield item_id
+
+    def __len__(self) -> int:
+        return len(self.ids) - len(self.deleted) + sum(1 for item_id in self.stored if item_id not in self.ids)
+
+    def field(self, item_id: int, name: str):
+        """One field of an item, without building generated items for shared fields"""
+        if item_id in self.stored or name not in self.defaults:
+            return self[item_id].get(name)
+        return self.defaults[name]
+
+class FakeWordPressSite:
+    """In-memory media library and published content
+
+    Every other image is used: posts embed even-numbered images and pages
+    use them as featured images; products and reusable blocks reference
+    odd-numbered images through meta, ACF fields and block attributes.
+    html='realistic' gives posts full article markup around the same
+    references. latency (seconds, +/- half) and error_rate (share of REST
+    requests answered 503) are applied by the request handler.
+    """
+
+    def __init__(self, media_count: int = 200, post_count: int = 100, page_count: int = 10,
+                 batch_enabled: bool = True, host: str = '127.0.0.1', product_count: int = 0,
+                 html: str = 'minimal', latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.batch_enabled = batch_enabled
+        self.host = host
+        self.html = html
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_log = []
+        self.media_count = media_count
+        self._query_cache = {}
+
+        # Subsite URLs wp.getUsersBlogs lists when this fakes a multisite network
+        self.network_sites = []
+
+        # False answers batched media DELETEs with rest_batch_not_allowed, as
+        # sites whose media route is not registered for batching do
+        self.batch_media_delete = True
+
+        # Files uploaded through POST /wp/v2/media (path -> size file bodies share the original's)
+        self.uploaded_files = {}
+
+        self.media = GeneratedCollection(self.media_item, range(1, media_count + 1), MEDIA_DEFAULTS)
+        next_id = media_count + 1
+        self.post_ids = range(next_id, next_id + post_count)
+        self.page_ids = range(self.post_ids.stop, self.post_ids.stop + page_count)
+        self.content = {
+            'posts': GeneratedCollection(self._generated_post, self.post_ids, CONTENT_DEFAULTS),
+            'pages': GeneratedCollection(self._generated_page, self.page_ids, CONTENT_DEFAULTS)
+        }
+        if product_count:
+            start = self.page_ids.stop
+            self.product_ids = range(start, start + 2 * product_count, 2)
+            self.block_ids = range(start + 1, start + 2 * product_count, 2)
+            self.content['products'] = GeneratedCollection(self._generated_product, self.product_ids,
+                                                           CONTENT_DEFAULTS)
+            self.content['blocks'] = GeneratedCollection(self._generated_block, self.block_ids,
+                                                         CONTENT_DEFAULTS)
+        self.next_id = (self.block_ids.stop if product_count else self.page_ids.stop) + 1
+
+    def _generated_post(self, content_id: int) -> Dict:
+        i = content_id - self.post_ids.start
+        media_id = (2 * i) % max(self.media_count, 1) + 2
+        if self.html == 'realistic':
+            html = self._article_html(i, media_id)
+        else:
+            html = (f'<p>Post {i}</p><img class="wp-image-{media_id}" '
+                    f'src="{self.upload_url(media_id, "-300x200")}" alt="">')
+        return self.content_item('posts', content_id, html)
+
+    def _generated_page(self, content_id: int) -> Dict:
+        i = content_id - self.page_ids.start
+        return self.content_item('pages', content_id, f'<p>Page {i}</p>', featured_media=2 * i + 4)
+
+    def _generated_product(self, content_id: int) -> Dict:
+        i = (content_id - self.product_ids.start) // 2
+        elementor_media = (4 * i) % max(self.media_count, 1) + 1
+        acf_media = (4 * i + 2) % max(self.media_count, 1) + 1
+        return self.content_item('products', content_id, f'<p>Product {i}</p>', meta={
+            '_elementor_data': json.dumps([{'id': 'a1b2c3', 'elType': 'widget', 'settings': {
+                'image': {'url': self.upload_url(elementor_media), 'id': elementor_media}}}])
+        }, acf={'product_gallery': [acf_media], 'price': 20})
+
+    def _generated_block(self, content_id: int) -> Dict:
+        i = (content_id - self.block_ids.start) // 2
+        block_media = (2 * i + self.media_count // 2) % max(self.media_count, 1) + 1
+        raw = (f'<!-- wp:kadence/image {{"id":{block_media},"sizeSlug":"large"}} /-->'
+               f'<!-- wp:paragraph --><p>Block {i}</p><!-- /wp:paragraph -->')
+        return self.content_item('blocks', content_id, f'<p>Block {i}</p>', raw=raw)
+
+    def _article_html(self, i: int, media_id: int) -> str:
+        """Block-editor article markup referencing media_id in several forms"""
+        srcset = ', '.join(f"{self.upload_url(media_id, suffix)} {width}w" for suffix, width in
+                           (('-1024x683', 1024), ('-300x200', 300), ('-768x512', 768), ('', 1200)))
+        return (f'<h2 class="wp-block-heading">Article {i}</h2><p>{LOREM * 2}</p>'
+                f'<figure class="wp-block-image size-large"><img loading="lazy" decoding="async" '
+                f'width="1024" height="683" src="{self.upload_url(media_id, "-1024x683")}" alt="" '
+                f'class="wp-image-{media_id}" srcset="{srcset}" sizes="(max-width: 1024px) 100vw, 1024px" />'
+                f'<figcaption class="wp-element-caption">Figure {i}</figcaption></figure>'
+                f'<p>{LOREM}<a href="https://example.org/reading/{i}">Further reading</a></p>'
+                f'<p><img src="https://cdn.example.net/stock/photo-{i % 500}.jpg" alt="Stock photo"></p>'
+                f'<div class="lazy-hero" data-src="{self.upload_url(media_id, "-768x512")}"></div>'
+                f'<figure class="wp-block-embed is-type-video"><div class="wp-block-embed__wrapper">'
+                f'<iframe src="https://www.youtube.com/embed/v{i % 97}" width="640" height="360"></iframe>'
+                f'</div></figure><p>{LOREM * 3}</p>')
+
+    def expected_unused(self) -> int:
+        """Unattached images no generated content references (additions ignored)"""
+        count = max(self.media_count, 1)
+        used = {(2 * i) % count + 2 for i in range(len(self.post_ids))}
+        used.update(2 * i + 4 for i in range(len(self.page_ids)))
+        for i in range(len(getattr(self, 'product_ids', ()))):
+            used.update(((4 * i) % count + 1, (4 * i + 2) % count + 1,
+                         (2 * i + self.media_count // 2) % count + 1))
+        return self.media_count - len(used & set(range(1, self.media_count + 1)))
+
+    def upload_url(self, media_id: int, suffix: str = '') -> str:
+        """Public URL of an upload or one of its size variants"""
+        return f"http://{self.host}/wp-content/uploads/2025/07/image-{media_id}{suffix}.jpg"
+
+    def add_media(self, media_id: int, modified: str = GENERATED_DATE, post: int = 0):
+        """Add an image attachment"""
+        with self.lock:
+            self.media[media_id] = self.media_item(media_id, modified, post)
+
+    def media_item(self, media_id: int, modified: str = GENERATED_DATE, post: int = 0) -> Dict:
+        """REST media object for an image attachment"""
+        return {
+            'id': media_id,
+            'date': GENERATED_DATE,
+            'modified': modified,
+            'title': {'rendered': f'Image {media_id}'},
+            'source_url': self.upload_url(media_id),
+            'post': post,
+            'mime_type': 'image/jpeg',
+            'media_type': 'image',
+            'alt_text': '',
+            'caption': {'rendered': ''},
+            'description': {'rendered': ''},
+            'meta': {},
+            'media_details': {
+                'filesize': 50_000 + media_id,
+                'sizes': {
+                    'thumbnail': {'file': f'image-{media_id}-150x150.jpg',
+                                  'source_url': self.upload_url(media_id, '-150x150')},
+                    'medium': {'file': f'image-{media_id}-300x200.jpg',
+                               'source_url': self.upload_url(media_id, '-300x200')}
+                }
+            }
+        }
+
+    def add_content(self, content_type: str, content_id: int, html: str,
+                    featured_media: int = 0, modified: str = GENERATED_DATE,
+                    raw: Optional[str] = None, meta: Optional[Dict] = None, acf: Optional[Dict] = None,
+                    status: str = 'publish'):
+        """Add a published content item (raw block markup defaults to the HTML)"""
+        with self.lock:
+            self.content[content_type][content_id] = self.content_item(
+                content_type, content_id, html, featured_media, modified, raw, meta, acf, status)
+
+    def content_item(self, content_type: str, content_id: int, html: str,
+                     featured_media: int = 0, modified: str = GENERATED_DATE,
+                     raw: Optional[str] = None, meta: Optional[Dict] = None, acf: Optional[Dict] = None,
+                     status: str = 'publish') -> Dict:
+        """REST object for a content item"""
+        return {
+            'id': content_id,
+            'date': GENERATED_DATE,
+            'modified': modified,
+            'status': status,
+            'type': content_type.rstrip('s'),
+            'featured_media': featured_media,
+            'title': {'rendered': f'{content_type} {content_id}'},
+            'link': f"http://{self.host}/?p={content_id}",
+            'content': {'rendered': html, 'raw': html if raw is None else raw},
+            'excerpt': {'rendered': ''},
+            'meta': meta or {},
+            'acf': acf or {}
+        }
+
+    def collection(self, name: str) -> Optional[Dict[int, Dict]]:
+        """Items of a REST collection keyed by ID (None for unknown routes)"""
+        return self.media if name == 'media' else self.content.get(name)
+
+    def types(self) -> Dict[str, Dict]:
+        """/wp/v2/types listing, including types the cleanup should skip"""
+        listing = {'attachment': {'slug': 'attachment', 'rest_base': 'media', 'rest_namespace': 'wp/v2'},
+                   'wp_template': {'slug': 'wp_template', 'rest_base': 'templates',
+                                   'rest_namespace': 'wp/v2'}}
+        for slug, rest_base in CONTENT_TYPES.items():
+            if rest_base in self.content:
+                listing[slug] = {'slug': slug, 'rest_base': rest_base, 'rest_namespace': 'wp/v2'}
+        return listing
+
+    def write_sql_dump(self, path: str, table_prefix: str = 'wp_', rows_per_insert: int = 100):
+        """Write the site as a mysqldump of wp_postmeta and wp_posts
+
+        Tables come in mysqldump's alphabetical order, so postmeta precedes
+        the posts it belongs to.
+        """
+        posts = []
+        postmeta = []
+        with self.lock:
+            media = list(self.media.values())
+            content = [(name, item) for name, items in self.content.items() for item in items.values()]
+
+        for item in media:
+            file = item['source_url'].split('/wp-content/uploads/', 1)[1]
+            posts.append((item['id'], item['date'], '', item['title']['rendered'], 'inherit',
+                          item['modified'], item['post'], item['source_url'], 'attachment', item['mime_type']))
+            metadata = {'width': 1200, 'height': 800, 'file': file, 'filesize': item['media_details']['filesize'],
+                        'sizes': {name: {'file': size['file'], 'width': 150, 'height': 150,
+                                         'mime-type': item['mime_type']}
+                                  for name, size in item['media_details']['sizes'].items()},
+                        'image_meta': {'caption': '', 'keywords': []}}
+            postmeta.append((item['id'], '_wp_attached_file', file))
+            postmeta.append((item['id'], '_wp_attachment_metadata', php_serialize(metadata)))
+            postmeta.append((item['id'], '_edit_lock', '1751360400:1'))
+
+        post_types = {rest_base: slug for slug, rest_base in CONTENT_TYPES.items()}
+        for name, item in content:
+            posts.append((item['id'], item['date'], item['content']['raw'], item['title']['rendered'],
+                          item['status'], item['modified'], 0, f"http://{self.host}/?p={item['id']}",
+                          post_types.get(name, name), ''))
+            if item['featured_media']:
+                postmeta.append((item['id'], '_thumbnail_id', str(item['featured_media'])))
+            for key, value in list(item['meta'].items()) + list(item['acf'].items()):
+                postmeta.append((item['id'], key, php_serialize(value)
+                                 if isinstance(value, (dict, list)) else str(value)))
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("-- MySQL dump 10.13  Distrib 8.0.36, for Linux (x86_64)\n\n")
+            f.write(f"CREATE TABLE `{table_prefix}postmeta` (\n  `meta_id` bigint unsigned NOT NULL AUTO_INCREMENT,\n"
+                    "  `post_id` bigint unsigned NOT NULL DEFAULT '0',\n  `meta_key` varchar(255) DEFAULT NULL,\n"
+                    "  `meta_value` longtext,\n  PRIMARY KEY (`meta_id`)\n) ENGINE=InnoDB;\n")
+            rows = [(meta_id, post_id, key, value) for meta_id, (post_id, key, value) in enumerate(postmeta, 1)]
+            _write_inserts(f, f"{table_prefix}postmeta", rows, rows_per_insert)
+
+            f.write(f"CREATE TABLE `{table_prefix}posts` (\n  `ID` bigint unsigned NOT NULL AUTO_INCREMENT,\n")
+            columns = ('post_date', 'post_content', 'post_title', 'post_excerpt', 'post_status',
+                       'post_modified', 'post_parent', 'guid', 'post_type', 'post_mime_type')
+            for column in columns:
+                f.write(f"  `{column}` longtext NOT NULL,\n")
+            f.write("  PRIMARY KEY (`ID`)\n) ENGINE=InnoDB;\n")
+            rows = [(post_id, date.replace('T', ' '), body, title, '', status, modified.replace('T', ' '),
+                     parent, guid, post_type, mime_type)
+                    for post_id, date, body, title, status, modified, parent, guid, post_type, mime_type in posts]
+            _write_inserts(f, f"{table_prefix}posts", rows, rows_per_insert)
+
+    def upload_media(self, filename: str, body: bytes, mime_type: str, fields: Dict[str, str]) -> Tuple[int, Dict]:
+        """Create an attachment from an uploaded file, as POST /wp/v2/media does"""
+        if not filename or not body:
+            return 400, {'code': 'rest_upload_no_data', 'message': 'No data supplied.', 'data': {'status': 400}}
+        with self.lock:
+            while self.next_id in self.media or any(self.next_id in items for items in self.content.values()):
+                self.next_id += 1
+            media_id = self.next_id
+            self.next_id += 1
+            stem, _, extension = filename.rpartition('.')
+            path = f"/wp-content/uploads/{UPLOAD_FOLDER}/{filename}"
+            while path in self.uploaded_files:
+                stem += '-1'
+                filename = f"{stem}.{extension}"
+                path = f"/wp-content/uploads/{UPLOAD_FOLDER}/{filename}"
+            directory = f"http://{self.host}/wp-content/uploads/{UPLOAD_FOLDER}"
+            sizes = {}
+            for size, dimensions in (('thumbnail', '150x150'), ('medium', '300x200')):
+                size_file = f"{stem}-{dimensions}.{extension}"
+                sizes[size] = {'file': size_file, 'source_url': f"{directory}/{size_file}"}
+                self.uploaded_files[path.rsplit('/', 1)[0] + '/' + size_file] = body
+            self.uploaded_files[path] = body
+            item = dict(self.media_item(media_id, datetime.now().isoformat(timespec='seconds')),
+                        title={'rendered': fields.get('title', stem)}, source_url=f"{directory}/{filename}",
+                        mime_type=mime_type, alt_text=fields.get('alt_text', ''),
+                        caption={'rendered': fields.get('caption', '')},
+                        description={'rendered': fields.get('description', '')},
+                        media_details={'filesize': len(body), 'sizes': sizes})
+            self.media[media_id] = item
+        return 201, item
+
+    def update_content(self, name: str, content_id: int, body: Dict) -> Tuple[int, Dict]:
+        """Update a content item's markup and featured image, as POST /wp/v2/<type>/<id> does"""
+        with self.lock:
+            items = self.content.get(name)
+            if items is None or content_id not in items:
+                return 404, {'code': 'rest_post_invalid_id', 'message': 'Invalid post ID.',
+                             'data': {'status': 404}}
+            item = dict(items[content_id], modified=datetime.now().isoformat(timespec='seconds'))
+            if 'content' in body:
+                raw = body['content']['raw'] if isinstance(body['content'], dict) else body['content']
+                item['content'] = {'rendered': re.sub(r'<!--.*?-->', '', raw, flags=re.DOTALL), 'raw': raw}
+            if 'featured_media' in body:
+                item['featured_media'] = int(body['featured_media'])
+            items[content_id] = item
+        return 200, item
+
+    def delete_media(self, media_id: int) -> Tuple[int, Dict]:
+        """Permanently delete an attachment"""
+        with self.lock:
+            item = self.media.pop(media_id, None)
+        if item is None:
+            return 404, {'code': 'rest_post_invalid_id', 'message': 'Invalid post ID.',
+                         'data': {'status': 404}}
+        return 200, {'deleted': True, 'previous': item}
+
+def php_serialize(value) -> str:
+    """PHP serialize() for the JSON-like values the fake stores"""
+    if value is None:
+        return 'N;'
+    if isinstance(value, bool):
+        return f"b:{int(value)};"
+    if isinstance(value, int):
+        return f"i:{value};"
+    if isinstance(value, str):
+        return f's:{len(value.encode("utf-8"))}:"{value}";'
+    items = value.items() if isinstance(value, dict) else enumerate(value)
+    body = ''.join(php_serialize(key) + php_serialize(child) for key, child in items)
+    return f"a:{len(value)}:{{{body}}}"
+
+def sql_literal(value) -> str:
+    """A mysqldump-escaped SQL literal"""
+    if isinstance(value, int):
+        return str(value)
+    escaped = (value.replace('\\', '\\\\').replace("'", "\\'")
+               .replace('\n', '\\n').replace('\r', '\\r'))
+    return f"'{escaped}'"
+
+def _write_inserts(f, table: str, rows: List[Tuple], rows_per_insert: int):
+    """Extended INSERT statements, one per line, as mysqldump writes them"""
+    for start in range(0, len(rows), rows_per_insert):
+        values = ','.join('(' + ','.join(sql_literal(value) for value in row) + ')'
+                          for row in rows[start:start + rows_per_insert])
+        f.write(f"INSERT INTO `{table}` VALUES {values};\n")
+
+# Parameters that change which items a listing holds, or their order
+LISTING_PARAMS = ('modified_after', 'status', 'media_type', 'orderby', 'order')
+
+def listing_ids(collection: GeneratedCollection, query: Dict[str, str]) -> List[int]:
+    """Sorted IDs matching the query's filters (include= is handled by the caller)"""
+    ids = iter(collection)
+    if 'modified_after' in query:
+        ids = (item_id for item_id in ids if collection.field(item_id, 'modified') > query['modified_after'])
+    if 'status' in query and query['status'] != 'any':
+        statuses = set(query['status'].split(',')) | {'inherit'}
+        ids = (item_id for item_id in ids if (collection.field(item_id, 'status') or 'inherit') in statuses)
+    elif 'status' in query:
+        ids = (item_id for item_id in ids if collection.field(item_id, 'status') != 'trash')
+    if query.get('media_type'):
+        ids = (item_id for item_id in ids
+               if collection.field(item_id, 'media_type') in (None, query['media_type']))
+
+    orderby = query.get('orderby', 'date')
+    key = {'id': 'id', 'modified': 'modified', 'include': 'id'}.get(orderby, 'date')
+    reverse = query.get('order', 'desc') == 'desc'
+    if key == 'id':
+        return sorted(ids, reverse=reverse)
+    return sorted(ids, key=lambda item_id: (collection.field(item_id, key), item_id), reverse=reverse)
+
+def query_collection(site: 'FakeWordPressSite', collection: GeneratedCollection,
+                     query: Dict[str, str]) -> Tuple[List[Dict], int, int]:
+    """Apply WordPress collection parameters, returning (page, total, total_pages)
+
+    Filtered listings are cached until the collection changes, and only the
+    requested page of items is built.
+    """
+    with site.lock:
+        if 'include' in query:
+            wanted = {int(value) for value in query['include'].split(',') if value.strip().isdigit()}
+            subset = GeneratedCollection()
+            subset.stored = {item_id: collection[item_id] for item_id in wanted if item_id in collection}
+            ids = listing_ids(subset, query)
+            lookup = subset
+        else:
+            cache_key = (id(collection), tuple(query.get(name) for name in LISTING_PARAMS))
+            cached = site._query_cache.get(cache_key)
+            if cached is None or cached[0] != collection.generation:
+                cached = (collection.generation, listing_ids(collection, query))
+                site._query_cache[cache_key] = cached
+            ids = cached[1]
+            lookup = collection
+
+        per_page = min(int(query.get('per_page', 10)), 100)
+        page = int(query.get('page', 1))
+        total = len(ids)
+        total_pages = max(1, math.ceil(total / per_page)) if total else 0
+        page_items = [lookup[item_id] for item_id in ids[(page - 1) * per_page:page * per_page]]
+
+    if query.get('context') != 'edit':
+        # Raw block markup is only returned in the edit context
+        page_items = [dict(item, content={'rendered': item['content']['rendered']})
+                      if 'content' in item else item for item in page_items]
+    if '_fields' in query:
+        fields = query['_fields'].split(',')
+        page_items = [filter_fields(item, fields) for item in page_items]
+
+    return page_items, total, total_pages
+
+def filter_fields(item: Dict, fields: List[str]) -> Dict:
+    """Apply a _fields list, including nested 'parent.child' entries"""
+    filtered = {}
+    for field in fields:
+        parent, _, child = field.strip().partition('.')
+        if parent not in item:
+            continue
+        if child and isinstance(item[parent], dict):
+            if child in item[parent]:
+                filtered.setdefault(parent, {})[child] = item[parent][child]
+        else:
+            filtered[parent] = item[parent]
+    return filtered
+
+class FakeWordPressHandler(BaseHTTPRequestHandler):
+    """Serves the subset of /wp-json routes the cleanup scripts call"""
+
+    site: FakeWordPressSite = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        if 'gzip' in self.headers.get('Accept-Encoding', '') and len(data) > 1024:
+            data = gzip.compress(data, compresslevel=5)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _parse(self) -> Tuple[str, Dict[str, str]]:
+        parsed = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        with self.site.lock:
+            self.site.request_log.append((self.command, parsed.path))
+        return parsed.path, query
+
+    def _injected_failure(self) -> bool:
+        """Apply the site's injected latency, answering 503 for its error rate"""
+        site = self.site
+        if site.latency:
+            time.sleep(site.latency * (0.5 + site.random.random()))
+        if site.error_rate and site.random.random() < site.error_rate:
+            self._send_json(503, {'code': 'service_unavailable', 'message': 'Injected failure.',
+                                  'data': {'status': 503}})
+            return True
+        return False
+
+    def _send_upload(self, path: str, include_body: bool):
+        """Serve an upload (original or size variant) while its attachment exists"""
+        match = UPLOAD_ROUTE.match(path)
+        with self.site.lock:
+            uploaded = self.site.uploaded_files.get(path)
+            exists = uploaded is not None or (bool(match) and int(match.group(1)) in self.site.media)
+        if not exists:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            return self.end_headers()
+        etag = f'"{path.rsplit("/", 1)[-1]}"' if uploaded is not None else f'"{match.group(1)}{match.group(2) or ""}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            return self.end_headers()
+        body = uploaded if uploaded is not None else b'\xff\xd8\xff\xe0' + b'\0' * 1020
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        path, _ = self._parse()
+        self._send_upload(path, include_body=False)
+
+    def do_GET(self):
+        path, query = self._parse()
+        if path.startswith('/wp-content/uploads/'):
+            return self._send_upload(path, include_body=True)
+        if self._injected_failure():
+            return
+        if path.rstrip('/') in ('/wp-json', '/wp-json/wp/v2'):
+            return self._send_json(200, {'namespace': 'wp/v2', 'routes': {}})
+        if path.rstrip('/') == TYPES_ROUTE:
+            return self._send_json(200, self.site.types())
+
+        match = MEDIA_ROUTE.match(path)
+        if match:
+            with self.site.lock:
+                item = self.site.media.get(int(match.group(1)))
+            if item is None:
+                return self._send_json(404, {'code': 'rest_post_invalid_id', 'data': {'status': 404}})
+            if '_fields' in query:
+                item = filter_fields(item, query['_fields'].split(','))
+            return self._send_json(200, item)
+
+        match = COLLECTION_ROUTE.match(path)
+        collection = self.site.collection(match.group(1)) if match else None
+        if collection is None:
+            return self._send_json(404, {'code': 'rest_no_route', 'data': {'status': 404}})
+
+        page_items, total, total_pages = query_collection(self.site, collection, query)
+        if total and int(query.get('page', 1)) > total_pages:
+            return self._send_json(400, {'code': 'rest_post_invalid_page_number',
+                                         'data': {'status': 400}})
+        self._send_json(200, page_items, {'X-WP-Total': str(total),
+                                          'X-WP-TotalPages': str(total_pages)})
+
+    def do_OPTIONS(self):
+        path, _ = self._parse()
+        if path == BATCH_ROUTE:
+            if not self.site.batch_enabled:
+                return self._send_json(404, {'code': 'rest_no_route', 'data': {'status': 404}})
+            return self._send_json(200, {
+                'namespace': 'batch/v1',
+                'methods': ['POST'],
+                'endpoints': [{'methods': ['POST'], 'args': {
+                    'validation': {'type': 'string', 'enum': ['require-all-validate', 'normal'],
+                                   'default': 'normal'},
+                    'requests': {'type': 'array', 'maxItems': BATCH_MAX_ITEMS, 'required': True}
+                }}]
+            }, {'Allow': 'POST'})
+        self._send_json(200, {}, {'Allow': 'GET, POST, PUT, PATCH, DELETE'})
+
+    def do_DELETE(self):
+        path, _ = self._parse()
+        if self._injected_failure():
+            return
+        match = MEDIA_ROUTE.match(path)
+        if not match:
+            return self._send_json(404, {'code': 'rest_no_route', 'data': {'status': 404}})
+        status, body = self.site.delete_media(int(match.group(1)))
+        self._send_json(status, body)
+
+    def do_POST(self):
+        path, query = self._parse()
+        if path == XMLRPC_ROUTE:
+            return self._send_xmlrpc()
+        if path.rstrip('/') == '/wp-json/wp/v2/media':
+            if self._injected_failure():
+                return
+            return self._send_upload_media(query)
+        match = ITEM_ROUTE.match(path)
+        if match and match.group(1) != 'media':
+            if self._injected_failure():
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            status, body = self.site.update_content(match.group(1), int(match.group(2)),
+                                                    json.loads(self.rfile.read(length) or b'{}'))
+            return self._send_json(status, body)
+        if path != BATCH_ROUTE or not self.site.batch_enabled:
+            return self._send_json(404, {'code': 'rest_no_route', 'data': {'status': 404}})
+        if self._injected_failure():
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        requests = payload.get('requests', [])
+        if len(requests) > BATCH_MAX_ITEMS:
+            return self._send_json(400, {'code': 'rest_invalid_param', 'data': {'status': 400}})
+
+        responses = []
+        for sub_request in requests:
+            sub_path = urlparse(sub_request.get('path', '')).path
+            match = MEDIA_ROUTE.match('/wp-json' + sub_path)
+            item_match = ITEM_ROUTE.match('/wp-json' + sub_path)
+            if sub_request.get('method') == 'DELETE' and match and self.site.batch_media_delete:
+                status, body = self.site.delete_media(int(match.group(1)))
+            elif sub_request.get('method') == 'POST' and item_match and not match:
+                status, body = self.site.update_content(item_match.group(1), int(item_match.group(2)),
+                                                        sub_request.get('body') or {})
+            else:
+                status, body = 400, {'code': 'rest_batch_not_allowed',
+                                     'message': 'The requested route does not support batch requests.',
+                                     'data': {'status': 400}}
+            responses.append({'body': body, 'status': status, 'headers': {}})
+        self._send_json(207, {'responses': responses})
+
+    def _send_upload_media(self, query: Dict[str, str]):
+        """POST /wp/v2/media with the file as the raw body and fields as query parameters"""
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        match = re.search(r'filename="?([^";]+)"?', self.headers.get('Content-Disposition', ''))
+        status, item = self.site.upload_media(match.group(1) if match else '', body,
+                                              self.headers.get('Content-Type', 'application/octet-stream'), query)
+        self._send_json(status, item)
+
+    def _send_xmlrpc(self):
+        """wp.getUsersBlogs for the network's subsites; other methods fault"""
+        length = int(self.headers.get('Content-Length', 0))
+        _, method = xmlrpc.client.loads(self.rfile.read(length))
+        sites = [f"http://{self.site.host}"] + self.site.network_sites
+        if method == 'wp.getUsersBlogs':
+            blogs = [{'isAdmin': True, 'url': url + '/', 'blogid': str(blog_id), 'blogName': url,
+                      'xmlrpc': url + XMLRPC_ROUTE} for blog_id, url in enumerate(sites, 1)]
+            data = xmlrpc.client.dumps((blogs,), methodresponse=True)
+        else:
+            data = xmlrpc.client.dumps(xmlrpc.client.Fault(-32601, 'server error. requested method does not exist.'))
+        body = data.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class FakeHTTPServer(ThreadingHTTPServer):
+    """Threading server with a listen backlog deep enough for concurrent clients"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+class FakeWordPressServer:
+    """Runs a FakeWordPressSite on a background thread (usable as a context manager)
+
+    Keyword arguments are passed to FakeWordPressSite once the listening port
+    is known, so generated URLs point back at this server.
+    """
+
+    def __init__(self, port: int = 0, **site_options):
+        self.httpd = FakeHTTPServer(('127.0.0.1', port), FakeWordPressHandler)
+        self.site = FakeWordPressSite(host=f"127.0.0.1:{self.httpd.server_port}", **site_options)
+        self.httpd.RequestHandlerClass = type('BoundFakeWordPressHandler',
+                                              (FakeWordPressHandler,), {'site': self.site})
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.site.host}"
+
+    def start(self) -> 'FakeWordPressServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'FakeWordPressServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main():
+    """Serve a synthetic site until interrupted"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a fake WordPress REST API")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--media', type=int, default=200)
+    parser.add_argument('--posts', type=int, default=100)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--products', type=int, default=0,
+                        help="Products and reusable blocks referencing images via meta/block attributes")
+    parser.add_argument('--no-batch', action='store_true', help="Disable /wp-json/batch/v1")
+    parser.add_argument('--html', choices=('minimal', 'realistic'), default='minimal',
+                        help="Post markup: one image tag, or full articles with srcsets and embeds")
+    parser.add_argument('--latency', type=float, default=0.0, help="Mean seconds added to REST requests")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of REST requests answered 503")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for latency and error injection")
+    parser.add_argument('--dump', metavar='PATH', help="Write the site as a SQL dump and exit")
+    args = parser.parse_args()
+
+    server = FakeWordPressServer(port=args.port, media_count=args.media, post_count=args.posts,
+                                 page_count=args.pages, product_count=args.products,
+                                 batch_enabled=not args.no_batch, html=args.html, latency=args.latency,
+                                 error_rate=args.error_rate, seed=args.seed)
+    if args.dump:
+        server.site.write_sql_dump(args.dump)
+        print(f"🧪 Wrote a SQL dump of {args.media} images to {args.dump}")
+        return server.httpd.server_close()
+    server.start()
+    print(f"🧪 Fake WordPress serving {args.media} images at {server.base_url}", flush=True)
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
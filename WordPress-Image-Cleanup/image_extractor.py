@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+HTML Image Reference Extractor
+Single-pass scan of rendered post HTML for every way WordPress content
+points at an upload: src, srcset, lazy-load data attributes, <picture>
+sources, inline CSS url(), wp-image-<id> classes and gallery shortcodes,
+plus the canonical key every size variant of an upload shares
+
+Australian English version
+"""
+
+import re
+from typing import Iterable, Optional, Set, Tuple
+
+# WordPress size/edit suffixes that sit between the file name and extension
+# e.g. photo-300x200.jpg, photo-scaled.jpg, photo-rotated-1024x768.jpg
+VARIANT_SUFFIX_PATTERN = re.compile(r'(?:-\d+x\d+|-scaled|-rotated)+(?=\.[A-Za-z0-9]+$)')
+
+# Path component of an absolute, protocol-relative or root-relative URL
+URL_PATH_PATTERN = re.compile(r'^\s*(?:[A-Za-z][A-Za-z0-9+.\-]*:)?(?://[^/?#]*)?([^?#]*)')
+
+def canonical_image_key(url: str) -> str:
+    """Normalise an image URL to the key shared by all its size variants
+
+    Scheme, host (including www. aliases), query strings and fragments are
+    dropped and WordPress size suffixes are stripped, so every variant of an
+    upload maps to the same key. The function is idempotent.
+    """
+    path = URL_PATH_PATTERN.match(url).group(1).rstrip()
+    return VARIANT_SUFFIX_PATTERN.sub('', path)
+
+# One alternation so each document is scanned once. Attribute values are
+# URLs (srcset-style lists are split later); the class and shortcode
+# branches yield media IDs directly. The leading lookahead lets the regex
+# engine skip quickly past characters no branch can start with.
+REFERENCE_PATTERN = re.compile(
+    r"""(?=[sdwu\[])(?:
+        (?:(?:data-(?:lazy-)?)?src(?:set)?|data-(?:orig-file|large-file|full-url))
+            \s*=\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)')
+      | url\(\s*(?:&quot;|["'])?(?P<css>[^)"'&]+)
+      | wp-image-(?P<class_id>\d+)
+      | \[gallery[^\]]*?\bids\s*=\s*["']?(?P<gallery>[\d,\s]+)
+    )""",
+    re.IGNORECASE | re.VERBOSE)
+
+# Host of an absolute or protocol-relative URL
+ABSOLUTE_URL_PATTERN = re.compile(r'^(?:https?:)?//([^/?#]+)', re.IGNORECASE)
+
+# Bare URLs in plain text or JSON values, where there is no attribute to anchor on
+TEXT_URL_PATTERN = re.compile(r'(?:https?:)?//[^\s"\'<>()\\,]+|/wp-content/[^\s"\'<>()\\,]+',
+                              re.IGNORECASE)
+
+class ImageExtractor:
+    """Extracts same-site image URLs and media IDs from HTML
+
+    The base host is parsed once; the www. and bare forms of the host are
+    treated as the same site, as are the hosts of any alias URLs (e.g.
+    production URLs left in a staging copy's content). With any_host,
+    absolute URLs on every other host (CDNs, embeds) are kept too.
+    """
+
+    def __init__(self, base_url: str, aliases: Iterable[str] = (), any_host: bool = False):
+        self.base_url = base_url.rstrip('/')
+        self.aliases = tuple(aliases)
+        self.any_host = any_host
+        self.hosts = set()
+        for url in (self.base_url,) + self.aliases:
+            match = ABSOLUTE_URL_PATTERN.match(url)
+            host = match.group(1).lower() if match else ''
+            bare_host = host[4:] if host.startswith('www.') else host
+            if host:
+                self.hosts.update((host, bare_host, f"www.{bare_host}"))
+        # Same-site URL prefixes, checked with one str.startswith call
+        self._prefixes = tuple(f"{scheme}//{name}/" for name in self.hosts
+                               for scheme in ('https:', 'http:', ''))
+
+    def extract(self, html_content: str) -> Tuple[Set[str], Set[int]]:
+        """Image URLs on this site and directly referenced media IDs"""
+        images = set()
+        media_ids = set()
+        if not html_content:
+            return images, media_ids
+
+        same_site_url = self._same_site_url
+        for match in REFERENCE_PATTERN.finditer(html_content):
+            kind = match.lastgroup
+            value = match.group(kind)
+
+            if kind == 'class_id':
+                media_ids.add(int(value))
+            elif kind == 'gallery':
+                for gallery_id in value.split(','):
+                    gallery_id = gallery_id.strip()
+                    if gallery_id.isdigit():
+                        media_ids.add(int(gallery_id))
+            elif ',' in value:
+                # srcset-style list: "url 300w, url 768w"
+                for candidate in value.split(','):
+                    url = same_site_url(candidate)
+                    if url:
+                        images.add(url)
+            else:
+                url = same_site_url(value)
+                if url:
+                    images.add(url)
+
+        return images, media_ids
+
+    def extract_text(self, text: str) -> Set[str]:
+        """Same-site URLs appearing bare in text such as meta values or JSON"""
+        images = set()
+        for candidate in TEXT_URL_PATTERN.findall(text):
+            url = self._same_site_url(candidate)
+            if url:
+                images.add(url)
+        return images
+
+    def _same_site_url(self, candidate: str) -> Optional[str]:
+        """Absolute URL for a reference on this site, or None"""
+        parts = candidate.split()
+        if not parts:
+            return None
+        url = parts[0]
+        if url.startswith(self._prefixes):
+            return url
+        if url[:1] == '/' and url[1:2] != '/':
+            return self.base_url + url
+        # Slow path for unusual host casing and other hosts
+        match = ABSOLUTE_URL_PATTERN.match(url)
+        if match and (self.any_host or match.group(1).lower() in self.hosts):
+            return url
+        return None
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Run Instrumentation
+Phase timers and per-endpoint request statistics for run_cleanup, with
+optional Prometheus textfile, JSON trace and cProfile output
+
+Australian English version
+"""
+
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+# Phases worth profiling: CPU-bound parsing and matching rather than waiting on HTTP
+PROFILED_PHASES = ('identification', 'content_scan', 'sql_dump')
+
+NUMERIC_SEGMENT = re.compile(r'/\d+(?=/|$)')
+LATENCY_QUANTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))
+METRIC_PREFIX = 'wp_image_cleanup'
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0 when empty)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def endpoint_name(method: str, url: str) -> str:
+    """'GET /wp/v2/media' style label, with numeric IDs collapsed to {id}"""
+    path = urlparse(url).path
+    if '/wp-json' in path:
+        path = path.split('/wp-json', 1)[1]
+    return f"{method} {NUMERIC_SEGMENT.sub('/{id}', path.rstrip('/')) or '/'}"
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Instrumentation:
+    """Thread-safe phase timings and per-endpoint request statistics for one run
+
+    Phases may nest and run concurrently (content types are scanned in
+    parallel); each keeps its total seconds and call count, and every
+    occurrence is kept as a trace event. With profile_dir set, phases
+    named in profile_phases (matched on the part before any ':') are run
+    under cProfile, one at a time, and dumped as .prof files.
+    """
+
+    def __init__(self, profile_dir: Optional[str] = None, profile_phases=PROFILED_PHASES):
+        self.profile_dir = profile_dir
+        self.profile_phases = tuple(profile_phases)
+        self.started = time.time()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+        self.phases = {}
+        self.endpoints = {}
+        self.profiles = []
+        self._events = []
+        self._latencies = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block of work as the named phase"""
+        profiler = self._start_profile(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            if profiler is not None:
+                self._finish_profile(name, profiler)
+            with self._lock:
+                stats = self.phases.setdefault(name, {'seconds': 0.0, 'calls': 0})
+                stats['seconds'] += end - start
+                stats['calls'] += 1
+                self._events.append((name, start - self._origin, end - start, threading.current_thread().name))
+
+    def _start_profile(self, name: str) -> Optional[cProfile.Profile]:
+        """A running profiler for this phase, if it is profiled and none is active"""
+        if not self.profile_dir or name.split(':', 1)[0] not in self.profile_phases:
+            return None
+        if not self._profile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _finish_profile(self, name: str, profiler: cProfile.Profile):
+        profiler.disable()
+        self._profile_lock.release()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        filename = os.path.join(self.profile_dir, f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}.prof")
+        profiler.dump_stats(filename)
+        with self._lock:
+            self.profiles.append(filename)
+
+    def record_request(self, endpoint: str, status: Optional[int], seconds: float, wire_bytes: int = 0):
+        """Count one request (status None for a connection error) against its endpoint"""
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {'requests': 0, 'bytes': 0, 'status_codes': {}})
+            stats['requests'] += 1
+            stats['bytes'] += wire_bytes
+            code = str(status) if status is not None else 'error'
+            stats['status_codes'][code] = stats['status_codes'].get(code, 0) + 1
+            self._latencies.setdefault(endpoint, []).append(seconds)
+
+    def summary(self) -> Dict:
+        """Phases and endpoint statistics (with latency percentiles) for run results"""
+        with self._lock:
+            phases = {name: {'seconds': round(stats['seconds'], 3), 'calls': stats['calls']}
+                      for name, stats in self.phases.items()}
+            endpoints = {}
+            for endpoint, stats in self.endpoints.items():
+                latencies = sorted(self._latencies[endpoint])
+                endpoints[endpoint] = dict(
+                    stats, status_codes=dict(stats['status_codes']),
+                    latency_ms={label: round(percentile(latencies, fraction) * 1000, 1)
+                                for label, fraction in LATENCY_QUANTILES},
+                    seconds=round(sum(latencies), 3))
+        return {'phases': phases, 'endpoints': endpoints, 'profiles': list(self.profiles),
+                'seconds': round(time.perf_counter() - self._origin, 3)}
+
+    def write_prometheus(self, filename: str, site: str) -> str:
+        """Write a node_exporter textfile (replaced atomically, as the collector expects)"""
+        summary = self.summary()
+        site_label = f'site="{_label(site)}"'
+        lines = [f"# HELP {METRIC_PREFIX}_phase_seconds Wall time spent in each cleanup phase",
+                 f"# TYPE {METRIC_PREFIX}_phase_seconds gauge"]
+        for name, stats in summary['phases'].items():
+            lines.append(f'{METRIC_PREFIX}_phase_seconds{{{site_label},phase="{_label(name)}"}} {stats["seconds"]}')
+
+        lines += [f"# HELP {METRIC_PREFIX}_requests_total REST requests by endpoint and status code",
+                  f"# TYPE {METRIC_PREFIX}_requests_total counter"]
+        for endpoint, stats in summary['endpoints'].items():
+            for code, count in stats['status_codes'].items():
+                lines.append(f'{METRIC_PREFIX}_requests_total{{{site_label},endpoint="{_label(endpoint)}",'
+                             f'code="{code}"}} {count}')
+
+        lines += [f"# HELP {METRIC_PREFIX}_response_bytes_total Bytes received by endpoint",
+                  f"# TYPE {METRIC_PREFIX}_response_bytes_total counter"]
+        for endpoint, stats in summary['endpoints'].items():
+            lines.append(f'{METRIC_PREFIX}_response_bytes_total{{{site_label},endpoint="{_label(endpoint)}"}} '
+                         f'{stats["bytes"]}')
+
+        lines += [f"# HELP {METRIC_PREFIX}_request_seconds Request latency by endpoint",
+                  f"# TYPE {METRIC_PREFIX}_request_seconds summary"]
+        for endpoint, stats in summary['endpoints'].items():
+            labels = f'{site_label},endpoint="{_label(endpoint)}"'
+            for label, fraction in LATENCY_QUANTILES[:-1]:
+                lines.append(f'{METRIC_PREFIX}_request_seconds{{{labels},quantile="{fraction}"}} '
+                             f'{stats["latency_ms"][label] / 1000}')
+            lines.append(f'{METRIC_PREFIX}_request_seconds_sum{{{labels}}} {stats["seconds"]}')
+            lines.append(f'{METRIC_PREFIX}_request_seconds_count{{{labels}}} {stats["requests"]}')
+
+        lines += [f"# HELP {METRIC_PREFIX}_last_run_timestamp_seconds When the run started",
+                  f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge",
+                  f"{METRIC_PREFIX}_last_run_timestamp_seconds{{{site_label}}} {round(self.started, 3)}"]
+
+        temporary = f"{filename}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temporary, filename)
+        return filename
+
+    def write_trace(self, filename: str, site: str) -> str:
+        """Write phases as Trace Event JSON (chrome://tracing, Perfetto) plus the summary"""
+        with self._lock:
+            events = list(self._events)
+        threads = {}
+        trace_events = []
+        for name, start, duration, thread in sorted(events, key=lambda event: event[1]):
+            tid = threads.setdefault(thread, len(threads) + 1)
+            trace_events.append({'name': name, 'cat': 'phase', 'ph': 'X', 'pid': 1, 'tid': tid,
+                                 'ts': round(start * 1e6), 'dur': round(duration * 1e6)})
+        trace_events += [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': thread}}
+                         for thread, tid in threads.items()]
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms',
+                       'metadata': {'site': site, 'started': time.strftime('%Y-%m-%dT%H:%M:%S',
+                                                                           time.localtime(self.started)),
+                                    'summary': self.summary()}}, f, indent=2)
+        return filename
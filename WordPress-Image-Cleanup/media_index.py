@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Persistent Media/Usage Index
+SQLite store of media records, content items and the image keys each
+content item references, so cleanup runs can sync incrementally
+
+Australian English version
+"""
+
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    id INTEGER PRIMARY KEY,
+    modified TEXT NOT NULL DEFAULT '',
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS content (
+    content_type TEXT NOT NULL,
+    content_id INTEGER NOT NULL,
+    modified TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (content_type, content_id)
+);
+CREATE TABLE IF NOT EXISTS content_refs (
+    content_type TEXT NOT NULL,
+    content_id INTEGER NOT NULL,
+    image_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_content_refs_item ON content_refs (content_type, content_id);
+CREATE INDEX IF NOT EXISTS idx_content_refs_key ON content_refs (image_key);
+CREATE TABLE IF NOT EXISTS content_media (
+    content_type TEXT NOT NULL,
+    content_id INTEGER NOT NULL,
+    media_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_content_media_item ON content_media (content_type, content_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    endpoint TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL,
+    synced_at TEXT NOT NULL
+);
+"""
+
+# Bumped whenever stored content references change shape or extraction
+# finds more of them; older indexes have their content watermarks reset
+# so every item is re-extracted
+SCHEMA_VERSION = 4
+
+class MediaIndex:
+    """SQLite-backed index of the media library and content image usage"""
+
+    def __init__(self, path: str = 'image_cleanup.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        self.conn.executescript(SCHEMA)
+        if version < SCHEMA_VERSION:
+            self.conn.execute("DELETE FROM sync_state WHERE endpoint != 'media'")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def close(self):
+        """Close the underlying database connection"""
+        self.conn.close()
+
+    # Sync watermarks
+
+    def get_watermark(self, endpoint: str) -> Optional[str]:
+        """Latest 'modified' timestamp synced for an endpoint"""
+        row = self.conn.execute("SELECT watermark FROM sync_state WHERE endpoint = ?",
+                                (endpoint,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, endpoint: str, watermark: str):
+        """Store the sync watermark for an endpoint"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sync_state (endpoint, watermark, synced_at) VALUES (?, ?, ?)",
+            (endpoint, watermark, datetime.now().isoformat()))
+        self.conn.commit()
+
+    # Media records
+
+    def upsert_media(self, records: Iterable[Dict]):
+        """Insert or replace media records"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO media (id, modified, record) VALUES (?, ?, ?)",
+            ((record['id'], record.get('modified', ''), json.dumps(record, ensure_ascii=False))
+             for record in records))
+        self.conn.commit()
+
+    def remove_media(self, media_ids: Iterable[int]):
+        """Drop media that no longer exist in WordPress"""
+        self.conn.executemany("DELETE FROM media WHERE id = ?",
+                              ((media_id,) for media_id in media_ids))
+        self.conn.commit()
+
+    def media_ids(self) -> Set[int]:
+        """IDs of all indexed media"""
+        return {row[0] for row in self.conn.execute("SELECT id FROM media")}
+
+    def load_media(self) -> Dict[int, Dict]:
+        """Load every indexed media record keyed by ID"""
+        return {record['id']: record for record in self.iter_media()}
+
+    def iter_media(self) -> Iterator[Dict]:
+        """Stream indexed media records one at a time"""
+        for row in self.conn.execute("SELECT record FROM media"):
+            yield json.loads(row[0])
+
+    # Content items and their image references
+
+    def upsert_content(self, content_type: str, items: Iterable[Tuple[int, str, Set[str], Set[int]]]):
+        """Store content items as (id, modified, image keys, media IDs), replacing old references"""
+        for content_id, modified, image_keys, media_ids in items:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO content (content_type, content_id, modified) VALUES (?, ?, ?)",
+                (content_type, content_id, modified))
+            self.conn.execute(
+                "DELETE FROM content_refs WHERE content_type = ? AND content_id = ?",
+                (content_type, content_id))
+            self.conn.executemany(
+                "INSERT INTO content_refs (content_type, content_id, image_key) VALUES (?, ?, ?)",
+                ((content_type, content_id, image_key) for image_key in image_keys))
+            self.conn.execute(
+                "DELETE FROM content_media WHERE content_type = ? AND content_id = ?",
+                (content_type, content_id))
+            self.conn.executemany(
+                "INSERT INTO content_media (content_type, content_id, media_id) VALUES (?, ?, ?)",
+                ((content_type, content_id, media_id) for media_id in media_ids))
+        self.conn.commit()
+
+    def remove_content(self, content_type: str, content_ids: Iterable[int]):
+        """Drop content items that were deleted or unpublished"""
+        for content_id in content_ids:
+            self.conn.execute("DELETE FROM content WHERE content_type = ? AND content_id = ?",
+                              (content_type, content_id))
+            self.conn.execute("DELETE FROM content_refs WHERE content_type = ? AND content_id = ?",
+                              (content_type, content_id))
+            self.conn.execute("DELETE FROM content_media WHERE content_type = ? AND content_id = ?",
+                              (content_type, content_id))
+        self.conn.commit()
+
+    def content_ids(self, content_type: str) -> Set[int]:
+        """IDs of indexed content items of one type"""
+        return {row[0] for row in self.conn.execute(
+            "SELECT content_id FROM content WHERE content_type = ?", (content_type,))}
+
+    def used_keys(self) -> Set[str]:
+        """Every canonical image key referenced by indexed content"""
+        return {row[0] for row in self.conn.execute("SELECT DISTINCT image_key FROM content_refs")}
+
+    def used_media_ids(self) -> Set[int]:
+        """Every media ID referenced directly (featured images, galleries)"""
+        return {row[0] for row in self.conn.execute("SELECT DISTINCT media_id FROM content_media")}
+
+    def counts(self) -> Dict[str, int]:
+        """Row counts for reporting"""
+        return {
+            'media': self.conn.execute("SELECT COUNT(*) FROM media").fetchone()[0],
+            'content': self.conn.execute("SELECT COUNT(*) FROM content").fetchone()[0],
+            'references': self.conn.execute("SELECT COUNT(*) FROM content_refs").fetchone()[0],
+            'media_references': self.conn.execute("SELECT COUNT(*) FROM content_media").fetchone()[0]
+        }
+
+def latest_modified(items: List[Dict], current: Optional[str] = None) -> Optional[str]:
+    """Highest 'modified' timestamp among REST items (ISO strings sort correctly)"""
+    values = [item.get('modified', '') for item in items if item.get('modified')]
+    if current:
+        values.append(current)
+    return max(values) if values else None
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Compact Media Table
+Memory-lean storage for very large media libraries: slotted records with
+interned upload directories, and caption/description/meta loaded lazily
+only when something (e.g. reporting) asks for them
+
+Australian English version
+"""
+
+import sys
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Record keys exposed through the dict-style interface, in the order the
+# original 13-key media dicts used
+RECORD_KEYS = ('id', 'title', 'source_url', 'date', 'modified', 'post', 'file_size',
+               'mime_type', 'meta', 'alt_text', 'caption', 'description', 'sizes')
+
+# Large, rarely used fields fetched on demand through MediaTable.details_loader
+LAZY_KEYS = ('caption', 'description', 'meta')
+
+class MediaRecord:
+    """One attachment, readable like the original media dict
+
+    source_url is stored as an interned upload directory plus a file name,
+    so the thousands of records sharing a year/month folder share one
+    directory string. Size file names are packed into a single string.
+    """
+
+    __slots__ = ('id', 'title', 'directory', 'filename', 'date', 'modified', 'post',
+                 'file_size', 'mime_type', 'alt_text', '_sizes', '_table')
+
+    def __init__(self, table: 'MediaTable', media_id: int, title: str, source_url: str,
+                 date: str, modified: str, post: int, file_size: int, mime_type: str,
+                 alt_text: str, sizes: List[str]):
+        directory, _, filename = source_url.rpartition('/')
+        self.id = media_id
+        self.title = title
+        self.directory = sys.intern(directory)
+        self.filename = filename
+        self.date = date
+        self.modified = modified
+        self.post = post
+        self.file_size = file_size
+        self.mime_type = sys.intern(mime_type)
+        self.alt_text = alt_text
+        self._sizes = '\n'.join(size for size in sizes if size)
+        self._table = table
+
+    @property
+    def source_url(self) -> str:
+        return f"{self.directory}/{self.filename}" if self.directory else self.filename
+
+    @property
+    def sizes(self) -> List[str]:
+        return self._sizes.split('\n') if self._sizes else []
+
+    def __getitem__(self, key: str):
+        if key in LAZY_KEYS:
+            return self._table.details(self.id).get(key, {} if key == 'meta' else '')
+        if key not in RECORD_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return key in RECORD_KEYS
+
+    def keys(self):
+        return RECORD_KEYS
+
+    def to_dict(self, include_details: bool = False) -> Dict:
+        """Plain dict copy; lazy fields are only loaded when asked for"""
+        record = {key: getattr(self, key) for key in RECORD_KEYS if key not in LAZY_KEYS}
+        if include_details:
+            for key in LAZY_KEYS:
+                record[key] = self[key]
+        return record
+
+class MediaTable(dict):
+    """Media ID -> MediaRecord mapping with on-demand detail loading"""
+
+    def __init__(self, details_loader: Optional[Callable[[int], Dict]] = None):
+        super().__init__()
+        self.details_loader = details_loader
+        self._details = {}
+
+    def add(self, media_id: int, title: str = '', source_url: str = '', date: str = '',
+            modified: str = '', post: int = 0, file_size: int = 0, mime_type: str = '',
+            alt_text: str = '', sizes: Optional[List[str]] = None, **details) -> MediaRecord:
+        """Store one attachment; any caption/description/meta given are cached"""
+        record = MediaRecord(self, media_id, title, source_url, date, modified, post or 0,
+                             file_size or 0, mime_type or '', alt_text or '', sizes or [])
+        self[media_id] = record
+        cached = {key: details[key] for key in LAZY_KEYS if key in details}
+        if cached:
+            self._details[media_id] = cached
+        return record
+
+    def add_dict(self, record: Dict) -> MediaRecord:
+        """Store a record in the original media dict shape"""
+        fields = {key: record.get(key) for key in RECORD_KEYS if key != 'id' and key in record}
+        return self.add(record['id'], **fields)
+
+    def details(self, media_id: int) -> Dict:
+        """caption/description/meta for one attachment, loading them if needed"""
+        if media_id not in self._details:
+            loaded = {}
+            if self.details_loader is not None:
+                try:
+                    loaded = self.details_loader(media_id) or {}
+                except Exception:
+                    loaded = {}
+            self._details[media_id] = loaded
+        return self._details[media_id]
+
+    def records(self) -> Iterator[MediaRecord]:
+        return iter(self.values())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+WordPress Multisite Network Cleanup
+Dry-runs the image cleanup on every subsite of a multisite network at once.
+Subsites share a global pool of site workers, requests to each host are
+capped by a quota shared fairly between its subsites, and the results are
+aggregated into one per-site report.
+
+Australian English version
+"""
+
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from rate_limiter import AdaptiveRateLimiter
+from wordpress_image_cleanup import WordPressImageCleanup
+
+logger = logging.getLogger(__name__)
+
+class HostQuota:
+    """Caps concurrent requests to one host, shared fairly between its sites
+
+    When requests queue, a freed slot goes to the waiting site with the
+    fewest requests in flight (oldest request first on ties), so a subsite
+    with thousands of pages cannot starve its neighbours.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.peak = 0
+        self._condition = threading.Condition()
+        self._in_flight = {}
+        self._total = 0
+        self._waiting = {}  # ticket -> site
+        self._tickets = itertools.count()
+
+    def acquire(self, site: str):
+        """Block until this site may send one more request"""
+        with self._condition:
+            ticket = next(self._tickets)
+            self._waiting[ticket] = site
+            while self._total >= self.limit or self._next_ticket() != ticket:
+                self._condition.wait()
+            del self._waiting[ticket]
+            self._in_flight[site] = self._in_flight.get(site, 0) + 1
+            self._total += 1
+            self.peak = max(self.peak, self._total)
+            if self._waiting:
+                # The next waiter in line may also fit
+                self._condition.notify_all()
+
+    def release(self, site: str):
+        """Return a slot taken by acquire"""
+        with self._condition:
+            self._in_flight[site] -= 1
+            self._total -= 1
+            self._condition.notify_all()
+
+    def _next_ticket(self) -> int:
+        """Waiting request whose site has the fewest requests in flight"""
+        return min(self._waiting, key=lambda ticket: (self._in_flight.get(self._waiting[ticket], 0), ticket))
+
+def site_slug(url: str) -> str:
+    """File-system friendly name for a subsite URL"""
+    parsed = urlparse(url)
+    return re.sub(r'[^a-z0-9]+', '-', f"{parsed.netloc}{parsed.path}".lower()).strip('-') or 'site'
+
+class NetworkCleanup:
+    """Dry-run image cleanup across every subsite of a multisite network
+
+    Subsites are listed with XML-RPC wp.getUsersBlogs (the account must be a
+    member of each subsite) unless site_urls is given. Every subsite gets
+    its own output directory, journal and index under output_dir.
+    """
+
+    def __init__(self, network_url: str, username: str, password: str,
+                 site_urls: Optional[List[str]] = None, site_workers: int = 8,
+                 host_quota: int = 8, max_workers: int = 4, output_dir: str = 'network_cleanup'):
+        self.network_url = network_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.site_urls = site_urls
+        self.site_workers = site_workers
+        self.host_quota = host_quota
+        self.max_workers = max_workers
+        self.output_dir = output_dir
+
+        # 'host' gives each origin its own quota and rate limiter; 'network'
+        # shares one between every subsite (e.g. subdomains on one server)
+        self.quota_scope = 'host'
+        self.initial_rate = 2.0
+
+        # Optional hook to adjust each subsite's WordPressImageCleanup
+        self.configure_site: Optional[Callable[[WordPressImageCleanup], None]] = None
+
+        self._quotas = {}
+        self._limiters = {}
+
+    def list_sites(self) -> List[str]:
+        """Subsite base URLs: site_urls if given, else from XML-RPC
+
+        URLs with the same site_slug (repeated, with and without a trailing
+        slash, or differing only in case or scheme) would share a journal
+        and index directory, so only the first of them is kept.
+        """
+        if self.site_urls:
+            urls = [url.strip().rstrip('/') for url in self.site_urls]
+        else:
+            proxy = xmlrpc.client.ServerProxy(f"{self.network_url}/xmlrpc.php")
+            blogs = proxy.wp.getUsersBlogs(self.username, self.password)
+            urls = sorted(blog['url'].rstrip('/') for blog in blogs)
+
+        sites = {}
+        for url in urls:
+            slug = site_slug(url)
+            if slug not in sites:
+                sites[slug] = url
+            elif sites[slug] != url:
+                logger.warning(f"⚠️ Skipping {url}: same subsite as {sites[slug]}")
+        return list(sites.values())
+
+    def _quota_key(self, url: str) -> str:
+        return 'network' if self.quota_scope == 'network' else urlparse(url).netloc.lower()
+
+    def site_cleanup(self, url: str) -> WordPressImageCleanup:
+        """A cleanup for one subsite, sharing its host's quota and rate limiter"""
+        key = self._quota_key(url)
+        if key not in self._quotas:
+            self._quotas[key] = HostQuota(self.host_quota)
+            self._limiters[key] = AdaptiveRateLimiter(initial_rate=self.initial_rate)
+
+        site_dir = os.path.join(self.output_dir, site_slug(url))
+        os.makedirs(site_dir, exist_ok=True)
+        cleanup = WordPressImageCleanup(url, self.username, self.password, max_workers=self.max_workers,
+                                        index_path=os.path.join(site_dir, 'image_cleanup.db'))
+        cleanup.output_dir = site_dir
+        cleanup.journal_path = os.path.join(site_dir, 'cleanup_journal.jsonl')
+        cleanup.rate_limiter = self._limiters[key]
+        cleanup.request_quota = self._quotas[key]
+        if self.configure_site is not None:
+            self.configure_site(cleanup)
+        return cleanup
+
+    def run(self, incremental: bool = False, resume: bool = False) -> Dict:
+        """Dry-run every subsite concurrently and write the network report
+
+        Subsites start largest library first, so the biggest one is never
+        left until last and wall time tracks the slowest site.
+        """
+        start_time = time.time()
+        sites = self.list_sites()
+        logger.info(f"🌐 {len(sites)} subsites in {self.network_url} "
+                    f"({self.site_workers} site workers, {self.host_quota} requests per host)")
+        cleanups = {url: self.site_cleanup(url) for url in sites}
+
+        with ThreadPoolExecutor(max_workers=self.site_workers) as executor:
+            sizes = dict(zip(sites, executor.map(self._library_size, (cleanups[url] for url in sites))))
+            order = sorted(sites, key=lambda url: sizes[url], reverse=True)
+            futures = {url: executor.submit(self._run_site, cleanups[url], incremental, resume)
+                       for url in order}
+            rows = [futures[url].result() for url in sites]
+
+        elapsed = time.time() - start_time
+        report = {
+            'network': self.network_url,
+            'created': datetime.now().isoformat(),
+            'wall_seconds': round(elapsed, 2),
+            'site_seconds': round(sum(row['seconds'] for row in rows), 2),
+            'sites': rows,
+            'hosts': {key: dict(self._limiters[key].stats(), quota=quota.limit, peak_in_flight=quota.peak)
+                      for key, quota in self._quotas.items()}
+        }
+        report['report_file'], report['summary_file'] = self._write_report(report)
+        logger.info(f"🌐 Network dry run complete: {len(rows)} sites in {elapsed:.1f}s "
+                    f"({report['site_seconds']:.1f}s of site time)")
+        return report
+
+    def _library_size(self, cleanup: WordPressImageCleanup) -> int:
+        """Image count of a subsite for scheduling (-1 if unknown)"""
+        try:
+            return cleanup._live_total('media', {'media_type': 'image'}, 'connection')
+        except Exception:
+            return -1
+
+    def _run_site(self, cleanup: WordPressImageCleanup, incremental: bool, resume: bool) -> Dict:
+        """Dry-run one subsite, reduced to its report row"""
+        start_time = time.time()
+        try:
+            results = cleanup.run_cleanup(dry_run=True, incremental=incremental, resume=resume)
+        except Exception as e:
+            results = {'error': str(e)}
+
+        unused_ids = cleanup.unused_images if 'unused_images' in results else set()
+        row = {
+            'site': cleanup.base_url,
+            'status': 'error' if 'error' in results else 'ok',
+            'error': results.get('error'),
+            'media': len(cleanup.all_media),
+            'unused': len(unused_ids),
+            'unused_bytes': sum(cleanup.all_media[media_id].get('file_size') or 0
+                                for media_id in unused_ids if media_id in cleanup.all_media),
+            'content_items': sum(stats['items'] for stats in cleanup.content_type_stats.values()),
+            'requests': sum(stats['requests'] for stats in cleanup.transfer_stats.values()),
+            'seconds': round(time.time() - start_time, 2),
+            'plan_file': results.get('plan_file'),
+            'report_file': results.get('report_file')
+        }
+        logger.info(f"🌐 {cleanup.base_url}: {row['status']} - {row['unused']} of {row['media']} "
+                    f"images unused ({row['seconds']}s)")
+        return row
+
+    def _write_report(self, report: Dict) -> Tuple[str, str]:
+        """Write the JSON report and a plain-text per-site table"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        json_file = os.path.join(self.output_dir, f"network_report_{stamp}.json")
+        text_file = os.path.join(self.output_dir, f"network_report_{stamp}.txt")
+
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        rows = sorted(report['sites'], key=lambda row: row['unused_bytes'], reverse=True)
+        with open(text_file, 'w', encoding='utf-8') as f:
+            f.write("WordPress Multisite Image Cleanup Report\n")
+            f.write("=" * 50 + "\n\n")
+            f.write(f"Network: {report['network']}\n")
+            f.write(f"Generated: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
+            f.write(f"Sites: {len(rows)} ({sum(row['status'] == 'error' for row in rows)} failed)\n")
+            f.write(f"Unused images: {sum(row['unused'] for row in rows)} "
+                    f"({sum(row['unused_bytes'] for row in rows) / 1024 / 1024:.1f} MB)\n")
+            f.write(f"Wall time: {report['wall_seconds']}s for {report['site_seconds']}s of site time\n\n")
+            f.write(f"{'Site':<50} {'Media':>7} {'Unused':>7} {'MB':>8} {'Secs':>7}  Status\n")
+            f.write("-" * 90 + "\n")
+            for row in rows:
+                status = row['status'] if row['status'] == 'ok' else f"error: {row['error']}"
+                f.write(f"{row['site'][:50]:<50} {row['media']:>7} {row['unused']:>7} "
+                        f"{row['unused_bytes'] / 1024 / 1024:>8.1f} {row['seconds']:>7.1f}  {status}\n")
+
+        logger.info(f"📄 Network report generated: {text_file}")
+        return json_file, text_file
+
+    def execute_plans(self, report_file: str, dry_run: bool = False) -> Dict:
+        """Execute each subsite's reviewed deletion plan from a network report"""
+        with open(report_file, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+
+        planned = [row for row in report['sites'] if row['status'] == 'ok' and row['plan_file']]
+        with ThreadPoolExecutor(max_workers=self.site_workers) as executor:
+            futures = {row['site']: executor.submit(self.site_cleanup(row['site']).execute_plan,
+                                                    row['plan_file'], dry_run)
+                       for row in planned}
+            results = {site: future.result() for site, future in futures.items()}
+
+        for site, result in results.items():
+            if 'error' in result:
+                logger.error(f"❌ {site}: {result['error']}")
+            else:
+                logger.info(f"🗑️ {site}: {result['deletion_results']['deleted']} deleted, "
+                            f"{result['deletion_results']['failed']} failed")
+        return results
+
+def main():
+    """Dry-run every subsite of a network and print the summary"""
+
+    # IMPORTANT: Update these credentials for your multisite network
+    NETWORK_URL = "https://your-multisite-network.com.au"
+    USERNAME = "your_username"
+    PASSWORD = "your_application_password"  # WordPress Application Password
+    SITE_URLS = None  # Or an explicit list of subsite URLs
+
+    network = NetworkCleanup(NETWORK_URL, USERNAME, PASSWORD, site_urls=SITE_URLS)
+
+    print("WordPress Multisite Image Cleanup (Australian Edition)")
+    print("=" * 55)
+    print(f"Network: {NETWORK_URL}")
+    print("⚠️  Every subsite runs in DRY RUN mode")
+    print()
+
+    report = network.run()
+
+    print("📊 NETWORK RESULTS:")
+    print(f"  Sites: {len(report['sites'])}")
+    print(f"  Unused Images: {sum(row['unused'] for row in report['sites'])}")
+    print(f"  Wall Time: {report['wall_seconds']}s ({report['site_seconds']}s of site time)")
+    for row in report['sites']:
+        if row['status'] != 'ok':
+            print(f"  ❌ {row['site']}: {row['error']}")
+    print(f"  Report: {report['summary_file']}")
+    print()
+    print("After reviewing every site's report, delete the planned images with:")
+    print(f"  NetworkCleanup(...).execute_plans('{report['report_file']}')")
+
+if __name__ == "__main__":
+    main()
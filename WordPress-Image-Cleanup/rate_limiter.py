@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Adaptive Rate Limiter
+Token bucket with AIMD (additive increase, multiplicative decrease) refill
+rate, shared by every WordPress REST call a cleanup run makes
+
+Australian English version
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+# Status codes that mean the host wants us to slow down
+THROTTLE_STATUS_CODES = (429, 503)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convert a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class AdaptiveRateLimiter:
+    """Thread-safe token bucket whose rate follows host latency and throttling
+
+    The rate grows additively while responses stay under target_latency and
+    is cut multiplicatively on 429/503, errors or slow responses. A
+    Retry-After header pauses all callers until the host is ready again.
+    """
+
+    def __init__(self, initial_rate: float = 2.0, min_rate: float = 0.2,
+                 max_rate: float = 50.0, target_latency: float = 1.0,
+                 slow_latency: float = 3.0, increase_step: float = 0.5,
+                 decrease_factor: float = 0.5, burst: float = 2.0):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self.slow_latency = slow_latency
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.burst = burst
+
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._pause_until = 0.0
+        self._last_decrease = 0.0
+
+        # Statistics
+        self._first_request = None
+        self._last_response = None
+        self._requests = 0
+        self._throttled = 0
+        self._slow = 0
+        self._errors = 0
+        self._waited = 0.0
+        self._peak_rate = initial_rate
+
+    def acquire(self):
+        """Block until the caller may send one request"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._pause_until and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self._requests += 1
+                    self._waited += waited
+                    if self._first_request is None:
+                        self._first_request = now
+                    return
+                if now < self._pause_until:
+                    delay = self._pause_until - now
+                else:
+                    delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def record(self, status_code: Optional[int], latency: float,
+               retry_after: Optional[float] = None):
+        """Feed back the outcome of a request (status_code None for errors)"""
+        with self._lock:
+            now = time.monotonic()
+            self._last_response = now
+
+            if status_code in THROTTLE_STATUS_CODES or status_code is None:
+                if status_code is None:
+                    self._errors += 1
+                else:
+                    self._throttled += 1
+                if retry_after:
+                    self._pause_until = max(self._pause_until, now + retry_after)
+                self._decrease(now)
+            elif latency > self.slow_latency:
+                self._slow += 1
+                self._decrease(now)
+            elif latency <= self.target_latency:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+                self._peak_rate = max(self._peak_rate, self.rate)
+
+    def _refill(self, now: float):
+        """Add tokens for the time elapsed since the last refill"""
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _decrease(self, now: float):
+        """Cut the rate, at most once per second so one slow burst counts once"""
+        if now - self._last_decrease < 1.0:
+            return
+        self._last_decrease = now
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._tokens = min(self._tokens, 1.0)
+
+    def stats(self) -> Dict:
+        """Effective request rate and back-off counters for run results"""
+        with self._lock:
+            elapsed = 0.0
+            if self._first_request is not None and self._last_response is not None:
+                elapsed = self._last_response - self._first_request
+            return {
+                'requests': self._requests,
+                'effective_rate': round(self._requests / elapsed, 2) if elapsed > 0 else 0.0,
+                'current_rate': round(self.rate, 2),
+                'peak_rate': round(self._peak_rate, 2),
+                'throttled_responses': self._throttled,
+                'slow_responses': self._slow,
+                'errors': self._errors,
+                'seconds_waiting': round(self._waited, 2)
+            }
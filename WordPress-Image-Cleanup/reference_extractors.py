@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Content Reference Extractors
+Pluggable registry of the ways a REST content item can point at media:
+featured images, rendered HTML, block-editor attributes and post meta
+(ACF fields, Elementor JSON and plain attachment IDs). Every registered
+extractor runs on every scanned item of every content type.
+
+Australian English version
+"""
+
+import json
+import re
+from typing import Callable, Dict, Set, Tuple
+
+from image_extractor import ImageExtractor
+
+# extractor(item, image_extractor, urls, media_ids) adds what it finds to urls/media_ids
+Extractor = Callable[[Dict, ImageExtractor, Set[str], Set[int]], None]
+
+REFERENCE_EXTRACTORS: Dict[str, Extractor] = {}
+
+# Block comment delimiters carrying attributes: <!-- wp:image {"id":123} /-->
+BLOCK_COMMENT_PATTERN = re.compile(r'<!--\s+wp:[a-z0-9/_-]+\s+(\{.*?\})\s+/?-->', re.DOTALL)
+
+# "id":123, "mediaId":123, "ids":[1,2] and similar ID attributes
+BLOCK_ID_PATTERN = re.compile(r'"(?:[A-Za-z_]*(?:id|Id|ID)s?)"\s*:\s*(\[[\d,\s"]*\]|"?\d+"?)')
+
+# Meta/ACF keys whose numeric values are attachment IDs. Attachments share
+# the post ID sequence, so a post or page ID matched here can never be
+# mistaken for an image.
+MEDIA_KEY_PATTERN = re.compile(
+    r'(?:^|[_-])ids?$|[a-z]Ids?$|image|img|thumb|gallery|logo|icon|photo|picture|media|'
+    r'attachment|background|banner|avatar|poster|video|file', re.IGNORECASE)
+
+DIGITS_PATTERN = re.compile(r'\d+')
+
+def register_extractor(name: str) -> Callable[[Extractor], Extractor]:
+    """Decorator adding an extractor to the registry under a name"""
+    def decorator(extractor: Extractor) -> Extractor:
+        REFERENCE_EXTRACTORS[name] = extractor
+        return extractor
+    return decorator
+
+def extract_item(item: Dict, image_extractor: ImageExtractor) -> Tuple[Set[str], Set[int]]:
+    """Image URLs and media IDs one content item references, from every extractor"""
+    urls = set()
+    media_ids = set()
+    for extractor in REFERENCE_EXTRACTORS.values():
+        extractor(item, image_extractor, urls, media_ids)
+    return urls, media_ids
+
+@register_extractor('featured_media')
+def extract_featured_media(item: Dict, image_extractor: ImageExtractor, urls: Set[str], media_ids: Set[int]):
+    """The item's featured image"""
+    if item.get('featured_media'):
+        media_ids.add(item['featured_media'])
+
+@register_extractor('rendered_html')
+def extract_rendered_html(item: Dict, image_extractor: ImageExtractor, urls: Set[str], media_ids: Set[int]):
+    """Images embedded in the rendered content and excerpt"""
+    for field in ('content', 'excerpt'):
+        html = (item.get(field) or {}).get('rendered', '')
+        if html:
+            found_urls, found_ids = image_extractor.extract(html)
+            urls.update(found_urls)
+            media_ids.update(found_ids)
+
+@register_extractor('block_attributes')
+def extract_block_attributes(item: Dict, image_extractor: ImageExtractor, urls: Set[str], media_ids: Set[int]):
+    """Attachment IDs and URLs in block-editor attributes (needs context=edit)
+
+    Third-party blocks often keep the attachment only in their attributes
+    and render a plain URL, or nothing at all until the page is viewed.
+    """
+    raw = (item.get('content') or {}).get('raw', '')
+    if not raw or '<!-- wp:' not in raw:
+        return
+    for attributes in BLOCK_COMMENT_PATTERN.findall(raw):
+        for value in BLOCK_ID_PATTERN.findall(attributes):
+            media_ids.update(int(digits) for digits in DIGITS_PATTERN.findall(value))
+        urls.update(image_extractor.extract_text(attributes))
+
+@register_extractor('meta_fields')
+def extract_meta_fields(item: Dict, image_extractor: ImageExtractor, urls: Set[str], media_ids: Set[int]):
+    """Registered post meta and ACF fields, including Elementor's JSON data"""
+    for field in ('meta', 'acf'):
+        if item.get(field):
+            _walk_value(item[field], field, image_extractor, urls, media_ids)
+
+def _walk_value(value, key: str, image_extractor: ImageExtractor, urls: Set[str], media_ids: Set[int]):
+    """Collect references from a nested meta value found under key"""
+    if isinstance(value, dict):
+        # ACF image/file arrays and Elementor media controls: {"id": 12, "url": ...}
+        attachment_id = value.get('ID', value.get('id'))
+        if isinstance(attachment_id, int) and ('url' in value or 'mime_type' in value):
+            media_ids.add(attachment_id)
+        for child_key, child in value.items():
+            _walk_value(child, str(child_key), image_extractor, urls, media_ids)
+    elif isinstance(value, list):
+        for child in value:
+            _walk_value(child, key, image_extractor, urls, media_ids)
+    elif isinstance(value, bool):
+        return
+    elif isinstance(value, int):
+        if value > 0 and MEDIA_KEY_PATTERN.search(key):
+            media_ids.add(value)
+    elif isinstance(value, str) and value:
+        _walk_string(value, key, image_extractor, urls, media_ids)
+
+def _walk_string(value: str, key: str, image_extractor: ImageExtractor, urls: Set[str], media_ids: Set[int]):
+    """IDs, JSON documents, HTML and bare URLs stored as meta strings"""
+    stripped = value.strip()
+    if stripped.replace(',', '').replace(' ', '').isdigit():
+        # "123" or a "12,34,56" gallery list
+        if MEDIA_KEY_PATTERN.search(key):
+            media_ids.update(int(digits) for digits in DIGITS_PATTERN.findall(stripped))
+        return
+    if stripped[:1] in '[{':
+        # Elementor and many builders store their whole layout as a JSON string
+        try:
+            _walk_value(json.loads(stripped), key, image_extractor, urls, media_ids)
+            return
+        except ValueError:
+            pass
+    if '<' in value:
+        found_urls, found_ids = image_extractor.extract(value)
+        urls.update(found_urls)
+        media_ids.update(found_ids)
+    if '/' in value:
+        urls.update(image_extractor.extract_text(value))
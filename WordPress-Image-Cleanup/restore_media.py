@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Media Restore
+Re-uploads images the cleanup deleted, from its backups: metadata from an
+image_backup_* file and the files from the binary backup store.
+Uploads run concurrently through the cleanup's rate limiter, and the old
+ID -> new ID map is saved as it grows so an interrupted restore carries on
+where it stopped. References to the old images in published content can
+then be rewritten to the new attachments in bulk.
+
+Australian English version
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from binary_backup import BackupStore
+from streaming_output import iter_backup
+from image_extractor import TEXT_URL_PATTERN, URL_PATH_PATTERN
+from reference_extractors import DIGITS_PATTERN
+from wordpress_image_cleanup import WordPressImageCleanup
+
+logger = logging.getLogger(__name__)
+
+# -300x200 before the extension: the size a variant file was generated at
+SIZE_SUFFIX_PATTERN = re.compile(r'-(\d+x\d+)(?=\.[A-Za-z0-9]+$)')
+IMAGE_CLASS_PATTERN = re.compile(r'\bwp-image-(\d+)\b')
+GALLERY_IDS_PATTERN = re.compile(r'(\[gallery\b[^\]]*?\bids=["\']?)([\d,\s]+)')
+
+# Core blocks that store attachment IDs, and the attributes that hold them
+MEDIA_BLOCK_PATTERN = re.compile(r'<!--\s+wp:(?:core/)?(?:image|gallery|cover|media-text)\s+(\{.*?\})\s+/?-->',
+                                 re.DOTALL)
+MEDIA_ID_ATTRIBUTE_PATTERN = re.compile(r'"(?:id|mediaId|ids)"\s*:\s*(\[[\d,\s"]*\]|"?\d+"?)')
+
+# Restored fields sent with each upload (title, alt text, caption, description)
+RESTORED_FIELDS = ('title', 'alt_text', 'caption', 'description')
+
+# Save the ID map after this many uploads, so a crash loses little
+MAP_SAVE_INTERVAL = 50
+
+def url_path(url: str) -> str:
+    """Path of an absolute, protocol-relative or root-relative URL"""
+    return URL_PATH_PATTERN.match(url).group(1)
+
+def variant_paths(entry: Dict, new_item: Dict) -> Dict[str, str]:
+    """Old path -> new path for a restored image's original and size files
+
+    Sizes are paired by their -WxH suffix; an old size WordPress did not
+    generate again points at the new original.
+    """
+    old_source = entry['source_url']
+    new_source = new_item.get('source_url', '')
+    old_directory = url_path(old_source).rsplit('/', 1)[0]
+    new_by_size = {}
+    for size in ((new_item.get('media_details') or {}).get('sizes') or {}).values():
+        match = SIZE_SUFFIX_PATTERN.search(size.get('file', ''))
+        if match and size.get('source_url'):
+            new_by_size[match.group(1)] = url_path(size['source_url'])
+
+    paths = {url_path(old_source): url_path(new_source)}
+    for size_file in entry.get('sizes', []):
+        match = SIZE_SUFFIX_PATTERN.search(size_file)
+        paths[f"{old_directory}/{size_file}"] = new_by_size.get(match.group(1) if match else '',
+                                                                url_path(new_source))
+    return paths
+
+def rewrite_markup(raw: str, id_map: Dict[int, int], path_map: Dict[str, str]) -> Tuple[str, int]:
+    """Point upload URLs, wp-image-N classes, media block IDs and gallery
+    shortcodes at the restored attachments, returning (markup, references changed)
+
+    Only id/mediaId/ids on core image, gallery, cover and media-text blocks
+    are rewritten: other ID attributes (categoryId, authorId, postId...)
+    hold term, user or post IDs that can equal an old attachment ID.
+    """
+    changes = [0]
+
+    def new_id(match) -> str:
+        media_id = int(match.group(0))
+        if media_id in id_map:
+            changes[0] += 1
+            return str(id_map[media_id])
+        return match.group(0)
+
+    def url(match) -> str:
+        text = match.group(0)
+        path = url_path(text)
+        if path in path_map:
+            changes[0] += 1
+            return text.replace(path, path_map[path], 1)
+        return text
+
+    def image_class(match) -> str:
+        media_id = int(match.group(1))
+        if media_id in id_map:
+            changes[0] += 1
+            return f"wp-image-{id_map[media_id]}"
+        return match.group(0)
+
+    def block_id(match) -> str:
+        offset = match.start(1) - match.start(0)
+        return match.group(0)[:offset] + DIGITS_PATTERN.sub(new_id, match.group(1))
+
+    def block(match) -> str:
+        attributes = match.group(1)
+        return match.group(0).replace(attributes, MEDIA_ID_ATTRIBUTE_PATTERN.sub(block_id, attributes), 1)
+
+    def gallery(match) -> str:
+        return match.group(1) + DIGITS_PATTERN.sub(new_id, match.group(2))
+
+    raw = TEXT_URL_PATTERN.sub(url, raw)
+    raw = IMAGE_CLASS_PATTERN.sub(image_class, raw)
+    raw = MEDIA_BLOCK_PATTERN.sub(block, raw)
+    raw = GALLERY_IDS_PATTERN.sub(gallery, raw)
+    return raw, changes[0]
+
+class MediaRestore:
+    """Re-upload backed-up images to a site and point its content back at them
+
+    The cleanup instance supplies the session, rate limiter, REST batch
+    support and content scanning; its output_dir holds the ID map.
+    """
+
+    def __init__(self, cleanup: WordPressImageCleanup, backup_file: str, store_dir: str,
+                 map_file: Optional[str] = None, max_workers: int = 4):
+        self.cleanup = cleanup
+        self.backup_file = backup_file
+        self.store = BackupStore(store_dir)
+        stem = os.path.basename(backup_file).split('.', 1)[0]
+        self.map_file = map_file or os.path.join(cleanup.output_dir, f"restore_map_{stem}.json")
+        self.max_workers = max(1, max_workers)
+        self.id_map = {}
+        self.path_map = {}
+        self.stats = {}
+        self.rewrite_stats = {}
+        self._lock = threading.Lock()
+
+    def restore(self, media_ids: Optional[Iterable[int]] = None) -> Dict:
+        """Upload every backed-up image (or just media_ids) not restored yet"""
+        wanted = set(media_ids) if media_ids is not None else None
+        entries = [entry for entry in iter_backup(self.backup_file) if wanted is None or entry['id'] in wanted]
+        self._load_map()
+
+        stored = {record['media_id']: record
+                  for record in self.store.entries({entry['source_url'] for entry in entries})
+                  if record.get('variant') == 'original' and self.store.has(record['sha256'])}
+        todo = [entry for entry in entries if entry['id'] not in self.id_map and entry['id'] in stored]
+        no_file = sorted(entry['id'] for entry in entries if entry['id'] not in stored
+                         and entry['id'] not in self.id_map)
+        self.stats = {'images': len(entries), 'restored': 0, 'already_restored': len(entries) - len(todo) - len(no_file),
+                      'no_file': no_file, 'failed': [], 'bytes': 0}
+        logger.info(f"♻️ Restoring {len(todo)} images to {self.cleanup.base_url} ({self.max_workers} workers, "
+                    f"{self.stats['already_restored']} already restored, {len(no_file)} without a stored file)")
+
+        start_time = time.time()
+        with self.cleanup.instrumentation.phase('restore_upload'):
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                pending = deque()
+                window = self.max_workers * 2
+                for entry in todo:
+                    pending.append((entry, executor.submit(self._upload, entry, stored[entry['id']])))
+                    if len(pending) >= window:
+                        self._collect(*pending.popleft())
+                while pending:
+                    self._collect(*pending.popleft())
+        self._save_map()
+
+        elapsed = time.time() - start_time
+        self.stats['seconds'] = round(elapsed, 2)
+        self.stats['images_per_second'] = round(self.stats['restored'] / elapsed, 1) if elapsed > 0 else 0.0
+        self.stats['map_file'] = self.map_file
+        logger.info(f"♻️ Restored {self.stats['restored']} images in {elapsed:.1f}s "
+                    f"({self.stats['images_per_second']} images/sec), {len(self.stats['failed'])} failed")
+        return self.stats
+
+    def _upload(self, entry: Dict, stored: Dict) -> Dict:
+        """POST one image's stored original to /wp/v2/media with its metadata
+
+        The file is streamed from the store rather than read into memory
+        (_request rewinds it if a throttled upload is retried).
+        """
+        params = {field: entry[field] for field in RESTORED_FIELDS if entry.get(field)}
+        with self.store.open_object(stored['sha256']) as f:
+            response = self.cleanup._request(
+                'POST', f"{self.cleanup.base_url}/wp-json/wp/v2/media", stage='restore', params=params, data=f,
+                headers={'Content-Type': entry.get('mime_type') or stored.get('content_type') or 'image/jpeg',
+                         'Content-Disposition': f'attachment; filename="{stored["filename"]}"'},
+                timeout=120)
+        if response.status_code != 201:
+            try:
+                message = response.json().get('message', '')
+            except ValueError:
+                message = ''
+            raise RuntimeError(f"HTTP {response.status_code} {message}".strip())
+        return response.json()
+
+    def _collect(self, entry: Dict, future):
+        try:
+            new_item = future.result()
+        except (RuntimeError, requests.RequestException, OSError) as e:
+            logger.error(f"❌ Could not restore image {entry['id']} ({entry.get('title', '')}): {e}")
+            self.stats['failed'].append(entry['id'])
+            return
+        logger.info(f"♻️ Restored: {entry.get('title', '')} (ID {entry['id']} -> {new_item['id']})")
+        with self._lock:
+            self.id_map[entry['id']] = new_item['id']
+            self.path_map.update(variant_paths(entry, new_item))
+            self.stats['restored'] += 1
+            self.stats['bytes'] += entry.get('file_size') or 0
+            if self.stats['restored'] % MAP_SAVE_INTERVAL == 0:
+                self._save_map()
+
+    def _load_map(self):
+        """Pick up the ID map of an earlier, possibly interrupted, restore"""
+        if not os.path.exists(self.map_file):
+            return
+        with open(self.map_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('site') != self.cleanup.base_url:
+            raise ValueError(f"{self.map_file} is a restore map for {saved.get('site')}, "
+                             f"not {self.cleanup.base_url}")
+        self.id_map = {int(old_id): new_id for old_id, new_id in saved['ids'].items()}
+        self.path_map = saved.get('paths', {})
+
+    def _save_map(self):
+        """Write the ID and path maps (replacing the file atomically)"""
+        temporary = f"{self.map_file}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'site': self.cleanup.base_url, 'backup_file': self.backup_file,
+                       'updated': datetime.now().isoformat(),
+                       'ids': {str(old_id): new_id for old_id, new_id in sorted(self.id_map.items())},
+                       'paths': self.path_map}, f, indent=2, ensure_ascii=False)
+        os.replace(temporary, self.map_file)
+
+    def rewrite_references(self, dry_run: bool = True) -> Dict:
+        """Point published content at the restored images
+
+        Raw block markup is rewritten (see rewrite_markup) along with
+        featured images, and changes are saved through the REST batch
+        endpoint where available. Types whose raw markup the account cannot
+        read are listed in skipped_types; meta and ACF fields are not changed.
+        """
+        cleanup = self.cleanup
+        if not self.id_map:
+            self._load_map()
+        self.rewrite_stats = {'items_scanned': 0, 'items_changed': 0, 'references': 0, 'updated': 0,
+                              'failed': [], 'skipped_types': [], 'dry_run': dry_run}
+        start_time = time.time()
+
+        with cleanup.instrumentation.phase('restore_rewrite'):
+            content_types = cleanup.discover_content_types()
+            pending = []
+            for content_type in content_types:
+                if content_type not in cleanup._edit_context_types:
+                    self.rewrite_stats['skipped_types'].append(content_type)
+                    continue
+                for content_items in cleanup._iter_content_pages(content_type):
+                    for item in content_items:
+                        update = self._rewritten(item)
+                        self.rewrite_stats['items_scanned'] += 1
+                        if update is not None:
+                            pending.append((content_type, item['id'], update))
+                    if len(pending) >= cleanup.batch_api_max_items:
+                        self._apply_updates(pending, dry_run)
+                        pending = []
+            self._apply_updates(pending, dry_run)
+
+        self.rewrite_stats['seconds'] = round(time.time() - start_time, 2)
+        logger.info(f"🔗 {'Would rewrite' if dry_run else 'Rewrote'} {self.rewrite_stats['references']} references "
+                    f"in {self.rewrite_stats['items_changed']} of {self.rewrite_stats['items_scanned']} items"
+                    f"{' (skipped ' + ', '.join(self.rewrite_stats['skipped_types']) + ')' if self.rewrite_stats['skipped_types'] else ''}")
+        return self.rewrite_stats
+
+    def _rewritten(self, item: Dict) -> Optional[Dict]:
+        """Update body for one content item, or None when it has no old references"""
+        update = {}
+        raw = (item.get('content') or {}).get('raw')
+        references = 0
+        if raw:
+            new_raw, references = rewrite_markup(raw, self.id_map, self.path_map)
+            if references:
+                update['content'] = new_raw
+        if item.get('featured_media') in self.id_map:
+            update['featured_media'] = self.id_map[item['featured_media']]
+            references += 1
+        if not update:
+            return None
+        self.rewrite_stats['items_changed'] += 1
+        self.rewrite_stats['references'] += references
+        return update
+
+    def _apply_updates(self, updates: List[Tuple[str, int, Dict]], dry_run: bool):
+        """Save content updates, batch_api_max_items per /batch/v1 call where available"""
+        if dry_run or not updates:
+            return
+        cleanup = self.cleanup
+        if not cleanup.batch_api_available:
+            for content_type, content_id, body in updates:
+                self._update_single(content_type, content_id, body)
+            return
+
+        for start in range(0, len(updates), cleanup.batch_api_max_items):
+            group = updates[start:start + cleanup.batch_api_max_items]
+            payload = {'validation': 'normal',
+                       'requests': [{'method': 'POST', 'path': f"/wp/v2/{content_type}/{content_id}", 'body': body}
+                                    for content_type, content_id, body in group]}
+            try:
+                response = cleanup._request('POST', f"{cleanup.base_url}/wp-json/batch/v1", stage='restore',
+                                            json=payload)
+                sub_responses = response.json().get('responses', []) if response.status_code in (200, 207) else []
+            except (requests.RequestException, ValueError) as e:
+                logger.error(f"❌ Batch content update failed: {e}")
+                sub_responses = []
+            if len(sub_responses) != len(group):
+                sub_responses = [None] * len(group)
+            for (content_type, content_id, body), sub_response in zip(group, sub_responses):
+                if sub_response is not None and sub_response.get('status') == 200:
+                    self.rewrite_stats['updated'] += 1
+                else:
+                    self._update_single(content_type, content_id, body)
+
+    def _update_single(self, content_type: str, content_id: int, body: Dict):
+        """Save one content update with its own request"""
+        try:
+            response = self.cleanup._request('POST', f"{self.cleanup.base_url}/wp-json/wp/v2/{content_type}/{content_id}",
+                                             stage='restore', json=body)
+            succeeded = response.status_code == 200
+        except requests.RequestException:
+            succeeded = False
+        if succeeded:
+            self.rewrite_stats['updated'] += 1
+        else:
+            logger.error(f"❌ Could not update {content_type} {content_id}")
+            self.rewrite_stats['failed'].append(f"{content_type}/{content_id}")
+
+def main():
+    """Restore the most recent backup and rewrite references to it"""
+    import glob
+
+    # IMPORTANT: Update these credentials for your WordPress site
+    BASE_URL = "https://your-wordpress-site.com.au"
+    USERNAME = "your_username"
+    PASSWORD = "your_application_password"  # WordPress Application Password
+    STORE_DIR = "image_backup_store"
+    MEDIA_IDS = None  # Or a list of backed-up IDs to restore, e.g. client logos only
+    REWRITE_REFERENCES = True
+
+    print("WordPress Media Restore (Australian Edition)")
+    print("=" * 55)
+
+    backup_files = glob.glob('image_backup_*.json*')
+    if not backup_files:
+        print("❌ No backup file found (image_backup_*.jsonl.gz)")
+        return
+    backup_file = max(backup_files)
+
+    cleanup = WordPressImageCleanup(BASE_URL, USERNAME, PASSWORD)
+    if not cleanup.test_connection():
+        print("❌ Connection test failed")
+        return
+
+    restore = MediaRestore(cleanup, backup_file, STORE_DIR)
+    stats = restore.restore(MEDIA_IDS)
+    print(f"📦 Backup: {backup_file}")
+    print(f"♻️ Restored: {stats['restored']} images ({stats['already_restored']} earlier) "
+          f"in {stats['seconds']}s")
+    if stats['no_file']:
+        print(f"⚠️  {len(stats['no_file'])} images have no stored file: {stats['no_file'][:10]}")
+    if stats['failed']:
+        print(f"❌ {len(stats['failed'])} uploads failed - re-run to retry them: {stats['failed'][:10]}")
+    print(f"🗺️  ID map: {stats['map_file']}")
+
+    if REWRITE_REFERENCES and restore.id_map:
+        preview = restore.rewrite_references(dry_run=True)
+        print(f"🔗 {preview['references']} references to restored images in {preview['items_changed']} items")
+        if preview['items_changed']:
+            rewrite = restore.rewrite_references(dry_run=False)
+            print(f"🔗 Updated {rewrite['updated']} items ({len(rewrite['failed'])} failed)")
+        if preview['skipped_types']:
+            print(f"⚠️  Not rewritten (no raw markup access): {', '.join(preview['skipped_types'])}")
+
+if __name__ == "__main__":
+    main()
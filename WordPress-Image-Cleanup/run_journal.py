@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Cleanup Run Journal
+Append-only JSON Lines checkpoint of a cleanup run: every media page
+fetched, every content page analysed and every deletion outcome, so an
+interrupted run can resume instead of starting again
+
+Australian English version
+"""
+
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+JOURNAL_VERSION = 1
+
+class JournalState:
+    """What an earlier, interrupted run had already done"""
+
+    def __init__(self):
+        self.run = {}
+        self.media = {}          # media ID -> reduced media record
+        self.content = {}        # content type -> {content ID: (modified, image keys, media IDs)}
+        self.deletions = {}      # media ID -> last logged status
+        self.scan_complete = False
+        self.complete = False
+
+    def content_watermark(self, content_type: str) -> Optional[str]:
+        """Latest 'modified' among journaled items of one content type"""
+        values = [modified for modified, _, _ in self.content.get(content_type, {}).values() if modified]
+        return max(values) if values else None
+
+class RunJournal:
+    """Thread-safe append-only writer; each event is one flushed JSON line"""
+
+    def __init__(self, path: str = 'cleanup_journal.jsonl'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def start(self, **run_info):
+        """Begin a new journal for a fresh run (replacing any old one)"""
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self.record('run', version=JOURNAL_VERSION, **run_info)
+
+    def resume(self):
+        """Keep appending to the existing journal"""
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self.record('resume')
+
+    def record(self, event: str, **data):
+        """Append one event and flush it so it survives the process dying"""
+        if self._file is None:
+            return
+        line = json.dumps(dict(data, event=event, at=datetime.now().isoformat()), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def record_media(self, records: List[Dict]):
+        """Checkpoint one page of reduced media records"""
+        self.record('media', records=records)
+
+    def record_content(self, content_type: str, rows: List[Tuple[int, str, Set[str], Set[int]]]):
+        """Checkpoint one analysed content page as (id, modified, keys, media IDs) rows"""
+        self.record('content', content_type=content_type,
+                    items=[[content_id, modified, sorted(keys), sorted(media_ids)]
+                           for content_id, modified, keys, media_ids in rows])
+
+    def record_deletion(self, media_id: int, status: str):
+        """Checkpoint one deletion outcome"""
+        self.record('deletion', id=media_id, status=status)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @staticmethod
+    def load(path: str) -> Optional[JournalState]:
+        """Replay a journal; a torn final line from a crash is ignored"""
+        try:
+            f = open(path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+        state = JournalState()
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                event = entry.get('event')
+                if event == 'run':
+                    state.run = entry
+                elif event == 'media':
+                    for record in entry['records']:
+                        state.media[record['id']] = record
+                elif event == 'content':
+                    items = state.content.setdefault(entry['content_type'], {})
+                    for content_id, modified, keys, media_ids in entry['items']:
+                        items[content_id] = (modified, set(keys), set(media_ids))
+                elif event == 'scan_complete':
+                    state.scan_complete = True
+                elif event == 'deletion':
+                    state.deletions[entry['id']] = entry['status']
+                elif event == 'complete':
+                    state.complete = True
+
+        if state.run.get('version') != JOURNAL_VERSION:
+            return None
+        return state
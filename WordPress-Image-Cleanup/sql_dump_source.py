@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+SQL Dump Source
+Offline media and content source for the cleanup: streams a mysqldump (or
+wp db export) of wp_posts and wp_postmeta, optionally gzipped, without
+loading it into memory. Attachments are joined with their
+_wp_attached_file and _wp_attachment_metadata rows, and published content
+and post meta are run through the same reference extractors as a REST
+scan. Tables may appear in any order.
+
+Australian English version
+"""
+
+import gzip
+import logging
+import os
+import re
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from extraction_pool import ItemReferences
+from image_extractor import ImageExtractor, canonical_image_key
+from reference_extractors import extract_item
+
+logger = logging.getLogger(__name__)
+
+# Column order of stock WordPress tables, for data-only dumps without
+# CREATE TABLE statements
+POSTS_COLUMNS = ('ID', 'post_author', 'post_date', 'post_date_gmt', 'post_content', 'post_title',
+                 'post_excerpt', 'post_status', 'comment_status', 'ping_status', 'post_password',
+                 'post_name', 'to_ping', 'pinged', 'post_modified', 'post_modified_gmt',
+                 'post_content_filtered', 'post_parent', 'guid', 'menu_order', 'post_type',
+                 'post_mime_type', 'comment_count')
+POSTMETA_COLUMNS = ('meta_id', 'post_id', 'meta_key', 'meta_value')
+
+CREATE_TABLE_PATTERN = re.compile(r'^CREATE TABLE (?:IF NOT EXISTS )?`?(\w+)`?\s*\(')
+COLUMN_PATTERN = re.compile(r'^\s*`(\w+)`\s')
+INSERT_PATTERN = re.compile(
+    r'^(?:INSERT|REPLACE)(?:\s+IGNORE)?\s+INTO\s+`?(\w+)`?\s*(?:\(([^)]*)\)\s*)?VALUES\s*', re.IGNORECASE)
+
+# One value and the delimiter after it: 'quoted', NULL or a bare number
+ROW_START_PATTERN = re.compile(r'\s*,?\s*\(')
+VALUE_PATTERN = re.compile(r"""\s*(?:'((?:[^'\\]+|\\.|'')*)'|(NULL)|([^,)\s]+))\s*([,)])""", re.DOTALL)
+ESCAPE_PATTERN = re.compile(r"\\(.)|''", re.DOTALL)
+MYSQL_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+
+# WordPress's is_serialized() in one pattern
+SERIALIZED_PATTERN = re.compile(r'^(?:a:\d+:\{|O:\d+:"|s:\d+:"|i:-?\d+;|d:[^;]+;|b:[01];|N;)')
+
+# Attachment meta joined onto media records rather than scanned as content
+ATTACHMENT_META_KEYS = ('_wp_attached_file', '_wp_attachment_metadata', '_wp_attachment_image_alt')
+
+# Core bookkeeping meta that never points at media
+IGNORED_META_KEYS = frozenset(('_edit_lock', '_edit_last', '_wp_old_slug', '_wp_old_date',
+                               '_wp_trash_meta_status', '_wp_trash_meta_time', '_wp_desired_post_slug',
+                               '_wp_page_template', '_wp_attachment_backup_sizes', '_encloseme', '_pingme'))
+
+# Internal post types the REST API never lists as content
+INTERNAL_POST_TYPES = frozenset(('revision', 'customize_changeset', 'oembed_cache', 'user_request'))
+
+# REST bases of core types, for deletion plan watermarks
+CORE_REST_BASES = {'post': 'posts', 'page': 'pages', 'wp_block': 'blocks'}
+
+def open_dump(path: str):
+    """Text stream over a .sql or .sql.gz dump (undecodable bytes preserved)"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='surrogateescape')
+    return open(path, 'r', encoding='utf-8', errors='surrogateescape')
+
+def iter_dump_rows(path: str, tables: Dict[str, Tuple[str, ...]]) -> Iterator[Tuple[str, Dict]]:
+    """Yield (table, row dict) for every inserted row of the given tables
+
+    tables maps table names to their default column order, used until a
+    CREATE TABLE statement or an INSERT column list says otherwise.
+    mysqldump escapes newlines inside strings, so a statement ends at the
+    first line ending in ';'.
+    """
+    columns = {table: list(default) for table, default in tables.items()}
+    creating = None
+    with open_dump(path) as dump:
+        for line in dump:
+            if creating is not None:
+                match = COLUMN_PATTERN.match(line)
+                if match:
+                    columns[creating].append(match.group(1))
+                elif line.startswith(')'):
+                    creating = None
+                continue
+
+            match = CREATE_TABLE_PATTERN.match(line)
+            if match:
+                if match.group(1) in tables:
+                    creating = match.group(1)
+                    columns[creating] = []
+                continue
+
+            match = INSERT_PATTERN.match(line)
+            if not match or match.group(1) not in tables:
+                continue
+            table = match.group(1)
+            statement = line
+            while not statement.rstrip().endswith(';'):
+                # phpMyAdmin-style dumps put each row on its own line
+                next_line = dump.readline()
+                if not next_line:
+                    break
+                statement += next_line
+
+            names = columns[table]
+            if match.group(2):
+                names = [name.strip(' `') for name in match.group(2).split(',')]
+            for values in parse_rows(statement, match.end()):
+                yield table, dict(zip(names, values))
+
+def parse_rows(statement: str, pos: int = 0) -> Iterator[List[Optional[str]]]:
+    """Value tuples of an INSERT statement from pos (numbers stay strings)"""
+    while True:
+        match = ROW_START_PATTERN.match(statement, pos)
+        if not match:
+            return
+        pos = match.end()
+        row = []
+        while True:
+            match = VALUE_PATTERN.match(statement, pos)
+            if not match:
+                raise ValueError(f"Unparseable SQL value at offset {pos}: {statement[pos:pos + 40]!r}")
+            quoted, null, bare, delimiter = match.groups()
+            if quoted is not None:
+                row.append(unescape_sql(quoted))
+            else:
+                row.append(None if null else bare)
+            pos = match.end()
+            if delimiter == ')':
+                break
+        yield row
+
+def unescape_sql(value: str) -> str:
+    """Undo MySQL string literal escaping"""
+    if '\\' not in value and "''" not in value:
+        return value
+    return ESCAPE_PATTERN.sub(
+        lambda match: "'" if match.group(1) is None else MYSQL_ESCAPES.get(match.group(1), match.group(1)),
+        value)
+
+def maybe_unserialize(value: Optional[str]):
+    """PHP-serialised meta decoded to Python (lists for 0..n arrays); other values unchanged"""
+    if not value or not SERIALIZED_PATTERN.match(value):
+        return value
+    try:
+        return _php_value(value.encode('utf-8', 'surrogateescape'), 0)[0]
+    except (ValueError, IndexError):
+        return value
+
+def _php_value(data: bytes, pos: int):
+    """Decode one serialised PHP value at pos, returning (value, next pos)
+
+    String lengths are in bytes, so the value is walked as UTF-8 bytes.
+    """
+    kind = data[pos:pos + 1]
+    if kind == b'N':
+        return None, pos + 2
+    if kind in (b'i', b'b', b'd'):
+        end = data.index(b';', pos)
+        raw = data[pos + 2:end].decode('ascii')
+        if kind == b'i':
+            return int(raw), end + 1
+        return (raw == '1' if kind == b'b' else float(raw)), end + 1
+    if kind == b's':
+        colon = data.index(b':', pos + 2)
+        start = colon + 2
+        end = start + int(data[pos + 2:colon])
+        return data[start:end].decode('utf-8', 'surrogateescape'), end + 2
+    if kind in (b'a', b'O'):
+        if kind == b'O':
+            # O:8:"stdClass":2:{...} - skip to the closing quote of the class name
+            colon = data.index(b':', pos + 2)
+            pos = colon + 2 + int(data[pos + 2:colon])
+        colon = data.index(b':', pos + 2)
+        count = int(data[pos + 2:colon])
+        pos = colon + 2
+        result = {}
+        for _ in range(count):
+            key, pos = _php_value(data, pos)
+            result[key], pos = _php_value(data, pos)
+        if list(result) == list(range(count)):
+            return list(result.values()), pos + 1
+        return result, pos + 1
+    raise ValueError(f"Unknown serialised type {kind!r} at {pos}")
+
+class SQLDumpSource:
+    """Media library and content usage read from a WordPress SQL dump
+
+    Only published content is scanned, matching a REST scan. Meta rows are
+    scanned as they stream past and kept only for posts that turn out to
+    be published content, so the dump may list postmeta before posts.
+    """
+
+    def __init__(self, path: str, base_url: str, table_prefix: str = 'wp_',
+                 uploads_url: Optional[str] = None, content_statuses: Tuple[str, ...] = ('publish',),
+                 skipped_types=(), batch_size: int = 100):
+        self.path = path
+        self.base_url = base_url.rstrip('/')
+        self.posts_table = f"{table_prefix}posts"
+        self.postmeta_table = f"{table_prefix}postmeta"
+        self.uploads_url = (uploads_url or f"{self.base_url}/wp-content/uploads").rstrip('/')
+        self.content_statuses = frozenset(content_statuses)
+        self.skipped_types = frozenset(skipped_types) | INTERNAL_POST_TYPES
+        self.batch_size = batch_size
+
+        self.watermarks = {}  # Latest post_modified per post type
+        self.trashed_post_ids = set()  # Posts whose attachments count as unattached
+        self.stats = {}
+
+    def scan(self, extract_page: Callable[[List[Dict]], List[ItemReferences]]
+             ) -> Tuple[List[Dict], Set[str], Set[int]]:
+        """One pass over the dump: (media records, used image keys, used media IDs)
+
+        extract_page turns a batch of REST-shaped content items into
+        reference rows, as WordPressImageCleanup._extract_page_references does.
+        """
+        start_time = time.time()
+        image_extractor = ImageExtractor(self.base_url)
+        attachments = {}
+        attachment_meta = {}
+        content_ids = set()
+        meta_references = {}  # post ID -> (image keys, media IDs) found in its meta
+        used_keys = set()
+        used_media_ids = set()
+        content_counts = {}
+        row_counts = {self.posts_table: 0, self.postmeta_table: 0}
+        batch = []
+
+        tables = {self.posts_table: POSTS_COLUMNS, self.postmeta_table: POSTMETA_COLUMNS}
+        for table, row in iter_dump_rows(self.path, tables):
+            row_counts[table] += 1
+            if table == self.postmeta_table:
+                self._scan_meta(row, image_extractor, attachment_meta, meta_references)
+                continue
+
+            post_type = row.get('post_type')
+            if post_type == 'attachment':
+                if (row.get('post_mime_type') or '').startswith('image/') and row.get('post_status') != 'trash':
+                    attachments[int(row['ID'])] = self._attachment_row(row)
+                continue
+            if row.get('post_status') == 'trash':
+                self.trashed_post_ids.add(int(row['ID']))
+            if post_type in self.skipped_types or row.get('post_status') not in self.content_statuses:
+                continue
+
+            content_ids.add(int(row['ID']))
+            content_counts[post_type] = content_counts.get(post_type, 0) + 1
+            modified = _iso(row.get('post_modified'))
+            if modified > self.watermarks.get(post_type, ''):
+                self.watermarks[post_type] = modified
+            batch.append(self._content_item(row, modified))
+            if len(batch) >= self.batch_size:
+                self._extract(extract_page, batch, used_keys, used_media_ids)
+                batch = []
+        self._extract(extract_page, batch, used_keys, used_media_ids)
+
+        for post_id, (image_keys, media_ids) in meta_references.items():
+            if post_id in content_ids:
+                used_keys.update(image_keys)
+                used_media_ids.update(media_ids)
+
+        media = [self._media_record(media_id, row, attachment_meta.get(media_id, {}))
+                 for media_id, row in attachments.items()]
+
+        elapsed = time.time() - start_time
+        dump_mb = os.path.getsize(self.path) / 1024 / 1024
+        self.stats = {
+            'dump_mb': round(dump_mb, 1),
+            'seconds': round(elapsed, 2),
+            'mb_per_second': round(dump_mb / elapsed, 1) if elapsed > 0 else 0.0,
+            'posts_rows': row_counts[self.posts_table],
+            'postmeta_rows': row_counts[self.postmeta_table],
+            'media': len(media),
+            'content_items': content_counts
+        }
+        logger.info(f"🗄️ Read {self.path}: {len(media)} images and {len(content_ids)} published items "
+                    f"from {row_counts[self.posts_table]} posts / {row_counts[self.postmeta_table]} "
+                    f"meta rows in {elapsed:.1f}s ({self.stats['mb_per_second']} MB/s)")
+        return media, used_keys, used_media_ids
+
+    def rest_watermarks(self) -> Dict[str, str]:
+        """Watermarks of core post types under their REST bases
+
+        Other types are left out, so executing a plan rescans them in full.
+        """
+        return {CORE_REST_BASES[post_type]: watermark for post_type, watermark in self.watermarks.items()
+                if post_type in CORE_REST_BASES}
+
+    def _scan_meta(self, row: Dict, image_extractor: ImageExtractor, attachment_meta: Dict[int, Dict],
+                   meta_references: Dict[int, Tuple[Set[str], Set[int]]]):
+        """Keep attachment meta for the media join; scan other meta for references"""
+        key = row.get('meta_key') or ''
+        if key in IGNORED_META_KEYS or not row.get('meta_value'):
+            return
+        post_id = int(row['post_id'])
+        if key in ATTACHMENT_META_KEYS:
+            value = row['meta_value']
+            if key == '_wp_attachment_metadata':
+                value = _attachment_details(maybe_unserialize(value))
+            attachment_meta.setdefault(post_id, {})[key] = value
+            return
+
+        if key == '_thumbnail_id':
+            urls, media_ids = set(), {int(row['meta_value'])} if row['meta_value'].isdigit() else set()
+        else:
+            urls, media_ids = extract_item({'id': post_id, 'meta': {key: maybe_unserialize(row['meta_value'])}},
+                                           image_extractor)
+        if urls or media_ids:
+            image_keys, found_ids = meta_references.setdefault(post_id, (set(), set()))
+            image_keys.update(canonical_image_key(url) for url in urls)
+            found_ids.update(media_ids)
+
+    def _attachment_row(self, row: Dict) -> Dict:
+        """The wp_posts columns a media record needs"""
+        return {
+            'title': row.get('post_title') or '',
+            'guid': row.get('guid') or '',
+            'date': _iso(row.get('post_date')),
+            'modified': _iso(row.get('post_modified')),
+            'post': int(row.get('post_parent') or 0),
+            'mime_type': row.get('post_mime_type') or '',
+            'caption': row.get('post_excerpt') or '',
+            'description': row.get('post_content') or ''
+        }
+
+    def _media_record(self, media_id: int, row: Dict, meta: Dict) -> Dict:
+        """A media record shaped like WordPressImageCleanup._media_record's"""
+        attached_file = meta.get('_wp_attached_file')
+        details = meta.get('_wp_attachment_metadata') or {}
+        return {
+            'id': media_id,
+            'title': row['title'],
+            'source_url': f"{self.uploads_url}/{attached_file}" if attached_file else row['guid'],
+            'date': row['date'],
+            'modified': row['modified'],
+            'post': row['post'],
+            'file_size': details.get('filesize', 0),
+            'mime_type': row['mime_type'],
+            'alt_text': meta.get('_wp_attachment_image_alt', ''),
+            'caption': row['caption'],
+            'description': row['description'],
+            'sizes': details.get('sizes', [])
+        }
+
+    def _content_item(self, row: Dict, modified: str) -> Dict:
+        """A REST-shaped item for the reference extractors
+
+        post_content is raw block markup, which the HTML extractor and the
+        block attribute extractor both read.
+        """
+        content = row.get('post_content') or ''
+        return {
+            'id': int(row['ID']),
+            'modified': modified,
+            'content': {'rendered': content, 'raw': content},
+            'excerpt': {'rendered': row.get('post_excerpt') or ''}
+        }
+
+    def _extract(self, extract_page, batch: List[Dict], used_keys: Set[str], used_media_ids: Set[int]):
+        if not batch:
+            return
+        for _, _, image_keys, media_ids in extract_page(batch):
+            used_keys.update(image_keys)
+            used_media_ids.update(media_ids)
+
+def _attachment_details(metadata) -> Dict:
+    """filesize and size variant file names from _wp_attachment_metadata"""
+    if not isinstance(metadata, dict):
+        return {}
+    sizes = metadata.get('sizes')
+    return {
+        'filesize': metadata.get('filesize') if isinstance(metadata.get('filesize'), int) else 0,
+        'sizes': [size.get('file', '') for size in sizes.values() if isinstance(size, dict)]
+                 if isinstance(sizes, dict) else []
+    }
+
+def _iso(mysql_datetime: Optional[str]) -> str:
+    """'2025-07-01 09:00:00' in the REST API's '2025-07-01T09:00:00' form"""
+    return (mysql_datetime or '').replace(' ', 'T')
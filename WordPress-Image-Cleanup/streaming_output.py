@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Streaming Backup and Report Output
+Backups written as gzip-compressed JSON lines, one image per line, between
+a header record carrying the totals and a trailer marking the file
+complete; and CSV/HTML reports of deletion candidates sorted by bytes
+reclaimable. Everything is written as it is produced, so memory and write
+time stay flat however many images a run finds.
+
+Australian English version
+"""
+
+import csv
+import gzip
+import heapq
+import html
+import json
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+BACKUP_FORMAT = 'wp-image-cleanup-backup'
+BACKUP_VERSION = 1
+
+# zlib level 6 compresses nearly as well as gzip's default 9 in a fraction of the time
+GZIP_LEVEL = 6
+
+REPORT_COLUMNS = ('id', 'title', 'bytes', 'mime_type', 'date', 'attached_post', 'parent_deleted', 'source_url')
+
+def _open_text(filename: str, mode: str):
+    """Open a backup for text reading or writing, gzip-compressed when named .gz"""
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode + 't', encoding='utf-8', compresslevel=GZIP_LEVEL)
+    return open(filename, mode, encoding='utf-8')
+
+class BackupWriter:
+    """Write backup entries one line at a time
+
+    The header record holds the image count and bytes the caller expects
+    to write, so readers get totals from the first line alone. The trailer
+    is written only when the block exits cleanly; a backup without one
+    was cut short.
+    """
+
+    def __init__(self, filename: str, site: str, images: int, total_bytes: int):
+        self.filename = filename
+        self.images = 0
+        self.bytes = 0
+        self._file = _open_text(filename, 'w')
+        self._write({'record': 'header', 'format': BACKUP_FORMAT, 'version': BACKUP_VERSION, 'site': site,
+                     'created': datetime.now().isoformat(), 'images': images, 'bytes': total_bytes})
+
+    def __enter__(self) -> 'BackupWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self._write({'record': 'trailer', 'images': self.images, 'bytes': self.bytes,
+                             'completed': datetime.now().isoformat()})
+        finally:
+            self._file.close()
+
+    def _write(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def write(self, entry: Dict):
+        """Append one image's backup entry"""
+        self._write(entry)
+        self.images += 1
+        self.bytes += entry.get('file_size') or 0
+
+def read_backup_header(filename: str) -> Dict:
+    """Site, image count and bytes of a backup, read from its first line
+
+    Older backups (a single JSON list) are loaded and counted instead.
+    """
+    if filename.endswith('.json'):
+        with open(filename, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        return {'record': 'header', 'format': BACKUP_FORMAT, 'version': 0, 'images': len(entries),
+                'bytes': sum(entry.get('file_size') or 0 for entry in entries)}
+    with _open_text(filename, 'r') as f:
+        header = json.loads(f.readline() or '{}')
+    if header.get('record') != 'header' or header.get('format') != BACKUP_FORMAT:
+        raise ValueError(f"{filename} is not an image cleanup backup")
+    return header
+
+def iter_backup(filename: str) -> Iterator[Dict]:
+    """Backup entries one at a time, from either backup format
+
+    Warns when a JSON-lines backup has no trailer: the entries read are
+    still good, but images after them are missing.
+    """
+    if filename.endswith('.json'):
+        with open(filename, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+    complete = False
+    with _open_text(filename, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break  # A line cut short by an interrupted run
+            kind = record.get('record')
+            if kind == 'trailer':
+                complete = True
+            elif kind is None:
+                yield record
+    if not complete:
+        logger.warning(f"⚠️ Backup {filename} has no trailer - it was cut short and may be missing images")
+
+def largest(media_ids: Iterable[int], size: Callable[[int], int], count: int) -> List[int]:
+    """The count IDs with the largest sizes, biggest first, using a bounded heap"""
+    return heapq.nlargest(count, media_ids, key=size)
+
+def write_csv_report(filename: str, rows: Iterable[Dict]) -> int:
+    """Write report rows (REPORT_COLUMNS) as CSV, returning how many were written"""
+    written = 0
+    with open(filename, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    return written
+
+def write_html_report(filename: str, summary: Dict, top_rows: List[Dict], rows: Iterable[Dict]) -> int:
+    """Write a standalone HTML report: summary, the largest images, then every row"""
+    def table_row(row: Dict) -> str:
+        url = html.escape(row['source_url'] or '')
+        return (f"<tr><td>{row['id']}</td><td>{html.escape(row['title'] or '')}</td>"
+                f"<td class=\"num\">{row['bytes'] / 1024:,.1f}</td><td>{html.escape(row['mime_type'] or '')}</td>"
+                f"<td>{html.escape(row['date'] or '')}</td><td>{row['attached_post'] or ''}"
+                f"{' (trashed)' if row['parent_deleted'] else ''}</td>"
+                f"<td><a href=\"{url}\">{url}</a></td></tr>\n")
+
+    header = ("<tr><th>ID</th><th>Title</th><th>KB</th><th>Type</th><th>Date</th>"
+              "<th>Attached Post</th><th>URL</th></tr>\n")
+    written = 0
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("<!DOCTYPE html>\n<html lang=\"en-AU\">\n<head>\n<meta charset=\"utf-8\">\n"
+                "<title>WordPress Image Cleanup Report</title>\n"
+                "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;font-size:0.9em}"
+                "td,th{border:1px solid #ccc;padding:0.3em 0.6em;text-align:left}"
+                "td.num{text-align:right}</style>\n</head>\n<body>\n")
+        f.write("<h1>WordPress Image Cleanup Report</h1>\n<ul>\n")
+        for label, value in summary.items():
+            f.write(f"<li><strong>{html.escape(label)}:</strong> {html.escape(str(value))}</li>\n")
+        f.write("</ul>\n")
+        if top_rows:
+            f.write(f"<h2>Largest {len(top_rows)} Unused Images</h2>\n<table>\n{header}")
+            f.writelines(table_row(row) for row in top_rows)
+            f.write("</table>\n")
+        f.write(f"<h2>All Unused Images (largest first)</h2>\n<table>\n{header}")
+        for row in rows:
+            f.write(table_row(row))
+            written += 1
+        f.write("</table>\n</body>\n</html>\n")
+    return written
@@ -0,0 +1,41 @@
+"""
+Shared fixtures: a local stand-in WordPress server and a cleanup pointed at it
+
+Australian English version
+"""
+
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configured before the cleanup is imported, so its image_cleanup.log handler is never installed
+logging.basicConfig(level=logging.INFO, handlers=[logging.StreamHandler()])
+
+from fake_wordpress_server import FakeWordPressServer
+from rate_limiter import AdaptiveRateLimiter
+from wordpress_image_cleanup import WordPressImageCleanup
+
+@pytest.fixture
+def server():
+    """A fake site of 40 images served on a free local port"""
+    with FakeWordPressServer(media_count=40, post_count=10, page_count=2) as fake:
+        yield fake
+
+@pytest.fixture
+def make_cleanup(tmp_path, monkeypatch):
+    """Build a live-mode cleanup for a server, writing its logs under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+
+    def make(fake: FakeWordPressServer) -> WordPressImageCleanup:
+        cleanup = WordPressImageCleanup(fake.base_url, 'tester', 'password',
+                                        index_path=str(tmp_path / 'image_cleanup.db'))
+        cleanup.rate_limiter = AdaptiveRateLimiter(initial_rate=500, max_rate=1000)
+        cleanup.retry_backoff = 0.01
+        cleanup.dry_run = False
+        return cleanup
+
+    return make
@@ -0,0 +1,95 @@
+"""
+Batch deletion through /wp-json/batch/v1 against the fake WordPress server:
+detection, grouping, fallback to single DELETEs and partial failures
+
+Australian English version
+"""
+
+from deletion_executor import DeletionExecutor
+from fake_wordpress_server import FakeWordPressServer
+
+def requests_made(fake, method, path):
+    """How many requests the fake server saw for a method and path"""
+    return sum(1 for logged in fake.site.request_log if logged == (method, path))
+
+def single_deletes(fake):
+    return sum(1 for method, path in fake.site.request_log
+               if method == 'DELETE' and path.startswith('/wp-json/wp/v2/media/'))
+
+def test_batch_api_detected_from_route_schema(server, make_cleanup):
+    cleanup = make_cleanup(server)
+    assert cleanup.test_connection()
+    assert cleanup.batch_api_available
+    assert cleanup.batch_api_max_items == 25
+
+def test_batch_api_not_used_when_route_missing(make_cleanup):
+    with FakeWordPressServer(media_count=20, batch_enabled=False) as fake:
+        cleanup = make_cleanup(fake)
+        assert cleanup.test_connection()
+        assert not cleanup.batch_api_available
+
+        results = cleanup.batch_delete(set(range(1, 13)))
+
+        assert results['deleted'] == 12
+        assert single_deletes(fake) == 12
+        assert requests_made(fake, 'POST', '/wp-json/batch/v1') == 0
+        assert not any(media_id in fake.site.media for media_id in range(1, 13))
+
+def test_batch_delete_groups_through_batch_endpoint(server, make_cleanup):
+    cleanup = make_cleanup(server)
+    cleanup.test_connection()
+    cleanup.max_deletions_per_batch = 20
+
+    results = cleanup.batch_delete(set(range(1, 21)))
+
+    assert (results['deleted'], results['failed']) == (20, 0)
+    assert requests_made(server, 'POST', '/wp-json/batch/v1') == 4
+    assert single_deletes(server) == 0
+    assert not any(media_id in server.site.media for media_id in range(1, 21))
+
+def test_groups_spread_across_in_flight_workers():
+    sizes = []
+
+    def delete_group(group):
+        sizes.append(len(group))
+        return {media_id: True for media_id in group}
+
+    executor = DeletionExecutor(lambda media_id: True, max_in_flight=4, batch_size=10,
+                                delete_group_fn=delete_group, group_size=25)
+    results = executor.run(range(1, 11))
+
+    assert results['deleted'] == 10
+    assert sorted(sizes) == [1, 3, 3, 3]
+
+def test_partial_failure_maps_sub_responses(server, make_cleanup):
+    cleanup = make_cleanup(server)
+    cleanup.test_connection()
+
+    outcomes = cleanup.delete_images_batch([1, 2, 9999, 3])
+
+    assert outcomes == {1: True, 2: True, 9999: False, 3: True}
+    assert requests_made(server, 'POST', '/wp-json/batch/v1') == 1
+    assert single_deletes(server) == 0
+    assert cleanup.batch_api_available
+
+def test_rest_batch_not_allowed_falls_back_to_single_deletes(server, make_cleanup):
+    server.site.batch_media_delete = False
+    cleanup = make_cleanup(server)
+    cleanup.test_connection()
+
+    outcomes = cleanup.delete_images_batch([1, 2, 3])
+
+    assert outcomes == {1: True, 2: True, 3: True}
+    assert single_deletes(server) == 3
+    assert not cleanup.batch_api_available
+    assert not any(media_id in server.site.media for media_id in (1, 2, 3))
+
+def test_failed_batch_call_retries_individually(server, make_cleanup):
+    cleanup = make_cleanup(server)
+    cleanup.test_connection()
+    server.site.batch_enabled = False  # The route disappears after detection
+
+    outcomes = cleanup.delete_images_batch([4, 5, 9999])
+
+    assert outcomes == {4: True, 5: True, 9999: False}
+    assert single_deletes(server) == 3
@@ -0,0 +1,38 @@
+"""
+Attachment parent validation against the fake WordPress server: only
+parents confirmed to be in the trash leave their images unattached
+
+Australian English version
+"""
+
+def scan(cleanup):
+    """Scan the fake site and identify its unused images"""
+    assert cleanup.test_connection()
+    cleanup.discover_content_types()
+    cleanup.scan_library()
+    return cleanup.identify_unused_images()
+
+def test_parent_outside_rest_types_keeps_its_image(server, make_cleanup):
+    server.site.add_media(5000, post=777777)  # e.g. a private CPT with show_in_rest=false
+    cleanup = make_cleanup(server)
+
+    unused = scan(cleanup)
+
+    assert 5000 not in unused
+    assert 5000 not in cleanup.orphaned_media
+    assert cleanup.parent_stats['deleted_parents'] == 0
+    assert len(unused) == server.site.expected_unused()
+
+def test_trashed_parent_leaves_its_image_unattached(server, make_cleanup):
+    server.site.add_content('posts', 9000, '<p>No images here</p>', status='trash')
+    server.site.add_content('posts', 9001, '<p>Still live</p>', status='draft')
+    server.site.add_media(5000, post=9000)
+    server.site.add_media(5001, post=9001)
+    cleanup = make_cleanup(server)
+
+    unused = scan(cleanup)
+
+    assert 5000 in unused
+    assert cleanup.orphaned_media == {5000}
+    assert 5001 not in unused
+    assert cleanup.parent_stats['deleted_parents'] == 1
@@ -0,0 +1,69 @@
+"""
+restore_media against the fake WordPress server: backed-up files are
+streamed back up, resent whole after a throttled attempt, and content
+is pointed at the new attachments
+
+Australian English version
+"""
+
+import glob
+import hashlib
+
+import requests
+
+from restore_media import MediaRestore, rewrite_markup
+
+def test_restore_streams_files_and_rewrites_references(server, make_cleanup):
+    cleanup = make_cleanup(server)
+    results = cleanup.run_cleanup(dry_run=False)
+    deleted = sorted(cleanup.unused_images)[:2]
+    assert results['deletion_results']['deleted'] == len(cleanup.unused_images)
+    server.site.add_content('posts', 9000, f'<img src="{server.site.upload_url(deleted[0], "-300x200")}" '
+                                           f'class="wp-image-{deleted[0]}">', featured_media=deleted[1])
+
+    # The first upload is answered 503 after its body was read; the retry must resend it all
+    restorer = make_cleanup(server)
+    restorer.test_connection()
+    send = restorer.session.request
+    throttled = []
+
+    def throttle_first_upload(method, url, **kwargs):
+        if method == 'POST' and url.endswith('/wp/v2/media') and not throttled:
+            throttled.append(kwargs['data'].read())
+            response = requests.Response()
+            response.status_code = 503
+            response._content = b''
+            return response
+        return send(method, url, **kwargs)
+
+    restorer.session.request = throttle_first_upload
+    restore = MediaRestore(restorer, glob.glob('image_backup_*.jsonl.gz')[0], 'image_backup_store', max_workers=2)
+    stats = restore.restore(deleted)
+
+    assert (stats['restored'], stats['failed']) == (2, [])
+    for old_id in deleted:
+        new_item = server.site.media[restore.id_map[old_id]]
+        path = new_item['source_url'].split(server.site.host, 1)[1]
+        record = next(restore.store.entries({server.site.upload_url(old_id)}))
+        assert hashlib.sha256(server.site.uploaded_files[path]).hexdigest() == record['sha256']
+
+    rewrite = restore.rewrite_references(dry_run=False)
+    item = server.site.content['posts'][9000]
+    assert (rewrite['items_changed'], rewrite['updated'], rewrite['references']) == (1, 1, 3)
+    assert item['featured_media'] == restore.id_map[deleted[1]]
+    assert f"wp-image-{restore.id_map[deleted[0]]}" in item['content']['raw']
+
+def test_rewrite_leaves_non_media_id_attributes_alone():
+    raw = ('<!-- wp:latest-posts {"categoryId":17,"authorId":17} /-->\n'
+           '<!-- wp:image {"id":17,"sizeSlug":"large"} -->\n<figure class="wp-block-image">'
+           '<img class="wp-image-17" src="/wp-content/uploads/a.jpg"/></figure>\n<!-- /wp:image -->\n'
+           '<!-- wp:media-text {"mediaId":17,"postId":17} /-->\n[gallery ids="5,17"]')
+
+    rewritten, changed = rewrite_markup(raw, {17: 90}, {})
+
+    assert changed == 4
+    assert '{"categoryId":17,"authorId":17}' in rewritten
+    assert '{"id":90,"sizeSlug":"large"}' in rewritten
+    assert 'wp-image-90' in rewritten
+    assert '{"mediaId":90,"postId":17}' in rewritten
+    assert '[gallery ids="5,90"]' in rewritten
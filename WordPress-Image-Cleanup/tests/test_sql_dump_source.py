@@ -0,0 +1,38 @@
+"""
+Offline analysis from a synthetic mysqldump of the fake WordPress site:
+the dump scan finds the same unused images as a REST scan, through
+serialized postmeta and escaped quotes
+
+Australian English version
+"""
+
+def add_dump_edge_cases(site):
+    """Images referenced only through quoted HTML and serialized meta/ACF"""
+    for media_id in range(5001, 5006):
+        site.add_media(media_id)
+    site.add_content('posts', 9000, f'<p>It\'s a "test"</p><img alt="O\'Brien\'s" title=\'say "hi"\' '
+                                    f'src="{site.upload_url(5001)}">')
+    site.add_content('posts', 9001, '<p>Hero</p>',
+                     meta={'hero': {'id': 5002, 'url': site.upload_url(5002), 'caption': 'It\'s "big"'}})
+    site.add_content('pages', 9002, '<p>Gallery</p>',
+                     acf={'gallery_ids': '5003,5004', 'notes': ['O\'Brien\'s "pick"', 'a\\b']})
+
+def test_dump_scan_matches_rest_scan(server, make_cleanup, tmp_path):
+    add_dump_edge_cases(server.site)
+
+    rest = make_cleanup(server)
+    assert rest.test_connection()
+    rest.discover_content_types()
+    rest.scan_library()
+    rest_unused = rest.identify_unused_images()
+
+    dump_path = str(tmp_path / 'site.sql')
+    server.site.write_sql_dump(dump_path, rows_per_insert=7)
+    offline = make_cleanup(server)
+    offline.scan_sql_dump(dump_path)
+    dump_unused = offline.identify_unused_images()
+
+    assert dump_unused == rest_unused
+    assert not dump_unused & {5001, 5002, 5003, 5004}
+    assert 5005 in dump_unused
+    assert len(offline.all_media) == len(rest.all_media)
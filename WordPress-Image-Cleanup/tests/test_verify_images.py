@@ -0,0 +1,21 @@
+"""
+verify_all_images against the fake WordPress server: images on other
+hosts are checked along with the site's own uploads
+
+Australian English version
+"""
+
+from fake_wordpress_server import FakeWordPressServer
+from verify_site_after_cleanup import verify_all_images
+
+def test_images_on_other_hosts_are_checked(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with FakeWordPressServer(media_count=5) as cdn:
+        server.site.add_content('posts', 9000, f'<img src="{cdn.site.upload_url(2)}" '
+                                               f'srcset="{cdn.site.upload_url(99)} 300w">')
+
+        report = verify_all_images(server.base_url, 'tester', 'password', max_workers=4, cache_file=None)
+
+    assert report['other_host_urls'] == 2
+    assert report['broken_urls'] == 1
+    assert list(report['broken_by_page'].values()) == [[f"{cdn.site.upload_url(99)} (404)"]]
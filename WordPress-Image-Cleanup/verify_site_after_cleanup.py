@@ -6,13 +6,162 @@ Australian English version with timezone awareness
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import re
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time
 
-def verify_site_health(base_url, username, password):
-    """Verify site is still healthy after cleanup"""
+from image_extractor import ABSOLUTE_URL_PATTERN, ImageExtractor
+from instrumentation import percentile
+from wordpress_image_cleanup import WordPressImageCleanup
+
+# ETag / Last-Modified of every image that loaded, so the next full
+# verification sends conditional requests and unchanged images cost a 304
+IMAGE_CHECK_CACHE = 'image_check_cache.json'
+
+def verify_all_images(base_url, username, password, max_workers=32, cache_file=IMAGE_CHECK_CACHE):
+    """HEAD-check every image URL referenced across the site's content
+    
+    Every REST content type is paged with the cleanup's scanner, and its
+    rendered HTML and featured images are collected per page, including
+    images served from a CDN or any other host. Each distinct URL is
+    checked once on a pooled session, max_workers at a time.
+    """
+    print("🔍 Verifying every image referenced in site content...")
+    start_time = time.time()
+    
+    scanner = WordPressImageCleanup(base_url, username, password)
+    scanner.raw_content = False  # Rendered HTML is what visitors load
+    scanner.discover_content_types()
+    extractor = ImageExtractor(scanner.base_url, any_host=True)
+    scheme = scanner.base_url.split('//', 1)[0]
+    
+    pages_by_url = {}
+    pages_by_featured_id = {}
+    pages_scanned = 0
+    fields = {'_fields': 'id,link,featured_media,content.rendered,excerpt.rendered'}
+    for content_type in scanner.content_types:
+        for items in scanner._iter_content_pages(content_type, fields):
+            for item in items:
+                pages_scanned += 1
+                page = item.get('link') or f"{content_type}/{item['id']}"
+                html = (item.get('content') or {}).get('rendered', '') + (item.get('excerpt') or {}).get('rendered', '')
+                urls, _ = extractor.extract(html)
+                for url in urls:
+                    if url.startswith('//'):
+                        url = scheme + url
+                    pages_by_url.setdefault(url, set()).add(page)
+                if item.get('featured_media'):
+                    pages_by_featured_id.setdefault(item['featured_media'], set()).add(page)
+    
+    # Featured images are checked by URL; deleted attachments are broken outright
+    broken_by_page = {}
+    featured = scanner._fetch_by_ids('media', pages_by_featured_id, {'_fields': 'id,source_url'}, 'verification')
+    found_ids = set()
+    for media in featured:
+        found_ids.add(media['id'])
+        if media.get('source_url'):
+            pages_by_url.setdefault(media['source_url'], set()).update(pages_by_featured_id[media['id']])
+    for media_id in set(pages_by_featured_id) - found_ids:
+        for page in pages_by_featured_id[media_id]:
+            broken_by_page.setdefault(page, []).append(f"featured image #{media_id} (attachment deleted)")
+    
+    cache = {}
+    if cache_file and os.path.exists(cache_file):
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    
+    urls = sorted(pages_by_url)
+    other_hosts = sum(1 for url in urls
+                      if (ABSOLUTE_URL_PATTERN.match(url) or [None, ''])[1].lower() not in extractor.hosts)
+    print(f"🔍 {len(urls)} distinct image URLs ({other_hosts} on other hosts) on {pages_scanned} pages - "
+          f"checking {max_workers} at a time")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda url: _check_image(session, url, cache.get(url, {})), urls))
+    session.close()
+    
+    latencies = []
+    broken_urls = []
+    not_modified = 0
+    for url, status, elapsed, validators in results:
+        latencies.append(elapsed)
+        if status == 304:
+            not_modified += 1
+        elif status is None or status >= 400:
+            broken_urls.append(url)
+            cache.pop(url, None)
+            for page in pages_by_url[url]:
+                broken_by_page.setdefault(page, []).append(f"{url} ({status or 'no response'})")
+            continue
+        if validators:
+            cache[url] = validators
+    
+    if cache_file:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    
+    elapsed = time.time() - start_time
+    latencies.sort()
+    report = {
+        'pages_scanned': pages_scanned,
+        'unique_urls': len(urls),
+        'other_host_urls': other_hosts,
+        'not_modified': not_modified,
+        'broken_urls': len(broken_urls),
+        'broken_pages': len(broken_by_page),
+        'broken_by_page': {page: sorted(broken) for page, broken in sorted(broken_by_page.items())},
+        'latency_ms': {label: round(percentile(latencies, fraction) * 1000, 1)
+                       for label, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))},
+        'seconds': round(elapsed, 2),
+        'urls_per_second': round(len(urls) / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    
+    if broken_by_page:
+        print(f"❌ {len(broken_urls)} broken image URLs on {len(broken_by_page)} pages")
+        for page, broken in list(report['broken_by_page'].items())[:10]:
+            print(f"   {page}: {', '.join(broken[:3])}{' ...' if len(broken) > 3 else ''}")
+    else:
+        print(f"✅ All {len(urls)} referenced images loading ({not_modified} unchanged since last check)")
+    print(f"   Latency p50 {report['latency_ms']['p50']}ms, p99 {report['latency_ms']['p99']}ms - "
+          f"{report['urls_per_second']} URLs/s")
+    return report
+
+def _check_image(session, url, cached):
+    """(url, status or None, seconds, validators) for one conditional HEAD request"""
+    headers = {}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+    
+    start_time = time.time()
+    try:
+        response = session.head(url, headers=headers, timeout=15, allow_redirects=True)
+        if response.status_code in (405, 501):
+            # Servers that refuse HEAD: fetch, but stop after the headers
+            response = session.get(url, headers=headers, timeout=15, stream=True)
+            response.close()
+    except requests.RequestException:
+        return url, None, time.time() - start_time, {}
+    
+    validators = {key: response.headers[header] for key, header in
+                  (('etag', 'ETag'), ('last_modified', 'Last-Modified')) if header in response.headers}
+    return url, response.status_code, time.time() - start_time, validators or cached
+
+def verify_site_health(base_url, username, password, image_report=None):
+    """Verify site is still healthy after cleanup
+    
+    Pass the result of verify_all_images as image_report to add an
+    all_images_loading check covering every referenced image.
+    """
     
     print("🔍 Verifying site health after image cleanup...")
     
@@ -57,7 +206,7 @@ def verify_site_health(base_url, username, password):
                         img_url = featured.get('source_url', '')
                         if img_url:
                             try:
-                                img_response = requests.head(img_url, timeout=10)
+                                img_response = session.head(img_url, timeout=10)
                                 if img_response.status_code == 200:
                                     working_images += 1
                             except:
@@ -125,6 +274,14 @@ def verify_site_health(base_url, username, password):
     except Exception as e:
         print(f"⚠️  Could not measure load time: {e}")
     
+    # Check 6: Every referenced image (full verification)
+    if image_report is not None:
+        checks['all_images_loading'] = image_report['broken_urls'] == 0 and image_report['broken_pages'] == 0
+        if checks['all_images_loading']:
+            print(f"✅ All {image_report['unique_urls']} referenced images loading")
+        else:
+            print(f"❌ {image_report['broken_pages']} pages have broken images")
+    
     # Summary
     passed = sum(checks.values())
     total = len(checks)
@@ -153,6 +310,7 @@ def main():
     BASE_URL = "https://your-wordpress-site.com.au"
     USERNAME = "your_username"
     PASSWORD = "your_application_password"  # WordPress Application Password
+    FULL_IMAGE_VERIFICATION = True  # HEAD-check every image referenced in content
     
     print("WordPress Site Verification After Image Cleanup (Australian Edition)")
     print("=" * 75)
@@ -161,13 +319,15 @@ def main():
     print()
     
     try:
-        results, health_status = verify_site_health(BASE_URL, USERNAME, PASSWORD)
+        image_report = verify_all_images(BASE_URL, USERNAME, PASSWORD) if FULL_IMAGE_VERIFICATION else None
+        results, health_status = verify_site_health(BASE_URL, USERNAME, PASSWORD, image_report)
         
         # Save verification log
         log_data = {
             'timestamp': datetime.now().isoformat(),
             'site': BASE_URL,
             'checks': results,
+            'image_verification': image_report,
             'health_status': health_status,
             'summary': f"{sum(results.values())}/{len(results)} checks passed",
             'timezone': 'AEST/AEDT',
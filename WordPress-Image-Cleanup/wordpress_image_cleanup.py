@@ -7,30 +7,67 @@ Australian English version with timezone awareness
 """
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import random
 import re
 import time
 import logging
-from datetime import datetime
-from typing import Dict, List, Set, Optional
-from urllib.parse import urlparse, urljoin
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Set, Optional, Tuple
 import os
 
+from media_index import MediaIndex, latest_modified
+from media_table import LAZY_KEYS, MediaTable
+from image_extractor import ImageExtractor, VARIANT_SUFFIX_PATTERN, canonical_image_key
+from extraction_pool import ExtractionPool, ItemReferences
+from environment_targets import EnvironmentTarget, base_path, rebase_image_key
+from reference_extractors import extract_item
+from sql_dump_source import SQLDumpSource
+from deletion_executor import CircuitBreaker, DeletionExecutor
+from binary_backup import BinaryBackup
+from streaming_output import BackupWriter, largest, write_csv_report, write_html_report
+from deletion_plan import PlanError, build_plan, load_plan, save_plan
+from instrumentation import PROFILED_PHASES, Instrumentation, endpoint_name
+from run_journal import JournalState, RunJournal
+from rate_limiter import AdaptiveRateLimiter, THROTTLE_STATUS_CODES, parse_retry_after
+
 # Configure logging with Australian timezone awareness
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('image_cleanup.log'),
+        logging.FileHandler('image_cleanup.log', delay=True),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger(__name__)
 
+class IncompleteFetchError(RuntimeError):
+    """A collection could not be fetched completely, even after retries"""
+
 class WordPressImageCleanup:
     """Safe WordPress image cleanup with deletion capabilities"""
     
-    def __init__(self, base_url: str, username: str, password: str):
+    # Fields each stage reads from the REST API (lean fetch mode)
+    MEDIA_FIELDS = ('id,title,source_url,date,modified,post,mime_type,alt_text,caption,'
+                    'description,meta,media_details.filesize,media_details.sizes')
+    # Compact media storage loads caption/description/meta lazily instead
+    COMPACT_MEDIA_FIELDS = ('id,title,source_url,date,modified,post,mime_type,alt_text,'
+                            'media_details.filesize,media_details.sizes')
+    CONTENT_FIELDS = 'id,modified,featured_media,content.rendered,content.raw,excerpt.rendered,meta,acf'
+    
+    # Post types with nothing to scan, or whose REST IDs are not post IDs
+    SKIPPED_CONTENT_TYPES = frozenset(('attachment', 'wp_template', 'wp_template_part',
+                                       'wp_global_styles', 'wp_font_family', 'wp_font_face'))
+    
+    # Images per backup chunk: captions are fetched and entries written a chunk at a time
+    BACKUP_CHUNK_SIZE = 1000
+    
+    def __init__(self, base_url: str, username: str, password: str, max_workers: int = 4,
+                 index_path: str = 'image_cleanup.db', environments: List[EnvironmentTarget] = None):
         self.base_url = base_url.rstrip('/')
         self.username = username
         self.password = password
@@ -40,45 +77,263 @@ class WordPressImageCleanup:
         self.session.auth = (username, password)
         self.session.headers.update({
             'User-Agent': 'WordPress Image Cleanup/1.0 (Australia)',
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            'Accept-Encoding': 'gzip, deflate'
         })
+        self._pool_size = 0
+        self._pool_lock = threading.Lock()
         
-        # Rate limiting (conservative for Australian hosting)
-        self.request_delay = 0.5
+        # Lean fetch mode: no _embed, only the _fields each stage needs
+        self.lean_fetch = True
+        self.transfer_stats = {}
+        self._transfer_lock = threading.Lock()
+        
+        # Adaptive rate limiting shared by every session call. Starts at the
+        # old conservative 2 req/s and adapts to what the host can sustain.
+        self.rate_limiter = AdaptiveRateLimiter(initial_rate=2.0)
+        self.max_throttle_retries = 3
+        # Optional concurrency cap shared with other sites on the same host
+        # (see network_cleanup.HostQuota); None means no cap
+        self.request_quota = None
         self.batch_size = 50
         
-        # Data storage
+        # Failed pages (connection errors, 5xx) are retried with exponential
+        # backoff: retry_backoff, 2x, 4x... seconds
+        self.page_retries = 3
+        self.retry_backoff = 1.0
+        
+        # Parallel page fetching (WordPress caps per_page at 100)
+        self.parallel_fetch = True
+        self.max_workers = max_workers
+        self.parallel_page_size = 100
+        
+        # Fetch statistics per endpoint (pages/sec for sizing max_workers)
+        self.fetch_stats = {}
+        
+        # Phase timings and per-endpoint request stats, reset for each run
+        # (see instrumentation.py). Optional exports: a Prometheus textfile,
+        # a Trace Event JSON, and cProfile dumps of profile_phases.
+        self.metrics_file = None
+        self.trace_file = None
+        self.profile_dir = None
+        self.profile_phases = PROFILED_PHASES
+        self.instrumentation = Instrumentation()
+        
+        # Optional process pool for CPU-bound HTML extraction (0 = in-process).
+        # Only items with at least extraction_min_bytes of HTML are sent to it.
+        self.extraction_workers = 0
+        self.extraction_min_bytes = 256 * 1024
+        self.extraction_stats = {}
+        self._extraction_pool = None
+        
+        # Append-only checkpoint journal so interrupted runs can resume
+        self.journal_path = 'cleanup_journal.jsonl'
+        
+        # Where reports, backups, plans and deletion logs are written
+        self.output_dir = '.'
+        self.journal = None
+        
+        # Persistent media/usage index for incremental runs
+        self.index_path = index_path
+        self.index = None
+        self.sync_stats = {}
+        
+        # Offline analysis: a mysqldump of wp_posts/wp_postmeta read instead
+        # of scanning over REST (dry runs only, see sql_dump_source.py)
+        self.sql_dump = None
+        self.table_prefix = 'wp_'
+        self.uploads_url = None  # Defaults to {base_url}/wp-content/uploads
+        self.dump_stats = {}
+        self._dump_trashed_posts = None
+        
+        # Attachments whose parent post is in the trash are treated as
+        # unattached; parents are looked up in bulk with include= batches
+        self.validate_parents = True
+        self.parent_stats = {}
+        self.orphaned_media = set()
+        
+        # Data storage (compact_media keeps slotted records, see media_table.py)
+        self.compact_media = True
         self.all_media = {}
         self.used_images = set()
+        self.used_media_ids = set()
         self.unused_images = set()
-        self.backup_data = []
+        self.content_watermarks = {}  # Latest 'modified' seen per content type
+        
+        # Content types are discovered from /wp/v2/types at the start of each
+        # run (content_types is the fallback) and scanned content_type_workers
+        # at a time. Where the account may, raw block markup is fetched
+        # (context=edit) so block attributes are scanned too.
+        self.content_types = ('posts', 'pages')
+        self.discover_types = True
+        self.content_type_workers = 3
+        self.content_type_stats = {}
+        self.raw_content = True
+        self._edit_context_types = set()
+        self._extraction_lock = threading.Lock()
+        
+        # Staging/development copies whose content also counts as usage
+        # (see environment_targets.py), scanned alongside this site
+        self.environments = list(environments or [])
+        self.environment_stats = {}
+        self._environment_scanners = {}
+        
+        # Only set on an environment's own scanner: the production URL its
+        # content may still link to, and the install path keys map onto
+        self.environment_name = None
+        self.site_aliases = ()
+        self.production_path = None
+        self.shares_media_ids = True
+        self.backup_summary = {}
+        self._image_extractor = None
         
         # Safety controls
         self.dry_run = True  # Start in safe mode
         self.max_deletions_per_batch = 10
+        self.max_deletions_in_flight = 4
+        self.deletion_failure_threshold = 0.5  # Circuit breaker trips above this failure rate
+        
+        # Deletion plans written by dry runs are signed with this key
+        # (defaults to the application password both runs already share)
+        self.plan_key = os.environ.get('IMAGE_CLEANUP_PLAN_KEY') or password
+        
+        # Before a live deletion the original and every size file of each
+        # image is downloaded into a content-addressed store (see
+        # binary_backup.py); images whose files could not be saved are kept
+        self.binary_backup = True
+        self.binary_backup_dir = 'image_backup_store'  # Relative to output_dir
+        self.binary_backup_workers = 8
+        self.binary_backup_stats = {}
+        
+        # Backups are gzip-compressed JSON lines (see streaming_output.py);
+        # reports list every candidate, largest first, as CSV and HTML
+        # alongside a text summary of the report_top_n largest
+        self.report_top_n = 20
+        self.report_files = {}
+        
+        # REST batch endpoint (WordPress 5.6+), detected by test_connection
+        self.use_batch_api = True
+        self.batch_api_available = False
+        self.batch_api_max_items = 25
+        
+        self._size_connection_pool()
+        
+    def _request(self, method: str, url: str, stage: str = 'other', **kwargs) -> requests.Response:
+        """Send a session request through the shared adaptive rate limiter
+        
+        429/503 responses are retried after the limiter has backed off (and
+        any Retry-After has elapsed); the last response is returned as-is.
+        A file object passed as data is rewound before each retry.
+        Bytes transferred are accounted against the given stage.
+        """
+        for attempt in range(self.max_throttle_retries + 1):
+            if attempt and hasattr(kwargs.get('data'), 'seek'):
+                kwargs['data'].seek(0)
+            quota = self.request_quota
+            if quota is not None:
+                quota.acquire(self.base_url)
+            self.rate_limiter.acquire()
+            start_time = time.time()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except Exception:
+                self.rate_limiter.record(None, time.time() - start_time)
+                self.instrumentation.record_request(self._endpoint_label(method, url), None,
+                                                    time.time() - start_time)
+                raise
+            finally:
+                if quota is not None:
+                    quota.release(self.base_url)
+            
+            latency = time.time() - start_time
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.rate_limiter.record(response.status_code, latency, retry_after)
+            wire_bytes = self._record_transfer(stage, response)
+            self.instrumentation.record_request(self._endpoint_label(method, url), response.status_code,
+                                                latency, wire_bytes)
+            
+            if response.status_code not in THROTTLE_STATUS_CODES or attempt == self.max_throttle_retries:
+                return response
+            
+            logger.warning(f"⏳ {response.status_code} from {method} {url} - backing off "
+                           f"(now {self.rate_limiter.rate:.2f} req/s)")
+        
+        return response
+    
+    def _size_connection_pool(self):
+        """Keep one pooled keep-alive connection per concurrent request
+        
+        The media scan and each concurrently scanned content type run
+        max_workers fetches at once; requests' default pool of 10 would
+        otherwise open and discard a connection per request beyond that.
+        Re-mounted only when the concurrency settings change.
+        """
+        pool_size = max((self.content_type_workers + 1) * self.max_workers,
+                        self.max_deletions_in_flight) + 1
+        with self._pool_lock:
+            if pool_size == self._pool_size:
+                return
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            self._pool_size = pool_size
+    
+    def _endpoint_label(self, method: str, url: str) -> str:
+        """Instrumentation endpoint label, prefixed with the environment's name on its scanner"""
+        label = endpoint_name(method, url)
+        return f"{self.environment_name} {label}" if self.environment_name else label
+    
+    def _record_transfer(self, stage: str, response: requests.Response) -> int:
+        """Add a response's wire and decoded sizes to the per-stage totals, returning the wire bytes"""
+        decoded_bytes = len(response.content)
+        try:
+            wire_bytes = response.raw.tell() or int(response.headers.get('Content-Length', 0))
+        except (AttributeError, TypeError, ValueError):
+            wire_bytes = 0
+        wire_bytes = wire_bytes or decoded_bytes
         
+        with self._transfer_lock:
+            stats = self.transfer_stats.setdefault(stage, {'requests': 0, 'bytes': 0, 'decoded_bytes': 0})
+            stats['requests'] += 1
+            stats['bytes'] += wire_bytes
+            stats['decoded_bytes'] += decoded_bytes
+        return wire_bytes
+    
+    def _stage_params(self, stage: str) -> Dict:
+        """Extra query parameters for a fetch stage ('media' or 'content')"""
+        if not self.lean_fetch:
+            return {'_embed': True} if stage == 'content' else {}
+        if stage == 'media':
+            return {'_fields': self.COMPACT_MEDIA_FIELDS if self.compact_media else self.MEDIA_FIELDS}
+        return {'_fields': self.CONTENT_FIELDS}
+    
     def test_connection(self) -> bool:
         """Test WordPress API connection and permissions"""
         try:
             # Test basic connection
-            response = self.session.get(f"{self.base_url}/wp-json/wp/v2/")
+            response = self._request('GET', f"{self.base_url}/wp-json/wp/v2/", stage='connection')
             if response.status_code != 200:
                 logger.error(f"API connection failed: {response.status_code}")
                 return False
             
             # Test media access
-            response = self.session.get(f"{self.base_url}/wp-json/wp/v2/media", 
-                                      params={'per_page': 1})
+            response = self._request('GET', f"{self.base_url}/wp-json/wp/v2/media", 
+                                     stage='connection', params={'per_page': 1, '_fields': 'id'})
             if response.status_code != 200:
                 logger.error(f"Media API access failed: {response.status_code}")
                 return False
             
             # Test deletion permissions (with safe params)
-            response = self.session.options(f"{self.base_url}/wp-json/wp/v2/media/999999")
+            response = self._request('OPTIONS', f"{self.base_url}/wp-json/wp/v2/media/999999",
+                                     stage='connection')
             allowed_methods = response.headers.get('Allow', '')
             if 'DELETE' not in allowed_methods:
                 logger.warning("DELETE permission may not be available")
             
+            # Detect /wp-json/batch/v1 so deletions can share round trips
+            if self.use_batch_api:
+                self._detect_batch_api()
+            
             logger.info("✅ WordPress API connection and permissions verified")
             return True
             
@@ -86,209 +341,1004 @@ class WordPressImageCleanup:
             logger.error(f"Connection test failed: {e}")
             return False
     
-    def get_all_media(self) -> Dict[int, Dict]:
-        """Fetch all media items from WordPress"""
-        logger.info("📁 Fetching all media items...")
+    def _detect_batch_api(self):
+        """Check for the REST batch endpoint and its per-call request limit"""
+        try:
+            response = self._request('OPTIONS', f"{self.base_url}/wp-json/batch/v1", stage='connection')
+        except Exception as e:
+            logger.info(f"Batch API unavailable ({e}) - using single requests")
+            self.batch_api_available = False
+            return
+        
+        if response.status_code != 200:
+            logger.info(f"Batch API unavailable ({response.status_code}) - using single requests")
+            self.batch_api_available = False
+            return
+        
+        # Only trust a real batch/v1 route schema; hosts and proxies that
+        # answer any OPTIONS with 200 would otherwise look batch-capable
+        try:
+            endpoint_args = response.json()['endpoints'][0]['args']
+            self.batch_api_max_items = int(endpoint_args['requests'].get('maxItems', 25))
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            logger.info("Batch API schema not recognised - using single requests")
+            self.batch_api_available = False
+            return
+        
+        self.batch_api_available = True
+        logger.info(f"✅ Batch API available ({self.batch_api_max_items} requests per call)")
+    
+    def discover_content_types(self) -> Tuple[str, ...]:
+        """Find every REST-visible content type to scan (sets content_types)
+        
+        Lists /wp/v2/types and keeps each wp/v2 type with a collection route,
+        except attachments and template/style types. Each is probed once to
+        see whether the account may read raw block markup (context=edit).
+        Keeps the configured content_types if the listing is unavailable.
+        """
+        try:
+            response = self._request('GET', f"{self.base_url}/wp-json/wp/v2/types", stage='discovery')
+            types = response.json() if response.status_code == 200 else None
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"⚠️ Content type discovery failed ({e}) - scanning {', '.join(self.content_types)}")
+            return self.content_types
+        if not isinstance(types, dict):
+            logger.warning(f"⚠️ Content type discovery failed ({response.status_code}) - "
+                           f"scanning {', '.join(self.content_types)}")
+            return self.content_types
+        
+        discovered = []
+        self._edit_context_types = set()
+        for slug, info in sorted(types.items()):
+            rest_base = info.get('rest_base') if isinstance(info, dict) else None
+            if not rest_base or slug in self.SKIPPED_CONTENT_TYPES or \
+                    info.get('rest_namespace', 'wp/v2') != 'wp/v2':
+                continue
+            
+            total = -1
+            if self.raw_content:
+                total = self._live_total(rest_base, {'status': 'publish', 'context': 'edit'}, 'discovery')
+                if total >= 0:
+                    self._edit_context_types.add(rest_base)
+            if total < 0:
+                total = self._live_total(rest_base, {'status': 'publish'}, 'discovery')
+            if total < 0:
+                logger.warning(f"⚠️ Skipping content type {rest_base}: collection not readable")
+                continue
+            discovered.append(rest_base)
+            logger.info(f"🧭 {rest_base}: {total} published items"
+                        f"{' (with block markup)' if rest_base in self._edit_context_types else ''}")
+        
+        if discovered:
+            self.content_types = tuple(discovered)
+        return self.content_types
+    
+    def _iter_media_pages(self, extra_params: Dict = None):
+        """Yield pages of image attachments as they arrive"""
+        if self.parallel_fetch:
+            params = {
+                'media_type': 'image',
+                'orderby': 'id',  # Stable ordering while pages are fetched out of order
+                'order': 'asc'
+            }
+            params.update(self._stage_params('media'))
+            params.update(extra_params or {})
+            yield from self._iter_pages_parallel('media', params)
+        else:
+            yield from self._iter_pages_sequential('media', {'media_type': 'image'}, extra_params)
+    
+    def _new_media_store(self) -> Dict[int, Dict]:
+        """Empty all_media container: a compact MediaTable or a plain dict"""
+        if self.compact_media:
+            return MediaTable(details_loader=self._load_media_details)
+        return {}
+    
+    def _store_media(self, all_media: Dict[int, Dict], item: Dict):
+        """Add one REST media object to an all_media container"""
+        self._add_media_record(all_media, self._media_record(item))
+    
+    def _add_media_record(self, all_media: Dict[int, Dict], record: Dict):
+        """Add an already reduced media record (e.g. from the index)"""
+        if isinstance(all_media, MediaTable):
+            all_media.add_dict(record)
+        else:
+            all_media[record['id']] = record
+    
+    def _load_media_details(self, media_id: int) -> Dict:
+        """Fetch caption/description/meta for one attachment on demand"""
+        response = self._request('GET', f"{self.base_url}/wp-json/wp/v2/media/{media_id}",
+                                 stage='media_details', params={'_fields': ','.join(LAZY_KEYS)})
+        if response.status_code != 200:
+            return {}
+        item = response.json()
+        return {
+            'caption': item.get('caption', {}).get('rendered', ''),
+            'description': item.get('description', {}).get('rendered', ''),
+            'meta': item.get('meta', {})
+        }
+    
+    def _media_record(self, item: Dict) -> Dict:
+        """Reduce a REST media object to the fields used by the cleanup
+        
+        caption/description/meta are only included when the payload carried
+        them, so compact fetches leave them to be loaded on demand.
+        """
+        record = {
+            'id': item.get('id'),
+            'title': item.get('title', {}).get('rendered', ''),
+            'source_url': item.get('source_url', ''),
+            'date': item.get('date', ''),
+            'modified': item.get('modified', ''),
+            'post': item.get('post', 0),  # Attached post ID
+            'file_size': item.get('media_details', {}).get('filesize', 0),
+            'mime_type': item.get('mime_type', ''),
+            'alt_text': item.get('alt_text', ''),
+            'sizes': [size.get('file', '') for size in
+                      (item.get('media_details', {}).get('sizes') or {}).values()]
+        }
+        if 'meta' in item:
+            record['meta'] = item.get('meta') or {}
+        for key in ('caption', 'description'):
+            if key in item:
+                record[key] = (item.get(key) or {}).get('rendered', '')
+        return record
+    
+    def _iter_pages_sequential(self, endpoint: str, params: Dict, extra_params: Dict = None):
+        """Yield collection pages one request at a time (original conservative mode)"""
+        url = f"{self.base_url}/wp-json/wp/v2/{endpoint}"
+        stage = 'media' if endpoint == 'media' else 'content'
+        request_params = dict(params)
+        if endpoint == 'media':
+            request_params.update({'orderby': 'date', 'order': 'desc'})
+        request_params.update(self._stage_params(stage))
+        request_params.update(extra_params or {})
         
         page = 1
-        all_media = {}
+        page_count = 0
+        item_count = 0
+        seen_ids = set()
+        totals = set()
+        start_time = time.time()
         
         while True:
             try:
-                params = {
-                    'media_type': 'image',
-                    'per_page': self.batch_size,
-                    'page': page,
-                    'orderby': 'date',
-                    'order': 'desc'
-                }
-                
-                response = self.session.get(f"{self.base_url}/wp-json/wp/v2/media", 
-                                          params=params)
-                
-                if response.status_code != 200:
-                    logger.error(f"Media fetch failed: {response.status_code}")
-                    break
-                
-                media_items = response.json()
-                if not media_items:
-                    break
-                
-                for item in media_items:
-                    media_id = item.get('id')
-                    if media_id:
-                        all_media[media_id] = {
-                            'id': media_id,
-                            'title': item.get('title', {}).get('rendered', ''),
-                            'source_url': item.get('source_url', ''),
-                            'date': item.get('date', ''),
-                            'modified': item.get('modified', ''),
-                            'post': item.get('post', 0),  # Attached post ID
-                            'file_size': item.get('media_details', {}).get('filesize', 0),
-                            'mime_type': item.get('mime_type', ''),
-                            'meta': item.get('meta', {}),
-                            'alt_text': item.get('alt_text', ''),
-                            'caption': item.get('caption', {}).get('rendered', ''),
-                            'description': item.get('description', {}).get('rendered', '')
-                        }
-                
-                logger.info(f"📁 Fetched page {page}: {len(media_items)} items")
-                
-                # Check pagination
-                total_pages = int(response.headers.get('X-WP-TotalPages', 1))
-                if page >= total_pages:
-                    break
+                items, response = self._fetch_page_response(url, request_params, page, endpoint,
+                                                             per_page=self.batch_size)
+            except RuntimeError as e:
+                self._record_fetch_stats(endpoint, page_count, item_count, 0,
+                                         time.time() - start_time, failed_pages=[page])
+                raise IncompleteFetchError(f"{endpoint} page {page} could not be fetched: {e}")
+            
+            totals.add(int(response.headers.get('X-WP-Total', 0)))
+            if not items:
+                break
+            
+            page_count += 1
+            item_count += len(items)
+            seen_ids.update(item['id'] for item in items if item.get('id'))
+            yield items
+            
+            logger.info(f"📁 Fetched {endpoint} page {page}: {len(items)} items")
+            
+            # Check pagination
+            total_pages = int(response.headers.get('X-WP-TotalPages', 1))
+            if page >= total_pages:
+                break
+            
+            page += 1
+        
+        gap_items = 0
+        for items in self._fill_gaps(endpoint, request_params, endpoint, seen_ids, totals):
+            gap_items += len(items)
+            yield items
+        
+        self._record_fetch_stats(endpoint, page_count, item_count + gap_items, max(totals, default=0),
+                                 time.time() - start_time, gap_items=gap_items)
+    
+    def _fetch_pages_parallel(self, endpoint: str, params: Dict, stage: str = None) -> List[List[Dict]]:
+        """Fetch every page of a collection concurrently"""
+        return list(self._iter_pages_parallel(endpoint, params, stage))
+    
+    def _iter_pages_parallel(self, endpoint: str, params: Dict, stage: str = None):
+        """Yield collection pages while later pages download
+        
+        At most two pages per worker are in flight or buffered, so memory
+        depends on the page size rather than the collection size. Pages
+        that still fail after their retries are re-fetched once the rest
+        are in; if X-WP-Total changed during the scan, the items it shifted
+        past are found with an ID sweep. IncompleteFetchError is raised
+        rather than returning a partial collection.
+        """
+        url = f"{self.base_url}/wp-json/wp/v2/{endpoint}"
+        stage = stage or endpoint
+        start_time = time.time()
+        failed_pages = []
+        self._size_connection_pool()
+        
+        # The first page tells us how many pages there are
+        try:
+            first_page, response = self._fetch_page_response(url, params, 1, stage)
+        except RuntimeError as e:
+            self._record_fetch_stats(stage, 0, 0, 0, time.time() - start_time, failed_pages=[1])
+            raise IncompleteFetchError(f"{endpoint} page 1 could not be fetched: {e}")
+        
+        total_pages = int(response.headers.get('X-WP-TotalPages', 1))
+        total_items = int(response.headers.get('X-WP-Total', len(first_page)))
+        totals = {total_items}
+        logger.info(f"📁 {endpoint}: {total_items} items across {total_pages} pages "
+                    f"({self.max_workers} workers)")
+        
+        page_count = 1
+        item_count = len(first_page)
+        seen_ids = {item['id'] for item in first_page if item.get('id')}
+        yield first_page
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            next_page = 2
+            window = self.max_workers * 2
+            
+            while next_page <= total_pages and len(pending) < window:
+                pending.append((next_page, executor.submit(self._fetch_page_response, url, params, next_page, stage)))
+                next_page += 1
+            
+            while pending:
+                page, future = pending.popleft()
+                try:
+                    items, response = future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching {endpoint} page {page}: {e}")
+                    failed_pages.append(page)
+                    items = None
                 
-                page += 1
-                time.sleep(self.request_delay)
+                if next_page <= total_pages:
+                    pending.append((next_page, executor.submit(self._fetch_page_response, url, params, next_page, stage)))
+                    next_page += 1
                 
+                if items is not None:
+                    logger.info(f"📁 Fetched {endpoint} page {page}/{total_pages}: {len(items)} items")
+                    # No header (0) means the page fell off the end of a shrinking collection
+                    totals.add(int(response.headers.get('X-WP-Total', 0)))
+                    page_count += 1
+                    item_count += len(items)
+                    seen_ids.update(item['id'] for item in items if item.get('id'))
+                    yield items
+        
+        # Second chance for pages that failed while the host was struggling
+        refetched_pages = list(failed_pages)
+        for page in refetched_pages:
+            try:
+                items, response = self._fetch_page_response(url, params, page, stage)
+            except RuntimeError as e:
+                logger.error(f"Error re-fetching {endpoint} page {page}: {e}")
+                continue
+            logger.info(f"📁 Re-fetched {endpoint} page {page}/{total_pages}: {len(items)} items")
+            failed_pages.remove(page)
+            totals.add(int(response.headers.get('X-WP-Total', 0)))
+            page_count += 1
+            item_count += len(items)
+            seen_ids.update(item['id'] for item in items if item.get('id'))
+            yield items
+        
+        if failed_pages:
+            self._record_fetch_stats(stage, page_count, item_count, total_items, time.time() - start_time,
+                                     failed_pages=failed_pages, refetched_pages=refetched_pages)
+            raise IncompleteFetchError(f"{endpoint} pages {failed_pages} could not be fetched")
+        
+        gap_items = 0
+        for items in self._fill_gaps(endpoint, params, stage, seen_ids, totals):
+            gap_items += len(items)
+            yield items
+        
+        self._record_fetch_stats(stage, page_count, item_count + gap_items, total_items,
+                                 time.time() - start_time, refetched_pages=refetched_pages,
+                                 gap_items=gap_items)
+    
+    def _fill_gaps(self, endpoint: str, params: Dict, stage: str, seen_ids: Set[int], totals: Set[int]):
+        """Yield items a paged scan skipped because the collection changed under it
+        
+        Offset pagination drops items when earlier ones are removed (or, for
+        date ordering, added) mid-scan. That shows up as X-WP-Total differing
+        between pages or fewer items than it promised; an ID-only sweep then
+        finds what was missed and include= fetches it.
+        """
+        if stage in ('id_sweep', 'index_prune') or (len(totals) <= 1 and len(seen_ids) >= max(totals, default=0)):
+            return
+        
+        logger.warning(f"⚠️ {endpoint} changed during the scan (X-WP-Total {sorted(totals)}, "
+                       f"{len(seen_ids)} items received) - sweeping IDs for gaps")
+        fetch_params = {key: value for key, value in params.items()
+                        if key not in ('orderby', 'order', 'page', 'per_page')}
+        sweep_params = {key: value for key, value in fetch_params.items() if key not in ('_fields', '_embed')}
+        missing = self._live_ids(endpoint, sweep_params) - seen_ids
+        if missing:
+            items = self._fetch_by_ids(endpoint, missing, fetch_params, stage)
+            logger.info(f"📁 Filled {len(items)} {endpoint} items missed by paging")
+            yield items
+    
+    def _fetch_page(self, url: str, params: Dict, page: int, stage: str) -> List[Dict]:
+        """Fetch a single collection page (runs in a worker thread)"""
+        return self._fetch_page_response(url, params, page, stage)[0]
+    
+    def _fetch_page_response(self, url: str, params: Dict, page: int, stage: str,
+                             per_page: int = None) -> Tuple[List[Dict], requests.Response]:
+        """Fetch a collection page, retrying transient failures with backoff
+        
+        Connection errors, 5xx responses and unparseable bodies are retried
+        up to page_retries times, waiting retry_backoff * 2^attempt seconds
+        (with jitter) in between. Other errors raise RuntimeError at once. A
+        page past the end is returned empty without an X-WP-Total header.
+        """
+        request_params = dict(params, per_page=per_page or self.parallel_page_size, page=page)
+        attempts = self.page_retries + 1
+        for attempt in range(attempts):
+            try:
+                response = self._request('GET', url, stage=stage, params=request_params)
+                if response.status_code == 200:
+                    return response.json(), response
+                if page > 1 and response.status_code == 400 and \
+                        'rest_post_invalid_page_number' in response.text:
+                    # The collection shrank under us; the caller's gap check handles it
+                    return [], response
+                if response.status_code < 500:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                error = f"HTTP {response.status_code}"
+            except (requests.RequestException, ValueError) as e:
+                error = str(e) or e.__class__.__name__
+            
+            if attempt < attempts - 1:
+                delay = self.retry_backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+                logger.warning(f"🔁 Page {page} of {url} failed ({error}) - retrying in {delay:.1f}s")
+                time.sleep(delay)
+        
+        raise RuntimeError(f"{error} after {attempts} attempts")
+    
+    def _record_fetch_stats(self, stage: str, page_count: int, item_count: int, total_items: int,
+                            elapsed: float, failed_pages: List[int] = None,
+                            refetched_pages: List[int] = None, gap_items: int = 0):
+        """Record page throughput so max_workers can be sized per host"""
+        self.fetch_stats[stage] = {
+            'pages': page_count,
+            'items': item_count,
+            'total_items': total_items or item_count,
+            'failed_pages': failed_pages or [],
+            'refetched_pages': refetched_pages or [],
+            'gap_items': gap_items,
+            'workers': self.max_workers if self.parallel_fetch else 1,
+            'seconds': round(elapsed, 2),
+            'pages_per_second': round(page_count / elapsed, 2) if elapsed > 0 else 0.0
+        }
+        logger.info(f"📁 {stage}: {page_count} pages in {elapsed:.1f}s "
+                    f"({self.fetch_stats[stage]['pages_per_second']} pages/sec)")
+    
+    def _iter_content_pages(self, content_type: str, extra_params: Dict = None):
+        """Yield pages of published content items as they arrive"""
+        if self.parallel_fetch:
+            params = {'status': 'publish', 'orderby': 'id', 'order': 'asc'}
+            params.update(self._stage_params('content'))
+            params.update(self._content_context(content_type))
+            params.update(extra_params or {})
+            yield from self._iter_pages_parallel(content_type, params)
+        else:
+            params = dict({'status': 'publish'}, **self._content_context(content_type))
+            yield from self._iter_pages_sequential(content_type, params, extra_params)
+    
+    def _content_context(self, content_type: str) -> Dict:
+        """context=edit for types whose raw block markup the account may read"""
+        return {'context': 'edit'} if content_type in self._edit_context_types else {}
+    
+    def _extract_item_references(self, item: Dict) -> Tuple[Set[str], Set[int]]:
+        """Image URLs and media IDs referenced by a single content item
+        
+        Runs every extractor in the registry (see reference_extractors.py):
+        featured image, rendered HTML, block attributes and meta/ACF fields.
+        """
+        return extract_item(item, self._site_extractor())
+    
+    def _extract_page_references(self, content_items: List[Dict]) -> List[ItemReferences]:
+        """(id, modified, image keys, media IDs) for each item of a content page
+        
+        With extraction_workers set, items carrying at least
+        extraction_min_bytes of HTML are parsed in worker processes.
+        """
+        if self.extraction_workers:
+            # Content types are scanned concurrently and share one pool;
+            # the lock only covers creating it, so extraction overlaps
+            with self._extraction_lock:
+                if self._extraction_pool is None:
+                    self._extraction_pool = ExtractionPool(self.base_url, self.extraction_workers,
+                                                           self.extraction_min_bytes, self.site_aliases)
+                pool = self._extraction_pool
+            rows = pool.extract(content_items)
+        else:
+            rows = []
+            for item in content_items:
+                urls, media_ids = self._extract_item_references(item)
+                rows.append((item['id'], item.get('modified', ''),
+                             {canonical_image_key(url) for url in urls}, media_ids))
+        
+        if self.production_path is not None:
+            rows = self._map_to_production(rows)
+        return rows
+    
+    def _map_to_production(self, rows: List[ItemReferences]) -> List[ItemReferences]:
+        """Rebase an environment's image keys onto the production install path
+        
+        Media IDs are kept only when the environment shares the production
+        database's attachment IDs.
+        """
+        from_path = base_path(self.base_url)
+        return [(content_id, modified,
+                 {rebase_image_key(key, from_path, self.production_path) for key in image_keys},
+                 media_ids if self.shares_media_ids else set())
+                for content_id, modified, image_keys, media_ids in rows]
+    
+    def _close_extraction_pool(self):
+        """Stop extraction workers and keep their throughput for run results"""
+        if self._extraction_pool is None:
+            return
+        self._extraction_pool.close()
+        self.extraction_stats = self._extraction_pool.stats()
+        for worker, stats in self.extraction_stats['per_worker'].items():
+            logger.info(f"⚙️ Extraction {worker}: {stats['items']} items, "
+                        f"{stats['mb_per_second']} MB/s")
+        self._extraction_pool = None
+    
+    def scan_library(self) -> Tuple[Dict[int, Dict], Set[str]]:
+        """Stream media and content scans concurrently
+        
+        Media pages are collected on a background thread while up to
+        content_type_workers content types are fetched and parsed as their
+        pages arrive. Content pages are
+        discarded once their image keys and IDs are extracted, so content
+        memory depends on page size, not library size. Reconciliation
+        happens afterwards in identify_unused_images.
+        """
+        logger.info("🔄 Streaming media and content scans...")
+        
+        all_media = self._new_media_store()
+        media_errors = []
+        
+        def collect_media():
+            try:
+                with self.instrumentation.phase('media_fetch'):
+                    for media_items in self._iter_media_pages():
+                        records = [self._media_record(item) for item in media_items if item.get('id')]
+                        for record in records:
+                            self._add_media_record(all_media, record)
+                        if self.journal is not None:
+                            self.journal.record_media(records)
             except Exception as e:
-                logger.error(f"Error fetching media page {page}: {e}")
-                break
+                media_errors.append(e)
         
-        logger.info(f"📁 Total media items found: {len(all_media)}")
+        media_thread = threading.Thread(target=collect_media, name='media-scan', daemon=True)
+        media_thread.start()
+        
+        try:
+            scanners = [self] + self._prepare_environments()
+            used_keys, used_media_ids = self._scan_content_tasks(scanners)
+        finally:
+            self._close_extraction_pool()
+        
+        media_thread.join()
+        if media_errors:
+            logger.error(f"Media scan failed: {media_errors[0]}")
+            raise media_errors[0]
+        
+        logger.info(f"🔄 Scan complete: {len(all_media)} media, {len(used_keys)} referenced "
+                    f"image keys, {len(used_media_ids)} referenced media IDs")
         self.all_media = all_media
-        return all_media
+        self.used_images = used_keys
+        self.used_media_ids = used_media_ids
+        return all_media, used_keys
     
-    def get_all_content(self) -> Set[str]:
-        """Fetch all posts and pages to find image references"""
-        logger.info("📄 Analysing all content for image usage...")
+    def scan_sql_dump(self, dump_path: str = None) -> Tuple[Dict[int, Dict], Set[str]]:
+        """Load media and content usage from a SQL dump instead of the REST API
         
-        used_images = set()
+        Content is parsed in batches through _extract_page_references, so
+        extraction_workers applies as it does to REST pages. Only core
+        types get plan watermarks; execute_plan rescans other types in full.
+        Environments are still scanned over REST.
+        """
+        dump_path = dump_path or self.sql_dump
+        logger.info(f"🗄️ Reading media and content from {dump_path} (offline)...")
         
-        # Analyse posts
-        used_images.update(self._analyse_content_type('posts'))
+        source = SQLDumpSource(dump_path, self.base_url, self.table_prefix, self.uploads_url,
+                               skipped_types=self.SKIPPED_CONTENT_TYPES, batch_size=self.parallel_page_size)
+        all_media = self._new_media_store()
+        try:
+            scan_environments = self._in_background(self._scan_environments, 'environment-scan')
+            media, used_keys, used_media_ids = source.scan(self._extract_page_references)
+            environment_keys, environment_ids = scan_environments()
+        finally:
+            self._close_extraction_pool()
+        for record in media:
+            self._add_media_record(all_media, record)
         
-        # Analyse pages  
-        used_images.update(self._analyse_content_type('pages'))
+        self.content_watermarks = source.rest_watermarks()
+        self.content_types = tuple(self.content_watermarks)
+        self.dump_stats = source.stats
+        self._dump_trashed_posts = source.trashed_post_ids
+        self.all_media = all_media
+        self.used_images = used_keys | environment_keys
+        self.used_media_ids = used_media_ids | environment_ids
+        return all_media, self.used_images
+    
+    def _scan_content_tasks(self, scanners: List['WordPressImageCleanup']) -> Tuple[Set[str], Set[int]]:
+        """Scan every content type of every scanner on one shared pool
         
-        logger.info(f"📄 Found {len(used_images)} image references in content")
-        self.used_images = used_images
-        return used_images
+        Each scanner is this site or an environment's scanner; the pool runs
+        content_type_workers type scans per scanner at a time.
+        """
+        used_keys = set()
+        used_media_ids = set()
+        for scanner in scanners:
+            scanner.content_watermarks = {}
+            scanner.content_type_stats = {}
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.content_type_workers * len(scanners)) as executor:
+                futures = [executor.submit(scanner._scan_content_type, content_type)
+                           for scanner in scanners for content_type in scanner.content_types]
+                for future in futures:
+                    image_keys, media_ids = future.result()
+                    used_keys.update(image_keys)
+                    used_media_ids.update(media_ids)
+        finally:
+            for scanner in scanners:
+                if scanner is not self:
+                    scanner._close_extraction_pool()
+        
+        for scanner in scanners:
+            if scanner is not self:
+                self._record_environment_stats(scanner)
+        return used_keys, used_media_ids
     
-    def _analyse_content_type(self, content_type: str) -> Set[str]:
-        """Analyse specific content type for image usage"""
-        page = 1
-        found_images = set()
+    def _scan_content_type(self, content_type: str) -> Tuple[Set[str], Set[int]]:
+        """Image keys and media IDs used by one content type, journaling each page"""
+        environment = f"{self.environment_name}/" if self.environment_name else ''
+        with self.instrumentation.phase(f"content_scan:{environment}{content_type}"):
+            return self._scan_content_pages(content_type)
+    
+    def _scan_content_pages(self, content_type: str) -> Tuple[Set[str], Set[int]]:
+        """_scan_content_type without its phase timer"""
+        start_time = time.time()
+        item_count = 0
+        used_keys = set()
+        used_media_ids = set()
+        for content_items in self._iter_content_pages(content_type):
+            rows = self._extract_page_references(content_items)
+            for _, _, image_keys, media_ids in rows:
+                used_keys.update(image_keys)
+                used_media_ids.update(media_ids)
+            if self.journal is not None:
+                self.journal.record_content(content_type, rows)
+            self.content_watermarks[content_type] = latest_modified(
+                content_items, self.content_watermarks.get(content_type))
+            item_count += len(content_items)
+            logger.info(f"📄 Analysed {len(content_items)} {content_type}"
+                        f"{f' on {self.environment_name}' if self.environment_name else ''}")
+        self._record_type_stats(content_type, item_count, time.time() - start_time)
+        return used_keys, used_media_ids
+    
+    def _record_type_stats(self, content_type: str, item_count: int, elapsed: float):
+        """Record how many items of a content type were analysed and how long it took"""
+        self.content_type_stats[content_type] = {'items': item_count, 'seconds': round(elapsed, 2)}
+        logger.info(f"📄 {content_type}{f' on {self.environment_name}' if self.environment_name else ''}: "
+                    f"{item_count} items analysed in {elapsed:.1f}s")
+    
+    def add_environment(self, name: str, base_url: str, username: str, password: str,
+                        **options) -> EnvironmentTarget:
+        """Also scan a staging/development environment's content for usage
         
-        while True:
+        options are passed to EnvironmentTarget (initial_rate, max_rate,
+        shares_media_ids).
+        """
+        environment = EnvironmentTarget(name, base_url, username, password, **options)
+        self.environments.append(environment)
+        return environment
+    
+    def _environment_scanner(self, environment: EnvironmentTarget) -> 'WordPressImageCleanup':
+        """A content-only cleanup instance for one environment
+        
+        It has its own session, credentials and rate limiter, and inherits
+        this run's fetch and extraction settings.
+        """
+        scanner = WordPressImageCleanup(environment.base_url, environment.username,
+                                        environment.password, max_workers=self.max_workers)
+        scanner.rate_limiter = AdaptiveRateLimiter(initial_rate=environment.initial_rate,
+                                                   max_rate=environment.max_rate)
+        for setting in ('lean_fetch', 'parallel_fetch', 'parallel_page_size', 'batch_size',
+                        'page_retries', 'retry_backoff', 'max_throttle_retries', 'content_types',
+                        'discover_types', 'content_type_workers', 'raw_content',
+                        'extraction_workers', 'extraction_min_bytes'):
+            setattr(scanner, setting, getattr(self, setting))
+        scanner.environment_name = environment.name
+        scanner.instrumentation = self.instrumentation
+        scanner.site_aliases = (self.base_url,)
+        scanner.production_path = base_path(self.base_url)
+        scanner.shares_media_ids = environment.shares_media_ids
+        return scanner
+    
+    def _prepare_environments(self) -> List['WordPressImageCleanup']:
+        """Check every environment is reachable and discover its content types
+        
+        An unreachable environment stops the run: its usage cannot be ruled out.
+        """
+        scanners = []
+        for environment in self.environments:
+            scanner = self._environment_scanner(environment)
             try:
-                params = {
-                    'per_page': self.batch_size,
-                    'page': page,
-                    'status': 'publish',
-                    '_embed': True
-                }
-                
-                response = self.session.get(f"{self.base_url}/wp-json/wp/v2/{content_type}", 
-                                          params=params)
-                
-                if response.status_code != 200:
-                    break
-                
-                content_items = response.json()
-                if not content_items:
-                    break
-                
-                for item in content_items:
-                    # Check featured image
-                    featured_media = item.get('featured_media', 0)
-                    if featured_media and featured_media in self.all_media:
-                        found_images.add(self.all_media[featured_media]['source_url'])
-                    
-                    # Check content for embedded images
-                    content = item.get('content', {}).get('rendered', '')
-                    if content:
-                        content_images = self._extract_images_from_html(content)
-                        found_images.update(content_images)
-                    
-                    # Check excerpt
-                    excerpt = item.get('excerpt', {}).get('rendered', '')
-                    if excerpt:
-                        excerpt_images = self._extract_images_from_html(excerpt)
-                        found_images.update(excerpt_images)
-                
-                logger.info(f"📄 Analysed {content_type} page {page}: {len(content_items)} items")
+                response = scanner._request('GET', f"{environment.base_url}/wp-json/wp/v2/", stage='connection')
+                error = None if response.status_code == 200 else f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                error = e.__class__.__name__
+            if error:
+                raise RuntimeError(f"{environment.name} environment not reachable ({error}) - "
+                                   "its image usage cannot be checked")
+            if scanner.discover_types:
+                scanner.discover_content_types()
+            logger.info(f"🌏 {environment.name}: scanning {', '.join(scanner.content_types)} "
+                        f"at {environment.base_url}")
+            scanners.append(scanner)
+        self._environment_scanners = {scanner.environment_name: scanner for scanner in scanners}
+        return scanners
+    
+    def _scan_environments(self) -> Tuple[Set[str], Set[int]]:
+        """Image keys and media IDs used in the other environments"""
+        if not self.environments:
+            return set(), set()
+        return self._scan_content_tasks(self._prepare_environments())
+    
+    def _in_background(self, target, name: str):
+        """Start target() on a daemon thread; the returned function waits for
+        its result (re-raising anything it raised)"""
+        outcome = {}
+        
+        def run():
+            try:
+                outcome['result'] = target()
+            except Exception as e:
+                outcome['error'] = e
+        
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        thread.start()
+        
+        def result():
+            thread.join()
+            if 'error' in outcome:
+                raise outcome['error']
+            return outcome['result']
+        return result
+    
+    def _record_environment_stats(self, scanner: 'WordPressImageCleanup'):
+        """Per-environment totals for run results"""
+        self.environment_stats[scanner.environment_name] = {
+            'base_url': scanner.base_url,
+            'items': sum(stats['items'] for stats in scanner.content_type_stats.values()),
+            'content_types': scanner.content_type_stats,
+            'effective_rate': scanner.rate_limiter.stats()['effective_rate']
+        }
+    
+    def resume_scan(self, state: JournalState) -> Tuple[Dict[int, Dict], Set[str]]:
+        """Rebuild scan results from a run journal, fetching only what it lacks
+        
+        ID-only sweeps find items the journal never saw (fetched with
+        include=) and journaled items that have since gone. Content edited
+        since the interrupted run started is re-fetched with modified_after
+        and re-extracted.
+        """
+        logger.info(f"⏯️ Resuming from {self.journal_path}: {len(state.media)} media, "
+                    f"{sum(len(items) for items in state.content.values())} content items, "
+                    f"{len(state.deletions)} deletions journaled")
+        
+        # Other environments are not journaled, so they are always rescanned
+        environment_usage = self._in_background(self._scan_environments, 'environment-scan')
+        all_media = self._new_media_store()
+        if self._worth_reconciling('media', {'media_type': 'image'}, len(state.media)):
+            live_ids = self._live_ids('media', {'media_type': 'image'})
+            for media_id in live_ids & set(state.media):
+                self._add_media_record(all_media, state.media[media_id])
+            params = {'media_type': 'image'}
+            params.update(self._stage_params('media'))
+            media_pages = [self._fetch_by_ids('media', live_ids - set(state.media), params, 'media')]
+        else:
+            media_pages = self._iter_media_pages()
+        for media_items in media_pages:
+            records = [self._media_record(item) for item in media_items if item.get('id')]
+            for record in records:
+                self._add_media_record(all_media, record)
+            if records:
+                self.journal.record_media(records)
+        
+        # Anything edited after the interrupted run started may have been read stale
+        started = datetime.fromisoformat(state.run['at'])
+        rewind = datetime.now() - started + timedelta(seconds=60)
+        
+        used_keys = set()
+        used_media_ids = set()
+        self.content_watermarks = {}
+        self.content_type_stats = {}
+        try:
+            for content_type in self.content_types:
+                start_time = time.time()
+                items = dict(state.content.get(content_type, {}))
+                watermark = state.content_watermark(content_type)
+                extra_params = {}
+                if watermark and self._worth_reconciling(content_type, {'status': 'publish'}, len(items)):
+                    live_ids = self._live_ids(content_type, {'status': 'publish'})
+                    extra_params['modified_after'] = (datetime.fromisoformat(watermark) -
+                                                      rewind).isoformat(timespec='seconds')
+                else:
+                    # Rescan the whole type; only what it returns now counts
+                    items = {}
+                    live_ids = None
                 
-                # Check pagination
-                total_pages = int(response.headers.get('X-WP-TotalPages', 1))
-                if page >= total_pages:
-                    break
+                rows = []
+                for content_items in self._iter_content_pages(content_type, extra_params):
+                    rows.extend(self._extract_page_references(content_items))
                 
-                page += 1
-                time.sleep(self.request_delay)
+                if live_ids is not None:
+                    missing = live_ids - set(items) - {row[0] for row in rows}
+                    params = {'status': 'publish'}
+                    params.update(self._stage_params('content'))
+                    params.update(self._content_context(content_type))
+                    rows.extend(self._extract_page_references(
+                        self._fetch_by_ids(content_type, missing, params, content_type)))
+                if rows:
+                    self.journal.record_content(content_type, rows)
                 
-            except Exception as e:
-                logger.error(f"Error analysing {content_type} page {page}: {e}")
-                break
+                for content_id, modified, image_keys, media_ids in rows:
+                    items[content_id] = (modified, image_keys, media_ids)
+                if live_ids is None:
+                    live_ids = set(items)
+                for content_id, (modified, image_keys, media_ids) in items.items():
+                    if content_id in live_ids:
+                        used_keys.update(image_keys)
+                        used_media_ids.update(media_ids)
+                        if modified and modified > (self.content_watermarks.get(content_type) or ''):
+                            self.content_watermarks[content_type] = modified
+                logger.info(f"⏯️ {content_type}: {len(rows)} re-fetched, "
+                            f"{len(set(items) - live_ids)} no longer published")
+                self._record_type_stats(content_type, len(live_ids & set(items)), time.time() - start_time)
+        finally:
+            self._close_extraction_pool()
+        
+        environment_keys, environment_media_ids = environment_usage()
+        used_keys |= environment_keys
+        used_media_ids |= environment_media_ids
         
-        return found_images
+        logger.info(f"⏯️ Resumed scan: {len(all_media)} media, {len(used_keys)} referenced "
+                    f"image keys, {len(used_media_ids)} referenced media IDs")
+        self.all_media = all_media
+        self.used_images = used_keys
+        self.used_media_ids = used_media_ids
+        return all_media, used_keys
+    
+    def _worth_reconciling(self, endpoint: str, params: Dict, journaled: int) -> bool:
+        """Whether a journal holds enough of an endpoint to beat refetching it"""
+        live_total = self._live_total(endpoint, params, 'id_sweep')
+        if live_total < 0:
+            raise RuntimeError(f"could not read {endpoint} total")
+        return journaled * 2 >= live_total
+    
+    def _live_total(self, endpoint: str, params: Dict, stage: str) -> int:
+        """X-WP-Total for a collection from a one-item request (-1 if unavailable)"""
+        response = self._request('GET', f"{self.base_url}/wp-json/wp/v2/{endpoint}",
+                                 stage=stage, params=dict(params, per_page=1, _fields='id'))
+        if response.status_code != 200:
+            return -1
+        return int(response.headers.get('X-WP-Total', -1))
     
-    def _extract_images_from_html(self, html_content: str) -> Set[str]:
-        """Extract image URLs from HTML content"""
-        images = set()
+    def _live_ids(self, endpoint: str, params: Dict) -> Set[int]:
+        """Every ID WordPress currently lists for an endpoint (ID-only sweep)"""
+        pages = self._fetch_pages_parallel(endpoint, dict(params, _fields='id', orderby='id', order='asc'),
+                                           stage='id_sweep')
+        return {item['id'] for page in pages for item in page}
+    
+    def sync_index(self) -> Dict:
+        """Bring the on-disk index up to date and load media/usage from it
         
-        # Extract img src attributes
-        img_pattern = r'<img[^>]*src=["\']([^"\'\']+)["\'][^>]*>'
-        img_matches = re.findall(img_pattern, html_content, re.IGNORECASE)
+        Only items modified after the stored watermark are fetched. Removed
+        media and unpublished content are pruned with an ID-only sweep when
+        the live totals no longer match the index.
+        """
+        if self.index is None:
+            self.index = MediaIndex(self.index_path)
         
-        for src in img_matches:
-            # Normalise URL
-            if src.startswith('/'):
-                src = urljoin(self.base_url, src)
-            
-            # Only include images from this WordPress site
-            parsed_src = urlparse(src)
-            parsed_base = urlparse(self.base_url)
-            
-            if parsed_src.netloc == parsed_base.netloc:
-                images.add(src)
+        logger.info(f"🗄️ Syncing media index: {self.index_path}")
+        stats = {}
+        # Other environments are not indexed, so they are scanned in full meanwhile
+        environment_usage = self._in_background(self._scan_environments, 'environment-scan')
+        
+        # Media
+        watermark = self.index.get_watermark('media')
+        params = {'media_type': 'image', 'orderby': 'id', 'order': 'asc'}
+        params.update(self._stage_params('media'))
+        if watermark:
+            params['modified_after'] = watermark
+        pages = self._fetch_pages_parallel('media', params)
+        records = [self._media_record(item) for page in pages for item in page if item.get('id')]
+        self.index.upsert_media(records)
+        removed = self._prune_index('media', {'media_type': 'image'}, self.index.media_ids(),
+                                    self.index.remove_media)
+        new_watermark = latest_modified(records, watermark)
+        if new_watermark:
+            self.index.set_watermark('media', new_watermark)
+        stats['media'] = {'fetched': len(records), 'removed': removed, 'full_sync': not watermark}
         
-        # Extract WordPress gallery shortcodes
-        gallery_pattern = r'\[gallery[^\]]*ids="([^"]+)"'
-        gallery_matches = re.findall(gallery_pattern, html_content, re.IGNORECASE)
+        self.all_media = self._new_media_store()
+        for record in self.index.iter_media():
+            self._add_media_record(self.all_media, record)
+        
+        # Content: re-extract only the posts/pages that changed
+        try:
+            self.content_type_stats = {}
+            for content_type in self.content_types:
+                start_time = time.time()
+                stats[content_type] = self._sync_content_type(content_type)
+                self._record_type_stats(content_type, stats[content_type]['fetched'], time.time() - start_time)
+                self.content_watermarks[content_type] = self.index.get_watermark(content_type)
+        finally:
+            self._close_extraction_pool()
         
-        for match in gallery_matches:
-            gallery_ids = [id.strip() for id in match.split(',')]
-            for gallery_id in gallery_ids:
-                if gallery_id.isdigit() and int(gallery_id) in self.all_media:
-                    images.add(self.all_media[int(gallery_id)]['source_url'])
+        environment_keys, environment_media_ids = environment_usage()
+        self.used_images = self.index.used_keys() | environment_keys
+        self.used_media_ids = self.index.used_media_ids() | environment_media_ids
+        stats['index'] = self.index.counts()
         
-        return images
+        logger.info(f"🗄️ Index synced: {stats['index']['media']} media, "
+                    f"{stats['index']['content']} content items, "
+                    f"{len(self.used_images)} referenced image keys")
+        self.sync_stats = stats
+        return stats
+    
+    def _sync_content_type(self, content_type: str) -> Dict:
+        """Re-extract one content type's changed items into the index"""
+        watermark = self.index.get_watermark(content_type)
+        # Oldest changes first, so an interrupted sync never skips past unseen items
+        extra_params = {'orderby': 'modified', 'order': 'asc'}
+        if watermark:
+            extra_params['modified_after'] = watermark
+        fetched = 0
+        
+        for content_items in self._iter_content_pages(content_type, extra_params):
+            self.index.upsert_content(content_type, self._extract_page_references(content_items))
+            fetched += len(content_items)
+            watermark = latest_modified(content_items, watermark)
+        
+        removed = self._prune_index(content_type, {'status': 'publish'},
+                                    self.index.content_ids(content_type),
+                                    lambda ids: self.index.remove_content(content_type, ids))
+        if watermark:
+            self.index.set_watermark(content_type, watermark)
+        return {'fetched': fetched, 'removed': removed,
+                'full_sync': 'modified_after' not in extra_params}
+    
+    def _prune_index(self, endpoint: str, params: Dict, indexed_ids: Set[int], remove) -> int:
+        """Remove indexed IDs that are no longer listed by WordPress"""
+        try:
+            live_total = self._live_total(endpoint, params, 'index_prune')
+        except Exception as e:
+            logger.error(f"Could not read {endpoint} total for index pruning: {e}")
+            return 0
+        
+        if live_total < 0 or live_total == len(indexed_ids):
+            return 0
+        
+        # Totals differ: sweep IDs only and drop anything WordPress no longer returns
+        pages = self._fetch_pages_parallel(endpoint, dict(params, _fields='id', orderby='id', order='asc'),
+                                           stage='index_prune')
+        if sum(len(page) for page in pages) != live_total:
+            logger.warning(f"Incomplete {endpoint} ID sweep - skipping index pruning")
+            return 0
+        
+        live_ids = {item['id'] for page in pages for item in page}
+        stale_ids = indexed_ids - live_ids
+        if stale_ids:
+            remove(stale_ids)
+            logger.info(f"🗄️ Removed {len(stale_ids)} stale {endpoint} entries from index")
+        return len(stale_ids)
+    
+    def _site_extractor(self) -> ImageExtractor:
+        """ImageExtractor for base_url, rebuilt if the site changes"""
+        if self._image_extractor is None or self._image_extractor.base_url != self.base_url:
+            self._image_extractor = ImageExtractor(self.base_url, self.site_aliases)
+        return self._image_extractor
     
     def identify_unused_images(self) -> Set[int]:
         """Identify truly unused images"""
         logger.info("🔍 Identifying unused images...")
         
+        # Normalise every used URL once so each media lookup is O(1)
+        used_keys = {canonical_image_key(url) for url in self.used_images}
+        
         unused_media_ids = set()
+        live_parents = None
+        if self.validate_parents:
+            with self.instrumentation.phase('parent_validation'):
+                live_parents = self.live_parent_ids()
         
         for media_id, media_info in self.all_media.items():
-            source_url = media_info['source_url']
-            
-            # Skip if image is attached to a post
-            if media_info['post'] and media_info['post'] != 0:
+            # Skip if image is attached to a post (that still exists, when validated)
+            if media_info['post'] and (live_parents is None or media_info['post'] in live_parents):
                 continue
             
-            # Skip if image is referenced in content
-            if source_url in self.used_images:
+            # Skip if referenced by ID (featured image, gallery shortcode)
+            if media_id in self.used_media_ids:
                 continue
             
-            # Check if any size variant is used
-            is_used = False
-            for used_url in self.used_images:
-                if self._are_same_image(source_url, used_url):
-                    is_used = True
-                    break
+            # Skip if the original or any size variant is referenced in content
+            if not used_keys.isdisjoint(self._media_keys(media_info)):
+                continue
             
-            if not is_used:
-                unused_media_ids.add(media_id)
+            unused_media_ids.add(media_id)
         
         logger.info(f"🔍 Found {len(unused_media_ids)} unused images")
         self.unused_images = unused_media_ids
         return unused_media_ids
     
+    def live_parent_ids(self) -> Set[int]:
+        """Attachment parent IDs not confirmed to be in the trash
+        
+        Distinct parents are looked up with include=&status=trash batches
+        of 100 (each type's batches run concurrently), one content type
+        after another, and IDs found in one type are not asked of the next.
+        A parent that is not found stays live: WordPress re-parents the
+        attachments of deleted posts itself, and parents of types not
+        exposed over REST (or of a type that cannot be checked) would
+        otherwise look deleted while their content is never scanned.
+        """
+        parents = {media_info['post'] for media_info in self.all_media.values() if media_info['post']}
+        start_time = time.time()
+        if not parents:
+            live = set()
+        elif self._dump_trashed_posts is not None:
+            live = parents - self._dump_trashed_posts
+        else:
+            trashed = set()
+            params = {'status': 'trash', 'context': 'edit', '_fields': 'id'}
+            for content_type in self.content_types:
+                remaining = parents - trashed
+                if not remaining:
+                    break
+                try:
+                    trashed |= {item['id'] for item in self._fetch_by_ids(content_type, remaining, params,
+                                                                          'parent_check')}
+                except (RuntimeError, requests.RequestException) as e:
+                    logger.warning(f"⚠️ Could not check {content_type} for trashed parents ({e}) - "
+                                   f"keeping images attached to {content_type}")
+            live = parents - trashed
+        
+        self.orphaned_media = {media_id for media_id, media_info in self.all_media.items()
+                               if media_info['post'] and media_info['post'] not in live}
+        self.parent_stats = {
+            'parents': len(parents),
+            'deleted_parents': len(parents - live),
+            'orphaned_media': len(self.orphaned_media),
+            'seconds': round(time.time() - start_time, 2)
+        }
+        if parents:
+            logger.info(f"👪 {len(parents - live)} of {len(parents)} attachment parents in the trash "
+                        f"({len(self.orphaned_media)} orphaned images)")
+        return live
+    
+    def _media_keys(self, media_info: Dict) -> Set[str]:
+        """Canonical keys for a media item's original and its generated sizes"""
+        source_key = canonical_image_key(media_info['source_url'])
+        keys = {source_key}
+        directory = source_key.rsplit('/', 1)[0]
+        for size_file in media_info.get('sizes', []):
+            if size_file:
+                keys.add(VARIANT_SUFFIX_PATTERN.sub('', f"{directory}/{size_file}"))
+        return keys
+    
     def _are_same_image(self, url1: str, url2: str) -> bool:
-        """Check if two URLs represent the same image (different sizes)"""
+        """Check if two URLs represent the same image (different sizes)
+        
+        Pairwise reference implementation, superseded by canonical_image_key
+        and kept for benchmark_variant_matching.py.
+        """
         # Remove size suffixes and compare
         base1 = re.sub(r'-\d+x\d+', '', url1)
         base1 = re.sub(r'-scaled', '', base1)
@@ -299,33 +1349,132 @@ class WordPressImageCleanup:
         return base1 == base2
     
     def create_backup(self, media_ids: Set[int], filename: str = None) -> str:
-        """Create backup of images before deletion"""
+        """Create backup of images before deletion
+        
+        Entries are streamed to a gzip JSON-lines file BACKUP_CHUNK_SIZE
+        images at a time, after a header record with the totals.
+        """
         if filename is None:
-            filename = f"image_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            filename = os.path.join(self.output_dir,
+                                    f"image_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl.gz")
         
-        backup_data = []
+        backed_up = sorted(media_id for media_id in media_ids if media_id in self.all_media)
+        total_bytes = sum(self.all_media[media_id]['file_size'] or 0 for media_id in backed_up)
+        timestamp = datetime.now().isoformat()
         
-        for media_id in media_ids:
-            if media_id in self.all_media:
-                media_info = self.all_media[media_id]
-                backup_data.append({
-                    'id': media_id,
-                    'title': media_info['title'],
-                    'source_url': media_info['source_url'],
-                    'date': media_info['date'],
-                    'file_size': media_info['file_size'],
-                    'mime_type': media_info['mime_type'],
-                    'backup_timestamp': datetime.now().isoformat(),
-                    'reason': 'unused_image_cleanup'
-                })
+        with BackupWriter(filename, self.base_url, len(backed_up), total_bytes) as writer:
+            for start in range(0, len(backed_up), self.BACKUP_CHUNK_SIZE):
+                chunk = backed_up[start:start + self.BACKUP_CHUNK_SIZE]
+                details = self._backup_details(chunk)
+                for media_id in chunk:
+                    media_info = self.all_media[media_id]
+                    writer.write({
+                        'id': media_id,
+                        'title': media_info['title'],
+                        'source_url': media_info['source_url'],
+                        'date': media_info['date'],
+                        'file_size': media_info['file_size'],
+                        'mime_type': media_info['mime_type'],
+                        'alt_text': media_info.get('alt_text', ''),
+                        'caption': details.get(media_id, {}).get('caption', ''),
+                        'description': details.get(media_id, {}).get('description', ''),
+                        'post': media_info['post'],
+                        'sizes': media_info.get('sizes', []),
+                        'backup_timestamp': timestamp,
+                        'reason': 'unused_image_cleanup'
+                    })
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(backup_data, f, indent=2, ensure_ascii=False)
+        logger.info(f"💾 Backup created: {filename} ({writer.images} images, {writer.bytes / 1024 / 1024:.1f} MB)")
+        self.backup_summary = {'file': filename, 'images': writer.images, 'bytes': writer.bytes}
+        return filename
+    
+    def _backup_details(self, media_ids: Set[int]) -> Dict[int, Dict[str, str]]:
+        """caption/description of the images being backed up, for restoring them
+        
+        Fetched in include= batches rather than loaded one image at a time,
+        as raw text where the account may use context=edit (rendered HTML
+        otherwise); records read from a SQL dump already carry them.
+        """
+        if self.sql_dump is not None:
+            return {media_id: {key: self.all_media[media_id].get(key, '') for key in ('caption', 'description')}
+                    for media_id in media_ids if media_id in self.all_media}
+        for context in ({'context': 'edit'}, {}):
+            try:
+                items = self._fetch_by_ids('media', media_ids, dict(context, _fields='id,caption,description'),
+                                           'backup')
+                break
+            except (RuntimeError, requests.RequestException) as e:
+                error = e
+        else:
+            logger.warning(f"⚠️ Could not fetch captions for the backup ({error}) - backing up without them")
+            return {}
+        return {item['id']: {key: (item.get(key) or {}).get('raw', (item.get(key) or {}).get('rendered', ''))
+                             for key in ('caption', 'description')}
+                for item in items}
+    
+    def create_binary_backup(self, media_ids: Set[int]) -> Set[int]:
+        """Download the files of images about to be deleted, returning the IDs safely stored
+        
+        Images with a file that could not be downloaded are left out, so
+        they survive this run. Files already in the store are not fetched again.
+        """
+        backup = BinaryBackup(os.path.join(self.output_dir, self.binary_backup_dir),
+                              max_workers=self.binary_backup_workers, retries=self.page_retries,
+                              retry_backoff=self.retry_backoff,
+                              user_agent=self.session.headers.get('User-Agent'))
+        media = {media_id: self.all_media[media_id] for media_id in media_ids if media_id in self.all_media}
+        backed_up = backup.run(media)
+        self.binary_backup_stats = dict(backup.stats, store=backup.store.root)
+        
+        kept = sorted(set(media_ids) - backed_up)
+        if kept:
+            logger.warning(f"⚠️ Keeping {len(kept)} images whose files could not be backed up: {kept[:10]}")
+        return backed_up
+    
+    def create_deletion_plan(self, media_ids: Set[int], backup_file: str = None,
+                             filename: str = None) -> str:
+        """Write the signed plan a later execute_plan call will delete
+        
+        Content watermarks are wound back by each scan's duration, so the
+        execution probe also covers anything edited while the scan ran.
+        """
+        if filename is None:
+            filename = os.path.join(self.output_dir, f"deletion_plan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
         
-        logger.info(f"💾 Backup created: {filename} ({len(backup_data)} images)")
-        self.backup_data = backup_data
+        media = []
+        for media_id in media_ids:
+            media_info = self.all_media.get(media_id)
+            if media_info is None:
+                continue
+            media.append({
+                'id': media_id,
+                'modified': media_info['modified'],
+                'post': media_info['post'],  # Non-zero for orphans of a trashed parent
+                'title': media_info['title'],
+                'source_url': media_info['source_url'],
+                'file_size': media_info['file_size']
+            })
+        
+        environment_watermarks = {name: scanner._plan_watermarks()
+                                  for name, scanner in self._environment_scanners.items()}
+        plan = build_plan(self.base_url, media, self._plan_watermarks(), backup_file,
+                          environment_watermarks)
+        save_plan(plan, self.plan_key, filename)
+        logger.info(f"📝 Deletion plan written: {filename} ({len(media)} images)")
         return filename
     
+    def _plan_watermarks(self) -> Dict[str, Optional[str]]:
+        """Content watermarks per type, wound back by the time each scan took"""
+        content_watermarks = {}
+        for content_type in self.content_types:
+            watermark = self.content_watermarks.get(content_type)
+            if watermark:
+                scan_seconds = self.fetch_stats.get(content_type, {}).get('seconds', 0)
+                watermark = (datetime.fromisoformat(watermark) -
+                             timedelta(seconds=scan_seconds + 60)).isoformat(timespec='seconds')
+            content_watermarks[content_type] = watermark
+        return content_watermarks
+    
     def delete_image(self, media_id: int, force: bool = False) -> bool:
         """Delete a single image via WordPress API"""
         if self.dry_run and not force:
@@ -338,8 +1487,8 @@ class WordPressImageCleanup:
             title = media_info.get('title', f'ID {media_id}')
             
             # Delete via WordPress API
-            response = self.session.delete(f"{self.base_url}/wp-json/wp/v2/media/{media_id}",
-                                         params={'force': True})  # Permanently delete
+            response = self._request('DELETE', f"{self.base_url}/wp-json/wp/v2/media/{media_id}",
+                                     stage='deletion', params={'force': True})  # Permanently delete
             
             if response.status_code == 200:
                 logger.info(f"✅ Deleted: {title} (ID: {media_id})")
@@ -353,108 +1502,438 @@ class WordPressImageCleanup:
             logger.error(f"❌ Error deleting image {media_id}: {e}")
             return False
     
+    def delete_images_batch(self, media_ids: List[int]) -> Dict[int, bool]:
+        """Delete several images in one /wp-json/batch/v1 call
+        
+        Each sub-response is mapped back to its media ID. If the batch call
+        itself fails, or the media route refuses batching, the affected IDs
+        fall back to single delete_image calls.
+        """
+        if self.dry_run:
+            for media_id in media_ids:
+                logger.info(f"🔄 DRY RUN: Would delete image {media_id}")
+            return {media_id: True for media_id in media_ids}
+        
+        if not self.batch_api_available or len(media_ids) == 1:
+            return {media_id: self.delete_image(media_id) for media_id in media_ids}
+        
+        payload = {
+            'validation': 'normal',
+            'requests': [{'method': 'DELETE', 'path': f"/wp/v2/media/{media_id}?force=true"}
+                         for media_id in media_ids]
+        }
+        
+        try:
+            response = self._request('POST', f"{self.base_url}/wp-json/batch/v1", stage='deletion',
+                                     json=payload)
+            sub_responses = response.json().get('responses', []) if response.status_code in (200, 207) else []
+        except Exception as e:
+            logger.error(f"❌ Batch delete request failed: {e}")
+            sub_responses = []
+        
+        if len(sub_responses) != len(media_ids):
+            logger.warning(f"Batch delete returned no usable responses - retrying {len(media_ids)} "
+                           f"images individually")
+            return {media_id: self.delete_image(media_id) for media_id in media_ids}
+        
+        outcomes = {}
+        retry_single = []
+        
+        for media_id, sub_response in zip(media_ids, sub_responses):
+            status = sub_response.get('status')
+            body = sub_response.get('body') or {}
+            title = self.all_media.get(media_id, {}).get('title', f'ID {media_id}')
+            
+            if status == 200:
+                logger.info(f"✅ Deleted: {title} (ID: {media_id})")
+                outcomes[media_id] = True
+            elif isinstance(body, dict) and body.get('code') == 'rest_batch_not_allowed':
+                retry_single.append(media_id)
+            else:
+                message = body.get('message', '') if isinstance(body, dict) else ''
+                logger.error(f"❌ Failed to delete {title} (ID: {media_id}): {status} {message}")
+                outcomes[media_id] = False
+        
+        if retry_single:
+            logger.warning("Media route does not allow batch requests - using single requests")
+            self.batch_api_available = False
+            for media_id in retry_single:
+                outcomes[media_id] = self.delete_image(media_id)
+        
+        return outcomes
+    
     def batch_delete(self, media_ids: Set[int], batch_size: int = None) -> Dict:
-        """Delete images in batches with safety controls"""
+        """Delete images in batches with safety controls
+        
+        Up to max_deletions_in_flight requests run concurrently within each
+        batch of max_deletions_per_batch. A circuit breaker stops the run once
+        the recent failure rate crosses deletion_failure_threshold, and every
+        outcome is streamed to a deletion_log_*.txt file. When the REST batch
+        endpoint is available each batch is split into batch calls spread
+        across the in-flight workers, each carrying at most
+        batch_api_max_items deletions (see DeletionExecutor).
+        """
         if batch_size is None:
             batch_size = self.max_deletions_per_batch
+        self._size_connection_pool()
         
-        results = {
-            'total': len(media_ids),
-            'deleted': 0,
-            'failed': 0,
-            'skipped': 0
+        log_path = os.path.join(self.output_dir, f"deletion_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+        executor = DeletionExecutor(
+            self.delete_image,
+            max_in_flight=self.max_deletions_in_flight,
+            batch_size=batch_size,
+            breaker=CircuitBreaker(failure_threshold=self.deletion_failure_threshold),
+            log_path=log_path,
+            success_status='dry_run' if self.dry_run else 'deleted',
+            describe=lambda media_id: self.all_media.get(media_id, {}).get('title', ''),
+            delete_group_fn=self.delete_images_batch if self.batch_api_available else None,
+            group_size=self.batch_api_max_items,
+            on_outcome=self.journal.record_deletion if self.journal is not None else None
+        )
+        results = executor.run(media_ids)
+        
+        if self.index is not None and not self.dry_run:
+            self.index.remove_media(executor.deleted_ids)
+        
+        logger.info(f"🗑️ Deletion log: {log_path}")
+        return results
+    
+    def execute_plan(self, plan_file: str, dry_run: bool = False) -> Dict:
+        """Delete exactly the images in a signed dry-run plan, without a rescan
+        
+        The planned IDs are re-fetched in include= batches. Any that are gone,
+        modified, or attached to a post since the plan was made are dropped.
+        Content changed since the plan's watermarks is then fetched and
+        extracted, on this site and every configured environment. Planned
+        images it now references are also dropped.
+        """
+        self.dry_run = dry_run
+        self._start_instrumentation()
+        logger.info(f"📝 Executing deletion plan {plan_file} ({'DRY RUN' if dry_run else 'LIVE MODE'})")
+        
+        try:
+            plan = load_plan(plan_file, self.plan_key, site=self.base_url)
+        except PlanError as e:
+            logger.error(f"❌ {e}")
+            return {"error": str(e)}
+        
+        with self.instrumentation.phase('connection'):
+            connected = self.test_connection()
+        if not connected:
+            return {"error": "Connection test failed", "instrumentation": self._finish_instrumentation()}
+        
+        planned = {entry['id']: entry for entry in plan['media']}
+        try:
+            with self.instrumentation.phase('plan_check'):
+                # Types added since the dry run have no watermark, so are scanned in full
+                content_watermarks = dict.fromkeys(self.discover_content_types() if self.discover_types else ())
+                content_watermarks.update(plan['content_watermarks'])
+                current, stale = self._check_plan_media(planned)
+                referenced = self._referenced_since(content_watermarks, current)
+                for scanner in self._prepare_environments():
+                    environment_watermarks = dict.fromkeys(scanner.content_types)
+                    environment_watermarks.update(
+                        plan.get('environment_watermarks', {}).get(scanner.environment_name, {}))
+                    referenced |= scanner._referenced_since(environment_watermarks, current)
+        except (RuntimeError, requests.RequestException) as e:
+            logger.error(f"❌ Plan staleness check failed: {e}")
+            return {"error": f"Plan staleness check failed: {e}", "instrumentation": self._finish_instrumentation()}
+        stale['referenced'] = sorted(referenced)
+        
+        approved = set(current) - referenced
+        self.all_media = current
+        if not dry_run and self.binary_backup:
+            with self.instrumentation.phase('binary_backup'):
+                backed_up = self.create_binary_backup(approved)
+            stale['backup_failed'] = sorted(approved - backed_up)
+            approved = backed_up
+        self.unused_images = approved
+        logger.info(f"📝 Plan check: {len(approved)} of {len(planned)} planned images still safe to delete")
+        for reason, media_ids in stale.items():
+            if media_ids:
+                logger.warning(f"⚠️ Dropped {len(media_ids)} planned images ({reason}): {media_ids[:10]}")
+        
+        with self.instrumentation.phase('deletion'):
+            deletion_results = self.batch_delete(approved)
+        
+        logger.info("✅ Deletion plan executed!")
+        return {
+            "plan_file": plan_file,
+            "planned_images": len(planned),
+            "approved_images": len(approved),
+            "stale": stale,
+            "deletion_results": deletion_results,
+            "backup_file": plan.get('backup_file'),
+            "binary_backup_stats": self.binary_backup_stats,
+            "rate_limit": self.rate_limiter.stats(),
+            "transfer_stats": self.transfer_stats,
+            "instrumentation": self._finish_instrumentation(),
+            "dry_run": dry_run
         }
+    
+    def _check_plan_media(self, planned: Dict[int, Dict]) -> Tuple[Dict[int, Dict], Dict[str, List[int]]]:
+        """Fetch planned media by ID, splitting unchanged records from stale ones"""
+        planned_ids = sorted(planned)
+        live = {item['id']: item for item in self._fetch_by_ids('media', planned_ids,
+                                                                self._stage_params('media'), 'plan_check')}
+        current = {}
+        stale = {'missing': [], 'modified': [], 'attached': []}
+        for media_id in planned_ids:
+            item = live.get(media_id)
+            if item is None:
+                stale['missing'].append(media_id)
+            elif item.get('modified') != planned[media_id]['modified']:
+                stale['modified'].append(media_id)
+            elif item.get('post') and item['post'] != planned[media_id].get('post', 0):
+                stale['attached'].append(media_id)
+            else:
+                current[media_id] = self._media_record(item)
         
-        media_list = list(media_ids)
+        # Planned orphans stay orphans only while their parent is still in the trash
+        if any(record['post'] for record in current.values()):
+            self.all_media = current
+            live_parents = self.live_parent_ids()
+            for media_id in [media_id for media_id, record in current.items() if record['post'] in live_parents]:
+                stale['attached'].append(media_id)
+                del current[media_id]
+        return current, stale
+    
+    def _fetch_by_ids(self, endpoint: str, ids, params: Dict, stage: str) -> List[Dict]:
+        """Fetch specific items with include= batches of one page each"""
+        url = f"{self.base_url}/wp-json/wp/v2/{endpoint}"
+        ids = sorted(ids)
+        chunks = [ids[i:i + self.parallel_page_size] for i in range(0, len(ids), self.parallel_page_size)]
+        if not chunks:
+            return []
         
-        for i in range(0, len(media_list), batch_size):
-            batch = media_list[i:i + batch_size]
-            
-            logger.info(f"🗑️ Processing batch {i//batch_size + 1}: {len(batch)} images")
-            
-            for media_id in batch:
-                if self.delete_image(media_id):
-                    results['deleted'] += 1
-                else:
-                    results['failed'] += 1
-                
-                # Rate limiting
-                time.sleep(self.request_delay)
-            
-            # Pause between batches
-            if i + batch_size < len(media_list):
-                logger.info("⏸️ Pausing between batches...")
-                time.sleep(2)
+        params = dict(params, orderby='include')
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pages = list(executor.map(
+                lambda chunk: self._fetch_page(url, dict(params, include=','.join(map(str, chunk))),
+                                               1, stage), chunks))
+        return [item for page in pages for item in page if item.get('id')]
+    
+    def _referenced_since(self, content_watermarks: Dict[str, Optional[str]],
+                          media: Dict[int, Dict]) -> Set[int]:
+        """IDs in media referenced by content changed since the watermarks"""
+        used_keys = set()
+        used_media_ids = set()
+        try:
+            for content_type, watermark in content_watermarks.items():
+                extra_params = {'modified_after': watermark} if watermark else {}
+                for content_items in self._iter_content_pages(content_type, extra_params):
+                    for _, _, image_keys, media_ids in self._extract_page_references(content_items):
+                        used_keys.update(image_keys)
+                        used_media_ids.update(media_ids)
+        finally:
+            self._close_extraction_pool()
         
-        return results
+        return {media_id for media_id, media_info in media.items()
+                if media_id in used_media_ids or not used_keys.isdisjoint(self._media_keys(media_info))}
     
     def generate_report(self, filename: str = None) -> str:
-        """Generate comprehensive cleanup report"""
+        """Generate the cleanup report: a text summary plus CSV and HTML listings
+        
+        The summary names the report_top_n largest unused images (picked
+        with a bounded heap); the CSV and HTML list every one, largest
+        first, written row by row. All three paths are kept in report_files.
+        """
         if filename is None:
-            filename = f"cleanup_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+            filename = os.path.join(self.output_dir, f"cleanup_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+        stem = os.path.splitext(filename)[0]
+        
+        def size(media_id: int) -> int:
+            return self.all_media.get(media_id, {}).get('file_size') or 0
+        
+        def row(media_id: int) -> Dict:
+            media_info = self.all_media.get(media_id, {})
+            return {'id': media_id, 'title': media_info.get('title', ''), 'bytes': size(media_id),
+                    'mime_type': media_info.get('mime_type', ''), 'date': media_info.get('date', ''),
+                    'attached_post': media_info.get('post', 0), 'parent_deleted': media_id in self.orphaned_media,
+                    'source_url': media_info.get('source_url', '')}
+        
+        unused_bytes = sum(size(media_id) for media_id in self.unused_images)
+        top_rows = [row(media_id) for media_id in largest(self.unused_images, size, self.report_top_n)]
+        summary = {
+            'Site': self.base_url,
+            'Generated': datetime.now().isoformat(),
+            'Mode': 'DRY RUN' if self.dry_run else 'LIVE DELETION',
+            'Total Images': len(self.all_media),
+            'Used Images': len(self.all_media) - len(self.unused_images),
+            'Unused Images': len(self.unused_images),
+            'Reclaimable': f"{unused_bytes / 1024 / 1024:.1f} MB",
+            'Attached to Trashed Posts': len(self.orphaned_media & self.unused_images)
+        }
         
         with open(filename, 'w', encoding='utf-8') as f:
             f.write("WordPress Image Cleanup Report\n")
             f.write("=" * 50 + "\n\n")
-            f.write(f"Site: {self.base_url}\n")
-            f.write(f"Generated: {datetime.now().isoformat()}\n")
-            f.write(f"Mode: {'DRY RUN' if self.dry_run else 'LIVE DELETION'}\n\n")
-            
             f.write("Summary:\n")
-            f.write(f"  Total Images: {len(self.all_media)}\n")
-            f.write(f"  Used Images: {len(self.all_media) - len(self.unused_images)}\n")
-            f.write(f"  Unused Images: {len(self.unused_images)}\n\n")
+            for label, value in summary.items():
+                f.write(f"  {label}: {value}\n")
+            f.write("\n")
             
-            if self.unused_images:
-                f.write("Unused Images:\n")
+            if top_rows:
+                f.write(f"Largest Unused Images (full list: {stem}.csv, {stem}.html):\n")
                 f.write("-" * 30 + "\n")
-                
-                for media_id in self.unused_images:
-                    media_info = self.all_media.get(media_id, {})
-                    f.write(f"ID: {media_id}\n")
-                    f.write(f"  Title: {media_info.get('title', 'No title')}\n")
-                    f.write(f"  URL: {media_info.get('source_url', 'No URL')}\n")
-                    f.write(f"  Size: {media_info.get('file_size', 0)} bytes\n")
-                    f.write(f"  Date: {media_info.get('date', 'Unknown')}\n")
-                    f.write(f"  Attached Post: {media_info.get('post', 'None')}\n")
-                    f.write("\n")
-        
-        logger.info(f"📊 Report generated: {filename}")
+                for entry in top_rows:
+                    orphaned = " (trashed)" if entry['parent_deleted'] else ""
+                    f.write(f"{entry['bytes'] / 1024:>10.1f} KB  ID {entry['id']}: {entry['title']} "
+                            f"(post {entry['attached_post'] or 'none'}{orphaned})\n")
+                    f.write(f"{'':>15}{entry['source_url']}\n")
+        
+        # A sorted list of IDs rather than of rows keeps the listing pass flat
+        ordered = sorted(self.unused_images, key=lambda media_id: (-size(media_id), media_id))
+        csv_file = f"{stem}.csv"
+        html_file = f"{stem}.html"
+        write_csv_report(csv_file, (row(media_id) for media_id in ordered))
+        write_html_report(html_file, summary, top_rows, (row(media_id) for media_id in ordered))
+        self.report_files = {'text': filename, 'csv': csv_file, 'html': html_file}
+        
+        logger.info(f"📊 Report generated: {filename} (listings: {csv_file}, {html_file})")
         return filename
     
-    def run_cleanup(self, dry_run: bool = True) -> Dict:
-        """Run complete cleanup process"""
+    def run_cleanup(self, dry_run: bool = True, incremental: bool = False,
+                    resume: bool = False) -> Dict:
+        """Run complete cleanup process
+        
+        With incremental=True, media and content come from the on-disk index
+        at index_path, refreshed with only the items changed since last sync.
+        Every run checkpoints to journal_path; with resume=True an unfinished
+        journal for this site is picked up instead of scanning from scratch.
+        """
         self.dry_run = dry_run
+        self._start_instrumentation()
         
         logger.info(f"🚀 Starting image cleanup ({'DRY RUN' if dry_run else 'LIVE MODE'})")
         
-        # Step 1: Test connection
-        if not self.test_connection():
-            return {"error": "Connection test failed"}
+        if self.sql_dump is not None:
+            if not dry_run:
+                # A dump is a snapshot: only execute_plan re-checks it against the live site
+                return {"error": "SQL dump analysis is dry run only - execute its deletion plan instead"}
+        else:
+            # Step 1: Test connection
+            with self.instrumentation.phase('connection'):
+                connected = self.test_connection()
+            if not connected:
+                return {"error": "Connection test failed", "instrumentation": self._finish_instrumentation()}
+        
+        state = self._open_journal(dry_run, incremental, resume)
+        try:
+            results = self._run_cleanup_steps(dry_run, incremental, state)
+        except (RuntimeError, requests.RequestException) as e:
+            logger.error(f"❌ Cleanup interrupted: {e} - re-run with resume=True to continue")
+            return {"error": str(e), "journal_file": self.journal_path,
+                    "instrumentation": self._finish_instrumentation()}
+        finally:
+            self.journal.close()
+        
+        results["journal_file"] = self.journal_path
+        results["resumed"] = state is not None
+        results["instrumentation"] = self._finish_instrumentation()
+        return results
+    
+    def _start_instrumentation(self):
+        """Fresh phase and endpoint statistics for a run"""
+        self.instrumentation = Instrumentation(self.profile_dir, self.profile_phases)
+    
+    def _finish_instrumentation(self) -> Dict:
+        """Log where the run's time went, write any configured exports and return the summary"""
+        summary = self.instrumentation.summary()
+        phases = sorted(summary['phases'].items(), key=lambda phase: phase[1]['seconds'], reverse=True)
+        if phases:
+            logger.info("⏱️ Phases: " + ', '.join(f"{name} {stats['seconds']:.1f}s" for name, stats in phases[:8]))
+        if self.metrics_file:
+            self.instrumentation.write_prometheus(self.metrics_file, self.base_url)
+            logger.info(f"📈 Metrics written: {self.metrics_file}")
+        if self.trace_file:
+            self.instrumentation.write_trace(self.trace_file, self.base_url)
+            logger.info(f"📈 Trace written: {self.trace_file}")
+        for filename in summary['profiles']:
+            logger.info(f"📈 Profile written: {filename}")
+        return summary
+    
+    def _open_journal(self, dry_run: bool, incremental: bool, resume: bool) -> Optional[JournalState]:
+        """Start a fresh run journal, or reopen an unfinished one when resuming"""
+        self.journal = RunJournal(self.journal_path)
+        state = RunJournal.load(self.journal_path) if resume else None
+        if state is not None and (state.complete or state.run.get('site') != self.base_url):
+            logger.info("⏯️ No unfinished run to resume for this site - starting afresh")
+            state = None
+        
+        if state is None:
+            self.journal.start(site=self.base_url, dry_run=dry_run, incremental=incremental)
+        else:
+            self.journal.resume()
+        return state
+    
+    def _run_cleanup_steps(self, dry_run: bool, incremental: bool,
+                           state: Optional[JournalState]) -> Dict:
+        """Steps 2-7 of run_cleanup, checkpointed to the run journal"""
+        phase = self.instrumentation.phase
+        if self.discover_types and self.sql_dump is None:
+            with phase('type_discovery'):
+                self.discover_content_types()
+        
+        if self.sql_dump is not None:
+            # Steps 2-3: Read media and content from the SQL dump, offline
+            with phase('sql_dump'):
+                self.scan_sql_dump()
+        elif incremental:
+            # Steps 2-3: Sync the index and load media/usage from it
+            with phase('index_sync'):
+                self.sync_index()
+        elif state is not None and (state.media or state.content):
+            # Steps 2-3: Continue the interrupted scan from the journal
+            with phase('resume_scan'):
+                self.resume_scan(state)
+        else:
+            # Steps 2-3: Stream media and content scans concurrently
+            with phase('scan'):
+                self.scan_library()
         
-        # Step 2: Get all media
-        self.get_all_media()
         if not self.all_media:
             return {"error": "No media found"}
-        
-        # Step 3: Analyse content usage
-        self.get_all_content()
+        self.journal.record('scan_complete', media=len(self.all_media))
         
         # Step 4: Identify unused images
-        unused_ids = self.identify_unused_images()
+        with phase('identification'):
+            unused_ids = self.identify_unused_images()
         
         if not unused_ids:
             logger.info("✅ No unused images found!")
-            return {"message": "No unused images found", "total_images": len(self.all_media)}
+            self.journal.record('complete')
+            return {"message": "No unused images found", "total_images": len(self.all_media),
+                    "unused_images": 0, "backup_file": None, "report_file": None, "report_files": {},
+                    "plan_file": None,
+                    "fetch_stats": self.fetch_stats, "sync_stats": self.sync_stats,
+                    "rate_limit": self.rate_limiter.stats(), "transfer_stats": self.transfer_stats,
+                    "extraction_stats": self.extraction_stats,
+                    "content_type_stats": self.content_type_stats,
+                    "environment_stats": self.environment_stats,
+                    "parent_stats": self.parent_stats,
+                    "dump_stats": self.dump_stats}
         
-        # Step 5: Create backup
-        backup_file = self.create_backup(unused_ids)
+        # Step 5: Create backup (and, before live deletion, store the image files)
+        with phase('backup'):
+            backup_file = self.create_backup(unused_ids)
+        deletable_ids = unused_ids
+        if not dry_run and self.binary_backup:
+            with phase('binary_backup'):
+                deletable_ids = self.create_binary_backup(unused_ids)
         
-        # Step 6: Generate report
-        report_file = self.generate_report()
+        # Step 6: Generate report (and, for dry runs, the signed deletion plan)
+        with phase('report'):
+            report_file = self.generate_report()
+            plan_file = self.create_deletion_plan(unused_ids, backup_file) if dry_run else None
         
         # Step 7: Delete images (if not dry run)
-        deletion_results = self.batch_delete(unused_ids)
+        with phase('deletion'):
+            deletion_results = self.batch_delete(deletable_ids)
+        if not deletion_results['circuit_open']:
+            # A tripped breaker leaves the run resumable once the host recovers
+            self.journal.record('complete', deleted=deletion_results['deleted'],
+                                failed=deletion_results['failed'])
         
         results = {
             "total_images": len(self.all_media),
@@ -462,6 +1941,18 @@ class WordPressImageCleanup:
             "deletion_results": deletion_results,
             "backup_file": backup_file,
             "report_file": report_file,
+            "report_files": self.report_files,
+            "plan_file": plan_file,
+            "fetch_stats": self.fetch_stats,
+            "sync_stats": self.sync_stats,
+            "rate_limit": self.rate_limiter.stats(),
+            "transfer_stats": self.transfer_stats,
+            "extraction_stats": self.extraction_stats,
+            "content_type_stats": self.content_type_stats,
+            "environment_stats": self.environment_stats,
+            "parent_stats": self.parent_stats,
+            "dump_stats": self.dump_stats,
+            "binary_backup_stats": self.binary_backup_stats,
             "dry_run": dry_run
         }
         
@@ -477,6 +1968,12 @@ def main():
     PASSWORD = "your_application_password"  # WordPress Application Password
     
     cleanup = WordPressImageCleanup(BASE_URL, USERNAME, PASSWORD)
+    # Images used only on staging/development count as used too, e.g.
+    # cleanup.add_environment('staging', "https://staging.your-wordpress-site.com.au",
+    #                         USERNAME, PASSWORD, initial_rate=1.0)
+    # Nightly runs can export where the time went, e.g.
+    # cleanup.metrics_file = "/var/lib/node_exporter/textfile_collector/wp_image_cleanup.prom"
+    # cleanup.trace_file = "cleanup_trace.json"
     
     print("WordPress Image Cleanup System (Australian Edition)")
     print("=" * 55)
@@ -494,15 +1991,34 @@ def main():
     print("📊 ANALYSIS RESULTS:")
     print(f"  Total Images: {results['total_images']}")
     print(f"  Unused Images: {results['unused_images']}")
-    print(f"  Backup File: {results['backup_file']}")
-    print(f"  Report File: {results['report_file']}")
+    if results['unused_images']:
+        print(f"  Backup File: {results['backup_file']}")
+        print(f"  Report File: {results['report_file']}")
+        print(f"  Listings (largest first): {results['report_files']['csv']}, {results['report_files']['html']}")
+        print(f"  Deletion Plan: {results['plan_file']}")
+    for endpoint, stats in results['fetch_stats'].items():
+        print(f"  Fetch Rate ({endpoint}): {stats['pages_per_second']} pages/sec "
+              f"with {stats['workers']} workers")
+    print(f"  Request Rate: {results['rate_limit']['effective_rate']} req/s effective "
+          f"(peak {results['rate_limit']['peak_rate']} req/s)")
+    for stage, stats in results['transfer_stats'].items():
+        print(f"  Transferred ({stage}): {stats['bytes'] / 1024:.1f} KB over {stats['requests']} "
+              f"requests ({stats['decoded_bytes'] / 1024:.1f} KB uncompressed)")
+    for worker, stats in results['extraction_stats'].get('per_worker', {}).items():
+        print(f"  Extraction ({worker}): {stats['items']} items at {stats['mb_per_second']} MB/s")
+    for content_type, stats in results['content_type_stats'].items():
+        print(f"  Scanned ({content_type}): {stats['items']} items in {stats['seconds']}s")
+    for name, stats in results['environment_stats'].items():
+        print(f"  Environment ({name}): {stats['items']} items scanned at {stats['base_url']}")
+    for name, stats in results['instrumentation']['phases'].items():
+        print(f"  Phase ({name}): {stats['seconds']}s")
     
     if results['unused_images'] > 0:
         print(f"\n🗑️ Found {results['unused_images']} unused images ready for deletion")
         print("📋 Review the report file before proceeding with actual deletion")
         print()
-        print("To execute deletion, modify the script to run:")
-        print("  cleanup.run_cleanup(dry_run=False)")
+        print("To delete exactly this reviewed plan, run:")
+        print("  python3 auto_execute_cleanup.py")
     else:
         print("\n✅ No unused images found - your site is clean!")
 